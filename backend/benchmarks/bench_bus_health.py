@@ -0,0 +1,64 @@
+"""匯流排健康管理基準測試：USB 轉換器故障時的 API 停頓
+運行方式: uv run python benchmarks/bench_bus_health.py
+
+模擬繼電器板（9600 baud）先以正常讀取累積回應時間樣本，接著模擬轉換器離線，
+同時發出 CALLERS 個不同通道的單線圈讀取（fresh，各自排隊等待匯流排鎖，不會被合併），
+量測全部返回所需的時間：
+- 固定逾時：每個請求各等待 MODBUS_TIMEOUT 秒
+- 自適應逾時 + 斷路器：逾時依回應時間 p99 調整，連續無回應後其餘請求立即失敗
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from services.modbus_controller import ModbusRelayController  # noqa: E402
+
+WARMUP = 50
+CALLERS = 10
+
+
+async def bench(label: str, adaptive: bool):
+    settings.modbus_adaptive_timeout = adaptive
+    settings.modbus_circuit_failures = 3 if adaptive else 10**6
+
+    controller = ModbusRelayController(simulation_mode=True, baudrate=9600)
+    await controller.connect()
+    await controller.stop_reconciliation()
+    for _ in range(WARMUP):
+        await controller.read_all_relays()
+
+    controller.transport.client.offline = True
+    start = time.perf_counter()
+    # 不同通道的讀取不會被 _deduplicated_read 合併，每個請求各自佔用一次匯流排
+    results = await asyncio.gather(
+        *(controller.read_relay_status(channel, fresh=True) for channel in range(CALLERS))
+    )
+    elapsed = time.perf_counter() - start
+
+    health = controller.bus.health.get_status_dict()
+    print(
+        f"   {label:<22s} 逾時 {health['timeout_ms']:>7.0f} ms，{CALLERS} 個請求全部返回 "
+        f"{elapsed:>6.2f} 秒（失敗 {results.count(None)}，斷路拒絕 {health['rejected']}）"
+    )
+    await controller.disconnect()
+
+
+async def main():
+    # 每個失敗的請求都會記錄錯誤，基準測試只看彙總
+    logging.disable(logging.CRITICAL)
+    print("=" * 72)
+    print(f"匯流排健康管理基準測試（模擬 9600 baud，轉換器離線，{CALLERS} 個排隊請求）")
+    print("=" * 72)
+
+    await bench("固定逾時", False)
+    await bench("自適應逾時 + 斷路器", True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
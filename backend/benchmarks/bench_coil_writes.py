@@ -0,0 +1,72 @@
+"""繼電器寫入合併基準測試
+運行方式: uv run python benchmarks/bench_coil_writes.py
+
+以模擬繼電器板（依 9600 baud 模擬線路時間）比較：
+- 不合併：每個 set_relay 依序送出一幀功能碼 05
+- 合併：同一窗口內的變更合併為一幀功能碼 0F
+統計送出的幀數與整批請求的端到端延遲。
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from services.modbus_controller import ModbusRelayController  # noqa: E402
+
+BURST_SIZES = [1, 4, 8, 16]
+ROUNDS = 5
+
+
+async def run_sequential(controller: ModbusRelayController, burst: int) -> float:
+    """逐一等待每個寫入完成（合併前的行為）"""
+    start = time.perf_counter()
+    for round_no in range(ROUNDS):
+        for channel in range(burst):
+            await controller.set_relay(channel, round_no % 2 == 0)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+async def run_burst(controller: ModbusRelayController, burst: int) -> float:
+    """同時提交整批寫入（排程同時觸發 / sync-schedules）"""
+    start = time.perf_counter()
+    for round_no in range(ROUNDS):
+        await asyncio.gather(
+            *(controller.set_relay(channel, round_no % 2 == 0) for channel in range(burst))
+        )
+    return (time.perf_counter() - start) / ROUNDS
+
+
+async def bench(label: str, coalesce_ms: int, runner):
+    print(f"\n[{label}] 合併窗口 {coalesce_ms} ms")
+    print(f"   {'批量':>4s} {'幀數/批':>8s} {'延遲/批 (ms)':>14s}")
+
+    for burst in BURST_SIZES:
+        controller = ModbusRelayController(simulation_mode=True, baudrate=9600)
+        controller.write_coalesce_ms = coalesce_ms
+        await controller.connect()
+        # 預先讀取線圈映像，與實際運行時的狀態一致
+        await controller.read_all_relays()
+        controller.transport.client.reset_counters()
+
+        latency = await runner(controller, burst)
+        frames = controller.transport.client.frame_count / ROUNDS
+
+        print(f"   {burst:>4d} {frames:>8.1f} {latency * 1000:>14.1f}")
+        await controller.disconnect()
+
+
+async def main():
+    print("=" * 60)
+    print("繼電器寫入合併基準測試（模擬 9600 baud）")
+    print("=" * 60)
+
+    await bench("逐一寫入（基準）", 0, run_sequential)
+    await bench("同時提交，不設窗口", 0, run_burst)
+    await bench("同時提交，合併窗口", 10, run_burst)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
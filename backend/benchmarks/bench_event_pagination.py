@@ -0,0 +1,167 @@
+"""事件分頁基準測試：LIMIT/OFFSET vs (timestamp, id) 游標
+運行方式: uv run python benchmarks/bench_event_pagination.py [筆數，默認 1000000]
+
+以舊 schema（event_type、timestamp 各自的單欄索引）建立暫存資料庫並寫入大量事件，
+量測 /api/events 與 /api/events/alerts 在不同深度的分頁延遲（offset 與 cursor）；
+接著執行 ensure_schema_compatibility 建立 (severity, timestamp) 索引，再量測告警過濾。
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMP_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi import Response  # noqa: E402
+from sqlmodel import Session, col, select  # noqa: E402
+from database import engine, ensure_schema_compatibility  # noqa: E402
+from models import EventLog  # noqa: E402
+from routers.events import encode_cursor, get_alerts, get_events  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+PAGE_SIZE = 50
+DEPTHS = (1, 100, 1000, 5000)  # 第幾頁
+ITERATIONS = 10
+
+LEGACY_SCHEMA = """
+CREATE TABLE eventlog (
+    id INTEGER NOT NULL PRIMARY KEY, event_type VARCHAR NOT NULL, severity VARCHAR NOT NULL,
+    message VARCHAR NOT NULL, details VARCHAR, related_entity_type VARCHAR,
+    related_entity_id INTEGER, timestamp DATETIME NOT NULL
+);
+CREATE INDEX ix_eventlog_event_type ON eventlog (event_type);
+CREATE INDEX ix_eventlog_timestamp ON eventlog (timestamp);
+"""
+
+EVENT_TYPES = ("relay_control", "schedule_run", "temperature_alert", "system_error")
+
+
+def severity_of(i: int) -> str:
+    """約 10% 為告警（warning / error / critical）"""
+    if i % 10 == 0:
+        return ("warning", "error", "critical")[i // 10 % 3]
+    return "info"
+
+
+def seed():
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(LEGACY_SCHEMA)
+    now = datetime.utcnow()
+
+    def rows():
+        for i in range(ROWS):
+            # 約每秒一筆，每 7 筆有一筆與前一筆同時間（id 作為次要排序鍵）
+            timestamp = now - timedelta(seconds=ROWS - i + i // 7)
+            yield (EVENT_TYPES[i % len(EVENT_TYPES)], severity_of(i), f"event {i}",
+                   timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    conn.executemany(
+        "INSERT INTO eventlog (event_type, severity, message, timestamp) VALUES (?, ?, ?, ?)",
+        rows(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def cursor_at(session: Session, query, page: int):
+    """第 page 頁的游標（前一頁最後一筆），不計入量測"""
+    if page <= 1:
+        return None
+    boundary = session.exec(
+        query.order_by(col(EventLog.timestamp).desc(), col(EventLog.id).desc())
+        .offset((page - 1) * PAGE_SIZE - 1)
+        .limit(1)
+    ).first()
+    return encode_cursor(boundary) if boundary else None
+
+
+def median_ms(call) -> float:
+    latencies = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2]
+
+
+def measure(label: str, loop):
+    alerts_query = select(EventLog).where(
+        col(EventLog.severity).in_(["warning", "error", "critical"])
+    )
+    routes = {
+        "events": (select(EventLog), get_events, {"event_type": None, "severity": None}),
+        "severity=error": (
+            select(EventLog).where(EventLog.severity == "error"),
+            get_events,
+            {"event_type": None, "severity": "error"},
+        ),
+        "alerts": (alerts_query, get_alerts, {}),
+    }
+
+    with Session(engine) as session:
+        for name, (query, route, filters) in routes.items():
+            for page in DEPTHS:
+                cursor = cursor_at(session, query, page)
+                if page > 1 and cursor is None:
+                    continue
+
+                def by_offset():
+                    loop.run_until_complete(route(
+                        Response(), limit=PAGE_SIZE, cursor=None,
+                        offset=(page - 1) * PAGE_SIZE, session=session, **filters,
+                    ))
+                    session.expunge_all()
+
+                def by_cursor():
+                    loop.run_until_complete(route(
+                        Response(), limit=PAGE_SIZE, cursor=cursor, offset=0,
+                        session=session, **filters,
+                    ))
+                    session.expunge_all()
+
+                print(
+                    f"   {label:>6s} {name:>15s} {page:>6d} "
+                    f"{median_ms(by_offset):>12.2f} {median_ms(by_cursor):>12.2f}"
+                )
+
+
+def main():
+    print("=" * 64)
+    print(f"事件分頁基準測試（{ROWS:,} 筆，每頁 {PAGE_SIZE} 筆，中位數 {ITERATIONS} 次）")
+    print("=" * 64)
+
+    start = time.perf_counter()
+    seed()
+    print(f"寫入種子資料耗時 {time.perf_counter() - start:.1f} 秒\n")
+
+    loop = asyncio.new_event_loop()
+    print(f"   {'索引':>6s} {'查詢':>15s} {'頁':>6s} {'offset ms':>12s} {'cursor ms':>12s}")
+    measure("單欄", loop)
+
+    start = time.perf_counter()
+    ensure_schema_compatibility()
+    migration_s = time.perf_counter() - start
+    engine.dispose()
+
+    measure("複合", loop)
+    print(f"\n(severity, timestamp) 索引遷移耗時 {migration_s:.1f} 秒")
+
+    loop.close()
+    engine.dispose()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
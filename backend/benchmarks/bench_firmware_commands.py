@@ -0,0 +1,88 @@
+"""韌體指令基準測試：翻轉、閃爍、全部翻轉
+運行方式: uv run python benchmarks/bench_firmware_commands.py
+
+以模擬繼電器板（依 9600 baud 模擬線路時間）比較：
+- 韌體指令：0x0100 翻轉、0x0200 閃開、0x01FF 全部翻轉，各一幀
+- 讀寫組合：不支援韌體指令的板子（讀取狀態後寫入，閃爍期間 API 請求保持開啟）
+統計每次操作送出的幀數與 API 請求的延遲（含路由之後讀取新狀態）。
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from services.modbus_controller import ModbusRelayController  # noqa: E402
+
+ROUNDS = 10
+FLASH_MS = 300
+
+
+async def toggle(controller: ModbusRelayController):
+    await controller.toggle_relay(0)
+    await controller.read_relay_status(0)
+
+
+async def toggle_cold(controller: ModbusRelayController):
+    """線圈映像尚未初始化（例如剛連線失敗後重試）"""
+    controller._coil_image = None
+    await controller.toggle_relay(0)
+    await controller.read_relay_status(0)
+
+
+async def flash(controller: ModbusRelayController):
+    await controller.flash_relay(1, duration_ms=FLASH_MS)
+
+
+async def toggle_all(controller: ModbusRelayController):
+    await controller.toggle_all_relays()
+
+
+OPERATIONS = {
+    "toggle": toggle,
+    "toggle（映像未初始化）": toggle_cold,
+    f"flash {FLASH_MS}ms": flash,
+    "toggle all": toggle_all,
+}
+
+
+async def bench(label: str, firmware: bool):
+    print(f"\n[{label}]")
+    print(f"   {'操作':<24s} {'幀數/次':>8s} {'延遲/次 (ms)':>14s}")
+
+    for name, operation in OPERATIONS.items():
+        controller = ModbusRelayController(simulation_mode=True, baudrate=9600)
+        controller.transport.client.firmware_commands = firmware
+        controller.firmware_commands = firmware
+        await controller.connect()
+        await controller.stop_reconciliation()
+        client = controller.transport.client
+        client.reset_counters()
+
+        total = 0.0
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            await operation(controller)
+            total += time.perf_counter() - start
+            if operation is flash:
+                # 等待閃爍結束，讓每次都從關閉狀態開始（不計入延遲）
+                await asyncio.sleep(FLASH_MS / 1000 + 0.05)
+        latency = total / ROUNDS
+
+        print(f"   {name:<24s} {client.frame_count / ROUNDS:>8.1f} {latency * 1000:>14.1f}")
+        await controller.disconnect()
+
+
+async def main():
+    print("=" * 60)
+    print("韌體指令基準測試（模擬 9600 baud）")
+    print("=" * 60)
+
+    await bench("讀寫組合（不支援韌體指令）", False)
+    await bench("韌體指令", True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
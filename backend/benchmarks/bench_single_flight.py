@@ -0,0 +1,106 @@
+"""硬件讀取單飛合併基準測試：多個分頁同時輪詢狀態端點
+運行方式: uv run python benchmarks/bench_single_flight.py
+
+CLIENTS 個客戶端各自每 POLL_INTERVAL 秒輪詢一次，持續 DURATION 秒：
+- 繼電器狀態（fresh=true，模擬 9600 baud 繼電器板）：統計匯流排幀數
+- 感測器讀數（模擬 1-Wire 感測器，每次讀取 SENSOR_READ_S 秒）：統計實際讀取次數
+比較每個請求各自讀取與經過單飛合併（SINGLE_FLIGHT_TTL_MS）的硬件負載與請求延遲。
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from services.relay_pool import RelayControllerPool  # noqa: E402
+from services.single_flight import get_single_flight  # noqa: E402
+from services.temperature_monitor import SimulatedSensor, TemperatureMonitorService  # noqa: E402
+
+CLIENTS = 10
+POLL_INTERVAL = 0.25
+DURATION = 3.0
+SENSORS = 4
+SENSOR_READ_S = 0.1
+
+
+class SlowSensor(SimulatedSensor):
+    """模擬 1-Wire 轉換時間的感測器"""
+
+    async def read_temperature(self):
+        await asyncio.sleep(SENSOR_READ_S)
+        return await super().read_temperature()
+
+
+async def poll(call) -> list:
+    latencies = []
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(POLL_INTERVAL)
+    return latencies
+
+
+async def run(label: str, call, load) -> None:
+    results = await asyncio.gather(*(poll(call) for _ in range(CLIENTS)))
+    latencies = sorted(latency for result in results for latency in result)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"   {label:<20s} {len(latencies):>4d} 個請求，{load():>12s}，"
+        f"延遲中位數 {latencies[len(latencies) // 2]:>6.1f} ms，p95 {p95:>6.1f} ms"
+    )
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    print("=" * 78)
+    print(
+        f"單飛合併基準測試（{CLIENTS} 個客戶端，每 {POLL_INTERVAL}s 輪詢，"
+        f"TTL {settings.single_flight_ttl_ms} ms）"
+    )
+    print("=" * 78)
+
+    pool = RelayControllerPool([{"port": "sim", "device_address": 1}], simulation_mode=True)
+    await pool.connect()
+    await pool.get(1).stop_reconciliation()
+    client = pool.buses["sim"].transport.client
+
+    print("\n[繼電器狀態 fresh=true]")
+    for label, call in (
+        ("各自讀取", lambda: pool.get_status_dict(fresh=True)),
+        ("單飛合併", lambda: pool.get_shared_status_dict(fresh=True)),
+    ):
+        client.reset_counters()
+        await run(label, call, lambda: f"{client.frame_count} 幀")
+    await pool.disconnect()
+
+    monitor = TemperatureMonitorService(simulation_mode=True)
+    for i in range(SENSORS):
+        monitor.sensors[f"tank{i}"] = SlowSensor(f"tank{i}", base_temp=26.0)
+    reads = {"count": 0}
+    read_all_sensors = monitor.read_all_sensors
+
+    async def counted():
+        reads["count"] += 1
+        return await read_all_sensors()
+
+    monitor.read_all_sensors = counted
+
+    print("\n[感測器讀數]")
+    for label, call in (
+        ("各自讀取", monitor.read_all_sensors),
+        ("單飛合併", monitor.read_all_sensors_shared),
+    ):
+        reads["count"] = 0
+        await run(label, call, lambda: f"{reads['count']} 次讀取")
+
+    print(f"\n單飛統計: {get_single_flight().get_status_dict()['keys']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""SQLite 效能設定基準測試：並發寫入下的讀取延遲
+運行方式: uv run python benchmarks/bench_sqlite_profile.py
+
+分別以 SQLite 預設值（rollback journal）與效能設定（WAL 等 PRAGMA）建立暫存資料庫，
+一個執行緒持續寫入溫度記錄（模擬輪詢），多個執行緒同時讀取歷史（模擬儀表板），
+比較讀取延遲與寫入吞吐。
+"""
+
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+from database import create_db_engine, read_sqlite_pragmas  # noqa: E402
+from models import Tank, TemperatureLog  # noqa: E402
+
+SEED_ROWS = 50_000
+TANKS = 4
+DURATION_S = 5.0
+READERS = 4
+WRITE_BATCH = 10
+HISTORY_LIMIT = 500
+
+
+def seed(engine):
+    SQLModel.metadata.create_all(engine)
+    start = datetime.utcnow() - timedelta(seconds=SEED_ROWS)
+    with Session(engine) as session:
+        for tank_id in range(1, TANKS + 1):
+            session.add(Tank(id=tank_id, name=f"tank{tank_id}"))
+        session.commit()
+        session.execute(insert(TemperatureLog), [
+            {
+                "tank_id": i % TANKS + 1,
+                "temperature": 25 + (i % 50) / 10,
+                "sensor_id": f"sensor{i % TANKS}",
+                "timestamp": start + timedelta(seconds=i),
+            }
+            for i in range(SEED_ROWS)
+        ])
+        session.commit()
+
+
+def writer(engine, stop: threading.Event, result: dict):
+    """持續寫入，每批 WRITE_BATCH 筆一次 commit"""
+    while not stop.is_set():
+        try:
+            with Session(engine) as session:
+                session.execute(insert(TemperatureLog), [
+                    {"tank_id": i % TANKS + 1, "temperature": 26.0, "timestamp": datetime.utcnow()}
+                    for i in range(WRITE_BATCH)
+                ])
+                session.commit()
+            result["rows"] += WRITE_BATCH
+        except OperationalError:
+            result["errors"] += 1
+
+
+def reader(engine, tank_id: int, stop: threading.Event, latencies: list, result: dict):
+    """持續讀取最近的歷史記錄"""
+    statement = (
+        select(TemperatureLog)
+        .where(TemperatureLog.tank_id == tank_id)
+        .order_by(TemperatureLog.timestamp.desc())
+        .limit(HISTORY_LIMIT)
+    )
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                session.exec(statement).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            result["errors"] += 1
+
+
+def run_profile(tuning: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{tmp}/bench.db", tuning=tuning)
+        seed(engine)
+
+        stop = threading.Event()
+        write_result = {"rows": 0, "errors": 0}
+        read_result = {"errors": 0}
+        latencies: list = []
+
+        threads = [threading.Thread(target=writer, args=(engine, stop, write_result))]
+        threads += [
+            threading.Thread(
+                target=reader, args=(engine, i % TANKS + 1, stop, latencies, read_result)
+            )
+            for i in range(READERS)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(DURATION_S)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        pragmas = read_sqlite_pragmas(engine)
+        engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    name = "tuned" if tuning else "default"
+    print(
+        f"   {name:>8s} {pragmas['journal_mode']:>8s} {len(latencies) / DURATION_S:>9.0f} "
+        f"{statistics.median(latencies) if latencies else 0:>9.2f} {p99:>9.2f} "
+        f"{latencies[-1] if latencies else 0:>9.2f} "
+        f"{write_result['rows'] / DURATION_S:>10.0f} "
+        f"{write_result['errors'] + read_result['errors']:>6d}"
+    )
+
+
+def main():
+    print("=" * 78)
+    print(
+        f"SQLite 效能設定基準測試（{SEED_ROWS} 筆種子資料，1 寫入 + {READERS} 讀取執行緒，"
+        f"{DURATION_S:.0f} 秒）"
+    )
+    print("=" * 78)
+    print(
+        f"   {'設定':>8s} {'journal':>8s} {'讀取/s':>9s} {'p50 ms':>9s} {'p99 ms':>9s} "
+        f"{'max ms':>9s} {'寫入筆/s':>10s} {'錯誤':>6s}"
+    )
+
+    for tuning in (False, True):
+        run_profile(tuning)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""溫度記錄串流匯出基準測試：記憶體用量與匯出筆數無關
+運行方式: uv run python benchmarks/bench_temperature_export.py [筆數，默認 1000000]
+
+建立暫存資料庫並寫入大量記錄，以不同時間範圍（10% / 50% / 100% 的記錄）
+匯出 CSV / NDJSON / Parquet，量測吞吐與 tracemalloc 記錄的峰值記憶體。
+作為對照，另量測一次載入整個範圍的 ORM 物件（舊的 history 查詢方式）的峰值記憶體。
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMP_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session, select  # noqa: E402
+from database import create_db_and_tables, engine  # noqa: E402
+from models import TemperatureLog  # noqa: E402
+from services.temperature_export import check_export_format, export_temperature_logs  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+TANKS = 8
+INTERVAL_S = 10  # 每個飼養箱每 10 秒一筆
+FRACTIONS = (0.1, 0.5, 1.0)
+
+
+def session_factory():
+    return Session(engine)
+
+
+def seed() -> datetime:
+    """寫入 ROWS 筆記錄，返回最早一筆的時間"""
+    create_db_and_tables()
+    engine.dispose()
+    conn = sqlite3.connect(DB_PATH)
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO tank (id, name, target_temp_min, target_temp_max, active, created_at, "
+        "updated_at) VALUES (?, ?, 26, 30, 1, ?, ?)",
+        [(i, f"tank{i}", now, now) for i in range(1, TANKS + 1)],
+    )
+    first = now - timedelta(seconds=ROWS // TANKS * INTERVAL_S)
+
+    def rows():
+        for i in range(ROWS):
+            timestamp = first + timedelta(seconds=i // TANKS * INTERVAL_S)
+            yield (i % TANKS + 1, 25 + (i % 50) / 10, 60.0, f"sensor{i % TANKS + 1}",
+                   timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    conn.executemany(
+        "INSERT INTO temperaturelog (tank_id, temperature, humidity, sensor_id, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return first
+
+
+def measure_export(export_format: str, start: datetime):
+    tracemalloc.start()
+    began = time.perf_counter()
+    total_bytes = 0
+    for chunk in export_temperature_logs(export_format, session_factory, start=start):
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, total_bytes, peak
+
+
+def measure_load_all(start: datetime):
+    tracemalloc.start()
+    began = time.perf_counter()
+    with Session(engine) as session:
+        logs = session.exec(select(TemperatureLog).where(TemperatureLog.timestamp >= start)).all()
+        count = len(logs)
+        del logs
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, count, peak
+
+
+def main():
+    print("=" * 72)
+    print(f"溫度記錄串流匯出基準測試（{ROWS:,} 筆，{TANKS} 個飼養箱）")
+    print("=" * 72)
+
+    began = time.perf_counter()
+    first = seed()
+    span = timedelta(seconds=ROWS // TANKS * INTERVAL_S)
+    print(f"寫入種子資料耗時 {time.perf_counter() - began:.1f} 秒\n")
+
+    formats = ["csv", "ndjson"]
+    try:
+        check_export_format("parquet")
+        formats.append("parquet")
+    except ValueError as e:
+        print(f"略過 Parquet：{e}\n")
+
+    print(f"   {'格式':>8s} {'筆數':>10s} {'秒':>8s} {'筆/秒':>10s} {'MB':>8s} {'峰值 MB':>8s}")
+    for fraction in FRACTIONS:
+        start = first + span * (1 - fraction)
+        rows = int(ROWS * fraction)
+        for export_format in formats:
+            elapsed, total_bytes, peak = measure_export(export_format, start)
+            print(
+                f"   {export_format:>8s} {rows:>10,d} {elapsed:>8.2f} {rows / elapsed:>10,.0f} "
+                f"{total_bytes / 1e6:>8.1f} {peak / 1e6:>8.1f}"
+            )
+
+    print("\n對照：一次載入整個範圍的 ORM 物件")
+    for fraction in FRACTIONS[:2]:
+        start = first + span * (1 - fraction)
+        elapsed, count, peak = measure_load_all(start)
+        print(f"   {'ORM':>8s} {count:>10,d} {elapsed:>8.2f} {'':>10s} {'':>8s} {peak / 1e6:>8.1f}")
+
+    engine.dispose()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""溫度記錄分區基準測試：單一大表 vs 月份分區
+運行方式: uv run python benchmarks/bench_temperature_partitions.py [筆數，默認 2000000]
+
+建立暫存資料庫，將 6 個月的記錄寫入舊的單一 temperaturelog 表，量測：
+  - 最近 24 小時歷史、最近 7 天統計、每個飼養箱最新讀數的查詢延遲
+  - 依保留策略刪除最舊一個月時的耗時，以及刪除期間同時寫入的批次延遲
+接著把剩下的記錄搬到月份分區表，以相同的查詢再量測一次，並整表 DROP 下一個月份。
+"""
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMP_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session  # noqa: E402
+from database import create_db_and_tables, engine  # noqa: E402
+from services.retention import RetentionService  # noqa: E402
+from services.temperature_partitions import (  # noqa: E402
+    get_temperature_partitions,
+    insert_temperature_rows,
+    next_month,
+    partition_name,
+    query_history,
+    query_latest_by_tank,
+    query_statistics,
+)
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+TANKS = 8
+MONTHS = 6
+ITERATIONS = 20
+INGEST_BATCH = 200  # 與 TEMP_LOG_BATCH_SIZE 預設值相同
+
+
+def seed() -> datetime:
+    """寫入 ROWS 筆記錄到舊表，均勻分佈在最近 MONTHS 個月，返回最早一筆的時間"""
+    create_db_and_tables()
+    engine.dispose()
+    conn = sqlite3.connect(DB_PATH)
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO tank (id, name, target_temp_min, target_temp_max, active, created_at, "
+        "updated_at) VALUES (?, ?, 26, 30, 1, ?, ?)",
+        [(i, f"tank{i}", now, now) for i in range(1, TANKS + 1)],
+    )
+    first = now - timedelta(days=30 * MONTHS)
+    interval = (now - first) / (ROWS // TANKS)
+
+    def rows():
+        for i in range(ROWS):
+            timestamp = first + interval * (i // TANKS)
+            yield (i + 1, i % TANKS + 1, 25 + (i % 50) / 10, 60.0, f"sensor{i % TANKS + 1}",
+                   timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    conn.executemany(
+        "INSERT INTO temperaturelog (id, tank_id, temperature, humidity, sensor_id, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        rows(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return first
+
+
+def move_to_partitions():
+    """把舊表的記錄依月份搬到分區表"""
+    with engine.connect() as conn:
+        months = conn.connection.driver_connection.execute(
+            "SELECT DISTINCT substr(timestamp, 1, 7) FROM temperaturelog"
+        ).fetchall()
+    names = []
+    for (month,) in months:
+        start = datetime.strptime(month, "%Y-%m")
+        names.append((partition_name(start), start, next_month(start)))
+    get_temperature_partitions().ensure(engine, [name for name, _, _ in names])
+
+    with engine.begin() as conn:
+        raw = conn.connection.driver_connection
+        for name, start, end in names:
+            raw.execute(
+                f"INSERT INTO {name} SELECT id, tank_id, temperature, humidity, sensor_id, "
+                f"timestamp FROM temperaturelog WHERE timestamp >= ? AND timestamp < ?",
+                (start.strftime("%Y-%m-%d %H:%M:%S.%f"), end.strftime("%Y-%m-%d %H:%M:%S.%f")),
+            )
+        raw.execute("DELETE FROM temperaturelog")
+    with engine.begin() as conn:
+        conn.connection.driver_connection.execute("ANALYZE")
+
+
+def median_ms(call) -> float:
+    latencies = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)[len(latencies) // 2]
+
+
+def measure_queries(label: str):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        queries = {
+            "history 24h": lambda: query_history(session, 1, now - timedelta(hours=24), 1000),
+            "stats 7d": lambda: query_statistics(session, 1, now - timedelta(days=7)),
+            "latest by tank": lambda: query_latest_by_tank(session),
+        }
+        for name, call in queries.items():
+            print(f"   {label:>6s} {name:>16s} {median_ms(call):>10.2f} ms")
+
+
+def ingest_batch():
+    """模擬寫入器的一次批量寫入（寫入當月分區或舊表）
+
+    寫入不存在的飼養箱，不影響之後量測的查詢結果。
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"tank_id": TANKS + 1, "temperature": 26.0, "humidity": 60.0,
+         "sensor_id": "bench", "timestamp": now}
+        for _ in range(INGEST_BATCH)
+    ]
+    with Session(engine) as session:
+        insert_temperature_rows(session, rows)
+        session.commit()
+
+
+async def measure_retention(label: str, cutoff: datetime):
+    """刪除 cutoff 之前的記錄，同時每 50ms 寫入一批，記錄寫入延遲"""
+    service = RetentionService()
+    latencies = []
+    done = asyncio.Event()
+
+    async def ingest():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.to_thread(ingest_batch)
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.05)
+
+    writer = asyncio.create_task(ingest())
+    report = await service.purge("temperaturelog", cutoff)
+    done.set()
+    await writer
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0
+    print(
+        f"   {label:>6s} 刪除 {report['deleted']:>9,d} 筆 + 整表 {len(report['dropped_partitions'])} 個分區，"
+        f"{report['seconds']:>7.2f} 秒；同時寫入 {len(latencies)} 批，"
+        f"p99 {p99:.1f} ms，最大 {max(latencies, default=0):.1f} ms"
+    )
+
+
+def main():
+    print("=" * 72)
+    print(f"溫度記錄分區基準測試（{ROWS:,} 筆，{TANKS} 個飼養箱，{MONTHS} 個月）")
+    print("=" * 72)
+
+    began = time.perf_counter()
+    first = seed()
+    print(f"寫入種子資料耗時 {time.perf_counter() - began:.1f} 秒\n")
+
+    from config import settings
+
+    # 單一表：分批刪除最舊的一個完整月份（含之前不足一個月的部分）
+    settings.temp_log_partitioning = False
+    cutoff = next_month(next_month(first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)))
+    measure_queries("單一表")
+    asyncio.run(measure_retention("單一表", cutoff))
+
+    # 分區：剩下的記錄搬到月份分區，整表刪除下一個月份
+    began = time.perf_counter()
+    move_to_partitions()
+    print(f"\n搬移到月份分區耗時 {time.perf_counter() - began:.1f} 秒\n")
+
+    settings.temp_log_partitioning = True
+    measure_queries("分區")
+    asyncio.run(measure_retention("分區", next_month(cutoff)))
+
+    engine.dispose()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
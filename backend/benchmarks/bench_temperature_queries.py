@@ -0,0 +1,162 @@
+"""溫度記錄查詢基準測試：單欄索引 vs (tank_id, timestamp) 複合索引
+運行方式: uv run python benchmarks/bench_temperature_queries.py [筆數，默認 2000000]
+
+以舊 schema（tank_id、timestamp 各自的單欄索引）建立暫存資料庫並寫入大量記錄，
+量測 history / latest / statistics 路由的延遲；接著執行 ensure_schema_compatibility
+的索引遷移，再量測一次。最後一個飼養箱在資料期間中途停止回報（模擬停用的飼養箱），
+單欄索引下查詢其最新記錄需掃描大段時間索引。
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+TMP_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(TMP_DIR, "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["DEBUG"] = "false"
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlmodel import Session  # noqa: E402
+from database import engine, ensure_schema_compatibility  # noqa: E402
+from routers.temperature import (  # noqa: E402
+    get_latest_temperature,
+    get_temperature_history,
+    get_temperature_statistics,
+)
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+TANKS = 8
+INTERVAL_S = 30  # 每個飼養箱每 30 秒一筆
+ITERATIONS = 50
+
+LEGACY_SCHEMA = """
+CREATE TABLE tank (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR,
+    image_url VARCHAR, target_temp_min FLOAT NOT NULL, target_temp_max FLOAT NOT NULL,
+    target_humidity_min FLOAT, target_humidity_max FLOAT, active BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+);
+CREATE TABLE temperaturelog (
+    id INTEGER NOT NULL PRIMARY KEY, tank_id INTEGER NOT NULL REFERENCES tank (id),
+    temperature FLOAT NOT NULL, humidity FLOAT, sensor_id VARCHAR, timestamp DATETIME NOT NULL
+);
+CREATE INDEX ix_temperaturelog_tank_id ON temperaturelog (tank_id);
+CREATE INDEX ix_temperaturelog_timestamp ON temperaturelog (timestamp);
+"""
+
+
+def seed():
+    """以舊 schema 寫入 ROWS 筆記錄，時間由現在往回推"""
+    conn = sqlite3.connect(DB_PATH)
+    conn.executescript(LEGACY_SCHEMA)
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO tank VALUES (?, ?, NULL, NULL, 26, 30, NULL, NULL, 1, ?, ?)",
+        [(i, f"tank{i}", now, now) for i in range(1, TANKS + 1)],
+    )
+
+    def rows():
+        for i in range(ROWS):
+            tank_id = i % TANKS + 1
+            if tank_id == TANKS and i > ROWS // 2:
+                continue
+            timestamp = now - timedelta(seconds=(ROWS - i) // TANKS * INTERVAL_S)
+            yield (tank_id, 25 + (i % 50) / 10, None, f"sensor{tank_id}",
+                   timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+
+    conn.executemany(
+        "INSERT INTO temperaturelog (tank_id, temperature, humidity, sensor_id, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(label):
+    active_tanks = list(range(1, TANKS))
+    queries = {
+        "history 24h": (
+            active_tanks,
+            lambda s, t: get_temperature_history(
+                t, session=s, hours=24, limit=1000, resolution="raw"
+            ),
+        ),
+        "history 7d": (
+            active_tanks,
+            lambda s, t: get_temperature_history(
+                t, session=s, hours=168, limit=1000, resolution="raw"
+            ),
+        ),
+        "latest": (active_tanks, lambda s, t: get_latest_temperature(t, session=s)),
+        "latest 停用": ([TANKS], lambda s, t: get_latest_temperature(t, session=s)),
+        "statistics 24h": (
+            active_tanks,
+            lambda s, t: get_temperature_statistics(
+                t, session=s, hours=24, stddev=False, percentiles=None
+            ),
+        ),
+        "statistics 7d+p": (
+            active_tanks,
+            lambda s, t: get_temperature_statistics(
+                t, session=s, hours=168, stddev=True, percentiles="50,95,99"
+            ),
+        ),
+    }
+
+    for name, (tanks, query) in queries.items():
+        latencies = []
+        with Session(engine) as session:
+            query(session, tanks[0])  # 預熱頁快取
+            for _ in range(ITERATIONS):
+                tank_id = random.choice(tanks)
+                start = time.perf_counter()
+                query(session, tank_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+                session.expunge_all()
+        print(
+            f"   {label:>8s} {name:>16s} {percentile(latencies, 0.5):>10.2f} "
+            f"{percentile(latencies, 0.99):>10.2f}"
+        )
+
+
+def main():
+    print("=" * 60)
+    print(f"溫度記錄查詢基準測試（{ROWS:,} 筆，{TANKS} 個飼養箱，{ITERATIONS} 次）")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    seed()
+    print(f"寫入種子資料耗時 {time.perf_counter() - start:.1f} 秒\n")
+    print(f"   {'索引':>8s} {'查詢':>16s} {'p50 ms':>10s} {'p99 ms':>10s}")
+
+    measure("單欄")
+
+    start = time.perf_counter()
+    ensure_schema_compatibility()
+    migration_s = time.perf_counter() - start
+    engine.dispose()
+
+    measure("複合")
+    print(f"\n索引遷移耗時 {migration_s:.1f} 秒")
+
+    engine.dispose()
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
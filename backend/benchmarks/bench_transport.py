@@ -0,0 +1,155 @@
+"""Modbus 傳輸後端基準測試（pty 迴路）
+運行方式: uv run python benchmarks/bench_transport.py  (僅限 Linux/macOS)
+
+建立一對 pty，在主端執行最小化的 Modbus RTU 從機替身（模擬 16CH 繼電器板），
+控制器透過從端連線，分別以 executor 與 async 後端量測每秒操作數。
+pty 不會依波特率限速，結果反映的是軟體端每次請求的額外開銷。
+
+並發讀取以 16 個不同通道的 fresh 單線圈讀取為一批同時送出：相同的排隊中讀取會被
+_deduplicated_read 合併成一次匯流排請求，不同通道才能讓每個請求各自經過傳輸層。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tty
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from services.modbus_controller import ModbusRelayController  # noqa: E402
+
+OPERATIONS = 300
+BAUDRATE = 115200
+
+
+def crc16(data: bytes) -> bytes:
+    """Modbus CRC16（低位元組在前）"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return bytes([crc & 0xFF, crc >> 8])
+
+
+class RelayBoardStandIn(threading.Thread):
+    """Modbus RTU 從機替身：支援功能碼 01 / 05 / 0F"""
+
+    def __init__(self, fd: int, device_address: int = 1):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.device_address = device_address
+        self.coils = [False] * 16
+        self.frames = 0
+        self._buffer = b""
+
+    def _read(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            self._buffer += os.read(self.fd, 256)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def run(self):
+        try:
+            while True:
+                header = self._read(2)
+                function_code = header[1]
+                if function_code == 0x0F:
+                    body = self._read(5)
+                    body += self._read(body[4] + 2)
+                else:
+                    body = self._read(6)
+                self.frames += 1
+                self._handle(header + body)
+        except OSError:
+            pass
+
+    def _handle(self, frame: bytes):
+        address, function_code = frame[0], frame[1]
+        if address != self.device_address:
+            return
+
+        start = int.from_bytes(frame[2:4], "big")
+        if function_code == 0x01:
+            count = int.from_bytes(frame[4:6], "big")
+            bits = self.coils[start:start + count]
+            data = bytearray((count + 7) // 8)
+            for i, bit in enumerate(bits):
+                if bit:
+                    data[i // 8] |= 1 << (i % 8)
+            pdu = bytes([address, function_code, len(data)]) + bytes(data)
+        elif function_code == 0x05:
+            self.coils[start] = frame[4:6] == b"\xff\x00"
+            pdu = frame[:6]
+        elif function_code == 0x0F:
+            count = int.from_bytes(frame[4:6], "big")
+            data = frame[7:7 + frame[6]]
+            for i in range(count):
+                self.coils[start + i] = bool(data[i // 8] & (1 << (i % 8)))
+            pdu = frame[:6]
+        else:
+            pdu = bytes([address, function_code | 0x80, 0x01])
+
+        os.write(self.fd, pdu + crc16(pdu))
+
+
+async def bench_backend(backend: str, port: str):
+    settings.modbus_transport = backend
+    controller = ModbusRelayController(port=port, baudrate=BAUDRATE)
+    controller.write_coalesce_ms = 0
+    controller.reconcile_interval = 0
+
+    if not await controller.connect():
+        print(f"   [{backend}] 無法連線到 {port}")
+        return
+
+    start = time.perf_counter()
+    for _ in range(OPERATIONS):
+        await controller.read_all_relays()
+    read_rate = OPERATIONS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(OPERATIONS):
+        await controller.set_relay(i % 16, i % 2 == 0)
+    write_rate = OPERATIONS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(OPERATIONS // 16):
+        await asyncio.gather(
+            *(controller.read_relay_status(channel, fresh=True) for channel in range(16))
+        )
+    burst_rate = OPERATIONS // 16 * 16 / (time.perf_counter() - start)
+
+    print(
+        f"   {backend:>8s} {read_rate:>12.0f} {write_rate:>12.0f} {burst_rate:>14.0f}"
+    )
+    await controller.disconnect()
+
+
+async def main():
+    logging.disable(logging.INFO)
+
+    print("=" * 60)
+    print(f"Modbus 傳輸後端基準測試（pty 迴路，{BAUDRATE} baud，{OPERATIONS} 次操作）")
+    print("=" * 60)
+    print(f"   {'後端':>8s} {'讀取 ops/s':>12s} {'寫入 ops/s':>12s} {'並發讀取 ops/s':>14s}")
+
+    for backend in ("executor", "async"):
+        master_fd, slave_fd = os.openpty()
+        tty.setraw(master_fd)
+        tty.setraw(slave_fd)
+        RelayBoardStandIn(master_fd).start()
+
+        await bench_backend(backend, os.ttyname(slave_fd))
+
+        os.close(slave_fd)
+        os.close(master_fd)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
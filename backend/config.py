@@ -1,5 +1,5 @@
 """應用配置"""
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -14,6 +14,15 @@ class Settings(BaseSettings):
     
     # 資料庫
     database_url: str = "sqlite:///./reptile_care.db"
+    # SQLite 效能設定（每個連線建立時以 PRAGMA 套用）
+    sqlite_tuning: bool = True  # False 時使用 SQLite 預設值（rollback journal）
+    sqlite_journal_mode: str = "WAL"  # WAL 讓讀取不被寫入阻塞
+    sqlite_synchronous: str = "NORMAL"  # WAL 下 NORMAL 安全且省去每次 commit 的 fsync
+    sqlite_cache_size: int = -16000  # 頁快取，負數為 KiB（約 16 MB）
+    sqlite_mmap_size: int = 67108864  # 記憶體映射 I/O 大小（位元組），0 表示停用
+    sqlite_temp_store: str = "MEMORY"  # 暫存表與排序放在記憶體
+    sqlite_busy_timeout: int = 5000  # 資料庫鎖定時等待的毫秒數
+    sqlite_pool_size: int = 5  # 連線池大小
     
     # Modbus RTU 配置
     modbus_port: str = "COM3"
@@ -23,6 +32,23 @@ class Settings(BaseSettings):
     modbus_bytesize: int = 8
     modbus_timeout: int = 3
     modbus_device_address: int = 1
+    # 多塊繼電器板（JSON 列表），未設定時只使用上方的單一設備
+    # 例: [{"port": "/dev/ttyUSB0", "device_address": 1}, {"port": "/dev/ttyUSB1", "device_address": 2}]
+    modbus_boards: List[Dict] = []
+    modbus_transport: str = "executor"  # executor=同步客戶端+執行緒池, async=AsyncModbusSerialClient
+    modbus_inter_frame_delay_ms: float = 0  # RTU 幀間隔（毫秒），0 表示依波特率自動計算
+    modbus_write_coalesce_ms: int = 10  # 寫入合併窗口（毫秒），0 表示同一輪事件循環內合併
+    modbus_reconcile_interval: int = 30  # 線圈映像背景校正間隔（秒），0 表示停用
+    modbus_firmware_commands: bool = True  # 使用板載翻轉／閃開閃閉／全部控制指令，不支援的板設為 false
+    modbus_baud_autodetect: bool = True  # 連線後讀不到板子時依序探測各波特率（板子已切換而設定未更新）
+    modbus_baud_probe_frames: int = 20  # 切換波特率時，每個波特率量測吞吐量送出的幀數
+    modbus_adaptive_timeout: bool = True  # 依實測回應時間 p99 調整每次請求的逾時（上限為 modbus_timeout）
+    modbus_timeout_min_ms: int = 200  # 自適應逾時下限（毫秒）
+    modbus_timeout_multiplier: float = 3.0  # 自適應逾時 = 回應時間 p99 × 此倍數
+    modbus_circuit_failures: int = 3  # 連續無回應次數達此值時斷路
+    modbus_circuit_open_seconds: float = 5  # 斷路後多久半開探測（探測失敗時加倍，最多 60 秒）
+    modbus_priority_aging_ms: int = 500  # 排隊請求每等待此毫秒數提升一個優先等級（0 表示不老化）
+    single_flight_ttl_ms: int = 500  # 硬件狀態／感測器讀取結果共用時間（毫秒），0 表示只合併同時進行的讀取
     
     # 繼電器通道配置
     relay_ch0: str = "加熱燈1"
@@ -44,9 +70,40 @@ class Settings(BaseSettings):
     
     # 溫度監控
     temp_poll_interval: int = 60
+    temp_read_concurrency: int = 8  # 同時讀取的感測器數量上限
+    temp_sensor_timeout: float = 2.0  # 單個感測器讀取逾時（秒）
+    temp_log_flush_interval: float = 5.0  # 溫度記錄批次寫入間隔（秒）
+    temp_log_batch_size: int = 200  # 累積多少筆即寫入
+    temp_log_queue_size: int = 5000  # 寫入佇列上限，超過時輪詢等待（背壓）
+    temp_log_flush_retries: int = 3  # 批次寫入失敗（例如 database is locked）時的重試次數
+    temp_log_retry_backoff: float = 0.5  # 第一次重試前的等待（秒），之後每次加倍
+    temp_log_partitioning: bool = True  # 溫度原始記錄依月份寫入各自的分區表
+    temp_history_max_points: int = 1000  # 歷史查詢自動選擇解析度時的點數上限
+    temp_export_page_size: int = 5000  # 匯出時每次查詢的筆數
     temp_warning_low: float = 20.0
     temp_warning_high: float = 35.0
     
+    # 歷史資料保留（0 表示永久保留）
+    retention_temperature_days: int = 0  # 溫度原始記錄保留天數（降採樣彙總不受影響）
+    retention_event_days: int = 0  # 事件記錄保留天數
+    retention_rollup_1m_days: int = 7  # 1 分鐘彙總保留天數（自動選擇解析度時只用於 16 小時內的範圍）
+    retention_rollup_5m_days: int = 30  # 5 分鐘彙總保留天數
+    retention_rollup_1h_days: int = 365  # 1 小時彙總保留天數
+    retention_rollup_1d_days: int = 0  # 1 天彙總保留天數
+    retention_interval_hours: float = 6  # 背景保留任務執行間隔（小時）
+    retention_chunk_size: int = 5000  # 每批刪除筆數
+    retention_chunk_pause_ms: int = 50  # 批次之間暫停的毫秒數，讓寫入取得資料庫鎖
+    
+    # 事件統計
+    event_counters: bool = True  # 事件寫入時累加每小時計數表，統計不需掃描事件記錄
+    
+    # WebSocket 推送
+    websocket_send_queue_size: int = 256  # 每個連接的發送佇列上限
+    websocket_slow_client_policy: str = "drop_oldest"  # 佇列滿時: drop_oldest=丟棄最舊訊息, disconnect=斷開連接
+    websocket_log_buffer_size: int = 2000  # 日誌環形緩衝區筆數
+    websocket_log_batch_ms: int = 100  # 日誌批次推送間隔（毫秒）
+    websocket_log_replay: int = 200  # 新的日誌連接補送最近幾筆記錄
+    
     # 安全設定
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
@@ -59,6 +116,12 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
     
+    def get_modbus_boards(self) -> List[Dict]:
+        """取得所有繼電器板配置"""
+        if not self.modbus_boards:
+            return [{"port": self.modbus_port, "device_address": self.modbus_device_address}]
+        return self.modbus_boards
+
     def get_relay_channels(self) -> dict:
         """取得所有繼電器通道配置"""
         return {
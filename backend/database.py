@@ -1,16 +1,97 @@
 """資料庫連接與初始化"""
+from typing import Dict, Optional
 from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy import text
+from sqlalchemy import event, text
+from sqlalchemy.pool import QueuePool, StaticPool
 from config import settings
 
-# 建立資料庫引擎
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},  # SQLite 需要
-    echo=settings.debug
+# 回報用的 PRAGMA 列表
+REPORTED_PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
 )
 
 
+def get_sqlite_pragmas() -> Dict[str, object]:
+    """依設定產生 SQLite 效能 PRAGMA（順序即套用順序）"""
+    return {
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "cache_size": settings.sqlite_cache_size,
+        "mmap_size": settings.sqlite_mmap_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+
+def is_memory_database(database_url: str) -> bool:
+    return database_url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_url
+
+
+def create_db_engine(database_url: str, tuning: Optional[bool] = None, echo: bool = False):
+    """建立資料庫引擎
+
+    SQLite 檔案資料庫使用 QueuePool 重用連線，每個新連線建立時套用效能 PRAGMA；
+    記憶體資料庫只能共用同一個連線（StaticPool）。
+
+    Args:
+        database_url: 資料庫 URL
+        tuning: 是否套用效能 PRAGMA，默認使用 settings.sqlite_tuning
+        echo: 是否輸出 SQL
+    """
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, echo=echo)
+
+    if tuning is None:
+        tuning = settings.sqlite_tuning
+
+    if is_memory_database(database_url):
+        pool_args = {"poolclass": StaticPool}
+    else:
+        pool_args = {
+            "poolclass": QueuePool,
+            "pool_size": settings.sqlite_pool_size,
+            "max_overflow": settings.sqlite_pool_size * 2,
+        }
+
+    db_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},  # SQLite 需要
+        echo=echo,
+        **pool_args
+    )
+
+    if tuning:
+        pragmas = get_sqlite_pragmas()
+
+        @event.listens_for(db_engine, "connect")
+        def apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return db_engine
+
+
+def read_sqlite_pragmas(db_engine=None) -> Dict[str, object]:
+    """讀取目前連線實際生效的 PRAGMA 值"""
+    db_engine = db_engine or engine
+    with db_engine.connect() as conn:
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in REPORTED_PRAGMAS
+        }
+
+
+# 建立資料庫引擎
+engine = create_db_engine(settings.database_url, echo=settings.debug)
+
+
 def create_db_and_tables():
     """建立資料庫表格"""
     SQLModel.metadata.create_all(engine)
@@ -26,12 +107,41 @@ def ensure_schema_compatibility():
     with engine.begin() as conn:
         table_info = conn.execute(text("PRAGMA table_info(tank)")).fetchall()
 
-        if not table_info:
-            return
+        if table_info:
+            columns = {row[1] for row in table_info}
+            if "image_url" not in columns:
+                conn.execute(text("ALTER TABLE tank ADD COLUMN image_url TEXT"))
+
+        table_info = conn.execute(text("PRAGMA table_info(relaychannel)")).fetchall()
+
+        if table_info:
+            columns = {row[1] for row in table_info}
+            if "device_address" not in columns:
+                conn.execute(text("ALTER TABLE relaychannel ADD COLUMN device_address INTEGER"))
+
+        # 溫度記錄改用 (tank_id, timestamp) 複合索引，取代單欄 tank_id 索引
+        table_info = conn.execute(text("PRAGMA table_info(temperaturelog)")).fetchall()
+        index_names = {
+            row[1] for row in conn.execute(text("PRAGMA index_list(temperaturelog)")).fetchall()
+        }
+        if table_info and "ix_temperaturelog_tank_timestamp" not in index_names:
+            conn.execute(text(
+                "CREATE INDEX ix_temperaturelog_tank_timestamp "
+                "ON temperaturelog (tank_id, timestamp, temperature)"
+            ))
+            conn.execute(text("DROP INDEX IF EXISTS ix_temperaturelog_tank_id"))
+            conn.execute(text("ANALYZE temperaturelog"))
 
-        columns = {row[1] for row in table_info}
-        if "image_url" not in columns:
-            conn.execute(text("ALTER TABLE tank ADD COLUMN image_url TEXT"))
+        # 告警查詢的 (severity, timestamp) 複合索引
+        table_info = conn.execute(text("PRAGMA table_info(eventlog)")).fetchall()
+        index_names = {
+            row[1] for row in conn.execute(text("PRAGMA index_list(eventlog)")).fetchall()
+        }
+        if table_info and "ix_eventlog_severity_timestamp" not in index_names:
+            conn.execute(text(
+                "CREATE INDEX ix_eventlog_severity_timestamp ON eventlog (severity, timestamp)"
+            ))
+            conn.execute(text("ANALYZE eventlog"))
 
 
 def get_session():
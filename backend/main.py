@@ -1,6 +1,8 @@
 """FastAPI 主應用程式"""
 
+import asyncio
 import logging
+import threading
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -13,7 +15,13 @@ from models import RelayChannel, Tank
 from services.modbus_controller import initialize_controller, shutdown_controller
 from services.temperature_monitor import get_monitor_service
 from services.scheduler import get_scheduler_service
-from routers import relays, temperature, tanks, schedules, events
+from services.temperature_log_writer import get_temperature_log_writer
+from services.temperature_rollup import prepare_backfill, backfill_rollups
+from services.live_state import get_live_hub, install_event_hooks
+from services.config_cache import install_config_cache_hooks
+from services.event_counters import install_event_counter_hooks, rebuild_event_counters
+from services.retention import get_retention_service
+from routers import relays, temperature, tanks, schedules, events, dashboard, live
 from routers import dev_tools
 from sqlmodel import Session
 
@@ -32,6 +40,12 @@ async def lifespan(app: FastAPI):
     logger.info(f"啟動 {settings.app_name} v{settings.app_version}")
     logger.info("=" * 60)
 
+    # 即時狀態推送（同步路由與執行緒池中的變化也經由此事件循環推送）
+    get_live_hub().bind_loop(asyncio.get_running_loop())
+    install_event_hooks()
+    # 配置快取：任何 Session 提交 Tank / RelayChannel / Schedule 變更後失效
+    install_config_cache_hooks()
+
     # 創建資料庫表
     logger.info("初始化資料庫...")
     create_db_and_tables()
@@ -40,11 +54,32 @@ async def lifespan(app: FastAPI):
     with Session(engine) as session:
         await initialize_default_data(session)
 
+    # 事件計數：先註冊寫入累加，再以原始記錄重算統計視窗內的計數
+    install_event_counter_hooks()
+    await asyncio.to_thread(rebuild_event_counters, lambda: Session(engine))
+
     # 初始化 Modbus 控制器（模擬模式）
     logger.info("初始化 Modbus 控制器...")
     simulation_mode = False  # 設為 True 在無硬件時測試
     await initialize_controller(simulation_mode=simulation_mode)
 
+    def session_factory():
+        return Session(engine)
+
+    # 舊溫度記錄的彙總補算範圍須在寫入服務啟動前記錄，之後的記錄由寫入服務即時彙總
+    rollup_backfill_stop = threading.Event()
+    rollup_backfill = prepare_backfill(session_factory)
+    if rollup_backfill:
+        logger.info("背景補算溫度彙總...")
+        asyncio.create_task(asyncio.to_thread(
+            backfill_rollups, session_factory, rollup_backfill, stop_event=rollup_backfill_stop
+        ))
+
+    # 啟動溫度記錄批次寫入
+    logger.info("啟動溫度記錄寫入服務...")
+    log_writer = get_temperature_log_writer(session_factory)
+    await log_writer.start()
+
     # 啟動溫度監控
     logger.info("啟動溫度監控服務...")
     temp_monitor = get_monitor_service(simulation_mode=simulation_mode)
@@ -52,10 +87,6 @@ async def lifespan(app: FastAPI):
 
     # 啟動排程器
     logger.info("啟動排程系統...")
-
-    def session_factory():
-        return Session(engine)
-
     scheduler = get_scheduler_service(session_factory)
     scheduler.start()
 
@@ -63,9 +94,13 @@ async def lifespan(app: FastAPI):
     with Session(engine) as session:
         await scheduler.load_all_schedules(session)
 
+    # 歷史資料保留
+    retention = get_retention_service(session_factory)
+    await retention.start()
+
     # 設置 WebSocket 日誌
     logger.info("設置 WebSocket 日誌推送...")
-    dev_tools.setup_websocket_logging()
+    await dev_tools.setup_websocket_logging()
 
     logger.info("✓ 系統啟動完成")
 
@@ -73,8 +108,11 @@ async def lifespan(app: FastAPI):
 
     # 關閉服務
     logger.info("關閉系統...")
-    dev_tools.remove_websocket_logging()
+    await dev_tools.remove_websocket_logging()
+    await retention.stop()
+    rollup_backfill_stop.set()
     await temp_monitor.stop()
+    await log_writer.stop()  # 寫入佇列中剩餘的溫度記錄
     scheduler.shutdown()
     await shutdown_controller()
     logger.info("✓ 系統已關閉")
@@ -148,6 +186,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 註冊路由
@@ -157,6 +196,8 @@ app.include_router(tanks.router)
 app.include_router(dev_tools.router)
 app.include_router(schedules.router)
 app.include_router(events.router)
+app.include_router(dashboard.router)
+app.include_router(live.router)
 
 # 前端靜態文件路徑
 FRONTEND_DIST = Path(__file__).parent.parent / "frontend" / "dist"
@@ -237,14 +278,13 @@ def health_check():
 
 
 @app.get("/api/system/status")
-async def get_system_status():
+async def get_system_status(fresh: bool = False):
     """取得系統狀態"""
-    from services.modbus_controller import get_controller
+    from services.relay_pool import get_relay_pool
 
-    controller = get_controller()
     temp_monitor = get_monitor_service()
 
-    controller_status = await controller.get_status_dict()
+    controller_status = await get_relay_pool().get_shared_status_dict(fresh=fresh)
     sensor_status = temp_monitor.get_sensor_status()
 
     return {
@@ -255,6 +295,8 @@ async def get_system_status():
         },
         "modbus_controller": controller_status,
         "temperature_sensors": sensor_status,
+        "temperature_polling": temp_monitor.get_poll_stats(),
+        "temperature_log_writer": get_temperature_log_writer().get_status_dict(),
     }
 
 
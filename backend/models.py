@@ -1,6 +1,7 @@
 """資料庫模型定義"""
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -22,7 +23,8 @@ class Tank(SQLModel, table=True):
 class RelayChannel(SQLModel, table=True):
     """繼電器通道模型"""
     id: Optional[int] = Field(default=None, primary_key=True)
-    channel: int = Field(index=True, ge=0, le=15)  # 0-15
+    channel: int = Field(index=True, ge=0, le=15)  # 0-15（板內通道）
+    device_address: Optional[int] = Field(default=None, index=True)  # Modbus 設備地址，None=預設板
     name: str
     description: Optional[str] = None
     tank_id: Optional[int] = Field(default=None, foreign_key="tank.id")
@@ -64,16 +66,49 @@ class Schedule(SQLModel, table=True):
 
 class TemperatureLog(SQLModel, table=True):
     """溫度記錄模型"""
+    # 歷史/最新/統計查詢皆為「某飼養箱 + 時間範圍」，以複合索引直接定位並依時間排序；
+    # 附帶 temperature 讓統計查詢只需讀索引。tank_id 單欄查詢由此索引的前綴涵蓋。
+    __table_args__ = (
+        Index("ix_temperaturelog_tank_timestamp", "tank_id", "timestamp", "temperature"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    tank_id: int = Field(foreign_key="tank.id", index=True)
+    tank_id: int = Field(foreign_key="tank.id")
     temperature: float
     humidity: Optional[float] = None
     sensor_id: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
+class TemperatureRollup(SQLModel, table=True):
+    """溫度降採樣彙總模型（每個飼養箱、解析度、時間桶一列）"""
+    __table_args__ = (
+        Index(
+            "ix_temperaturerollup_tank_resolution_bucket",
+            "tank_id", "resolution", "bucket_start",
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tank_id: int = Field(foreign_key="tank.id")
+    resolution: str  # 1m / 5m / 1h / 1d
+    bucket_start: datetime
+    count: int = 0
+    temp_min: float
+    temp_max: float
+    temp_sum: float = 0.0
+    humidity_count: int = 0
+    humidity_sum: float = 0.0
+
+
 class EventLog(SQLModel, table=True):
     """事件記錄模型"""
+    # 告警查詢依嚴重性過濾並依時間排序；時間索引本身以 id（rowid）為尾端，涵蓋 (timestamp, id) 游標分頁
+    __table_args__ = (
+        Index("ix_eventlog_severity_timestamp", "severity", "timestamp"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     event_type: str = Field(index=True)  # relay_control, temperature_alert, schedule_run, system_error
     severity: str = "info"  # debug, info, warning, error, critical
@@ -84,6 +119,23 @@ class EventLog(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
+class EventCounter(SQLModel, table=True):
+    """事件計數（每小時、嚴重性、事件類型一列），由事件寫入時累加"""
+    __table_args__ = (
+        Index(
+            "ix_eventcounter_bucket_severity_type",
+            "bucket_start", "severity", "event_type",
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    bucket_start: datetime
+    severity: str
+    event_type: str
+    count: int = 0
+
+
 class SystemStatus(SQLModel, table=True):
     """系統狀態模型"""
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -0,0 +1,120 @@
+"""儀表板相關 API 路由"""
+import hashlib
+import json
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, select, col
+from database import get_session, engine
+from models import EventLog, RelayChannel, Schedule, Tank
+from serializers import alert_to_dict, event_to_dict
+from services.scheduler import get_scheduler_service
+from services.temperature_partitions import query_latest_by_tank
+from services.temperature_rollup import choose_rollup_resolution, query_sparklines
+from datetime import datetime, timedelta
+
+router = APIRouter(prefix="/api/dashboard", tags=["儀表板"])
+
+
+def query_upcoming_runs(session: Session, limit: int) -> List[Dict]:
+    """取得即將執行的排程，附上排程類型與所屬飼養箱"""
+    def session_factory():
+        return Session(engine)
+
+    runs = get_scheduler_service(session_factory).get_upcoming_runs(limit)
+    if not runs:
+        return []
+
+    stmt = (
+        select(Schedule.id, Schedule.schedule_type, RelayChannel.id, RelayChannel.tank_id)
+        .join(RelayChannel, RelayChannel.id == Schedule.relay_channel_id)
+        .where(col(Schedule.id).in_({run["schedule_id"] for run in runs}))
+    )
+    details = {
+        schedule_id: {
+            "schedule_type": schedule_type,
+            "relay_id": relay_id,
+            "tank_id": tank_id,
+        }
+        for schedule_id, schedule_type, relay_id, tank_id in session.exec(stmt).all()
+    }
+
+    return [
+        {**run, **details.get(run["schedule_id"], {})}
+        for run in runs
+    ]
+
+
+def build_snapshot(
+    session: Session, hours: int, sparkline_points: int, limit: int
+) -> Dict:
+    """組合儀表板快照（不含產生時間，內容不變時 ETag 不變）"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    resolution = choose_rollup_resolution(hours, sparkline_points)
+
+    tanks = session.exec(select(Tank)).all()
+    latest = query_latest_by_tank(session)
+    sparklines = query_sparklines(session, resolution, since)
+
+    relays = session.exec(select(RelayChannel)).all()
+
+    alert_cutoff = datetime.utcnow() - timedelta(hours=24)
+    alerts = session.exec(
+        select(EventLog)
+        .where(col(EventLog.severity).in_(["warning", "error", "critical"]))
+        .where(EventLog.timestamp >= alert_cutoff)
+        .order_by(col(EventLog.timestamp).desc())
+        .limit(limit)
+    ).all()
+
+    events = session.exec(
+        select(EventLog).order_by(col(EventLog.timestamp).desc()).limit(limit)
+    ).all()
+
+    return {
+        "tanks": [
+            {
+                **tank.model_dump(),
+                "latest": latest[tank.id].model_dump() if tank.id in latest else None,
+                "sparkline": sparklines.get(tank.id, []),
+            }
+            for tank in tanks
+        ],
+        "sparkline_hours": hours,
+        "sparkline_resolution": resolution,
+        "relays": [relay.model_dump() for relay in relays],
+        "alerts": [alert_to_dict(event, resolved=False) for event in alerts],
+        "events": [event_to_dict(event) for event in events],
+        "upcoming": query_upcoming_runs(session, limit),
+    }
+
+
+def snapshot_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+@router.get("/snapshot")
+def get_dashboard_snapshot(
+    request: Request,
+    session: Session = Depends(get_session),
+    hours: int = Query(24, description="迷你走勢圖涵蓋最近幾小時"),
+    sparkline_points: int = Query(300, description="迷你走勢圖點數上限"),
+    limit: int = Query(6, description="告警、動態與即將執行排程各返回幾筆")
+):
+    """取得儀表板快照
+
+    一次返回飼養箱、最新讀數、降採樣走勢、繼電器、活躍告警、近期動態與即將執行的排程，
+    取代前端每個飼養箱各自請求。支援 ETag / If-None-Match，內容未變時返回 304。
+    """
+    snapshot = build_snapshot(session, hours, sparkline_points, limit)
+    body = json.dumps(
+        jsonable_encoder(snapshot), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = snapshot_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,52 +1,16 @@
 """開發者工具相關 API 路由"""
 import asyncio
 import logging
-from typing import Dict, List
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import Dict, Optional
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from services.modbus_controller import get_controller
+from services.relay_pool import get_relay_pool
 from services.temperature_monitor import get_monitor_service
+from services.log_stream import WebSocketLogHandler, get_log_stream
 
 router = APIRouter(prefix="/api/dev", tags=["開發者工具"])
 
-# WebSocket 連接管理
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self._lock = asyncio.Lock()
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        async with self._lock:
-            self.active_connections.append(websocket)
-        logging.info(f"WebSocket 連接建立，總連接數: {len(self.active_connections)}")
-    
-    async def disconnect(self, websocket: WebSocket):
-        async with self._lock:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-        logging.info(f"WebSocket 連接關閉，總連接數: {len(self.active_connections)}")
-    
-    async def broadcast(self, message: dict):
-        """廣播訊息到所有連接的客戶端"""
-        if not self.active_connections:
-            return
-        
-        disconnected = []
-        async with self._lock:
-            for connection in self.active_connections[:]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    logging.error(f"發送 WebSocket 訊息失敗: {e}")
-                    disconnected.append(connection)
-        
-        # 清理斷開的連接
-        for conn in disconnected:
-            await self.disconnect(conn)
-
-manager = ConnectionManager()
-
 
 class RelayControlRequest(BaseModel):
     channel: int
@@ -57,11 +21,26 @@ class AllRelaysControlRequest(BaseModel):
     state: bool
 
 
+class BaudrateChangeRequest(BaseModel):
+    baudrate: int = 115200
+    port: Optional[str] = None
+
+
+def get_board_controller(device_address: Optional[int]):
+    """依設備地址取得繼電器板控制器"""
+    try:
+        return get_controller(device_address=device_address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/controller/status")
-async def get_controller_status():
-    """取得 Modbus 控制器完整狀態"""
-    controller = get_controller()
-    status = await controller.get_status_dict()
+async def get_controller_status(fresh: bool = False):
+    """取得 Modbus 控制器完整狀態（頂層為預設板，boards 包含所有板）
+
+    - **fresh**: 強制讀取匯流排，不使用線圈映像快取
+    """
+    status = await get_relay_pool().get_shared_status_dict(fresh=fresh)
     
     # 添加更多詳細信息
     relay_states = []
@@ -80,9 +59,11 @@ async def get_controller_status():
 
 
 @router.post("/controller/relay/{channel}")
-async def control_relay(channel: int, request: RelayControlRequest):
+async def control_relay(
+    channel: int, request: RelayControlRequest, device_address: Optional[int] = None
+):
     """控制單個繼電器（開發者模式）"""
-    controller = get_controller()
+    controller = get_board_controller(device_address)
     
     success = await controller.set_relay(request.channel, request.state)
     
@@ -101,15 +82,16 @@ async def control_relay(channel: int, request: RelayControlRequest):
 
 
 @router.post("/controller/relay/{channel}/toggle")
-async def toggle_relay(channel: int):
+async def toggle_relay(channel: int, device_address: Optional[int] = None):
     """切換繼電器狀態"""
-    controller = get_controller()
+    controller = get_board_controller(device_address)
     
     success = await controller.toggle_relay(channel)
     
     if not success:
         return {"success": False, "message": "切換失敗"}
     
+    # 翻轉後的狀態由線圈映像提供，不另外讀取匯流排
     new_state = await controller.read_relay_status(channel)
     
     return {
@@ -122,10 +104,8 @@ async def toggle_relay(channel: int):
 
 @router.post("/controller/all-relays")
 async def control_all_relays(request: AllRelaysControlRequest):
-    """控制所有繼電器"""
-    controller = get_controller()
-    
-    success = await controller.set_all_relays(request.state)
+    """控制所有繼電器板的所有繼電器"""
+    success = await get_relay_pool().set_all_relays(request.state)
     
     if not success:
         return {"success": False, "message": "控制失敗"}
@@ -137,17 +117,53 @@ async def control_all_relays(request: AllRelaysControlRequest):
     }
 
 
+@router.post("/controller/all-relays/toggle")
+async def toggle_all_relays():
+    """翻轉所有繼電器板的所有繼電器"""
+    success = await get_relay_pool().toggle_all_relays()
+    
+    return {
+        "success": success,
+        "message": "所有繼電器已翻轉" if success else "翻轉失敗"
+    }
+
+
+@router.post("/controller/baudrate")
+async def change_baudrate(request: BaudrateChangeRequest):
+    """切換匯流排上所有繼電器板的波特率
+
+    探測目前波特率並量測吞吐量，寫入新波特率後重新開啟串口，以韌體版本讀取驗證；
+    任一板驗證失敗時全部改回原波特率。成功後須同步更新 MODBUS_BAUDRATE
+    （或 MODBUS_BOARDS 的 baudrate），否則重啟後需依賴自動探測。
+    """
+    try:
+        reports = await get_relay_pool().change_baudrate(request.baudrate, port=request.port)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    success = all(report["success"] for report in reports)
+    return {
+        "success": success,
+        "buses": reports,
+        "message": f"已切換到 {request.baudrate} baud" if success else "切換失敗，詳見 buses"
+    }
+
+
 @router.post("/controller/flash/{channel}")
-async def flash_relay(channel: int, duration_ms: int = 500):
+async def flash_relay(
+    channel: int, duration_ms: int = 500, device_address: Optional[int] = None
+):
     """繼電器閃爍測試"""
-    controller = get_controller()
+    controller = get_board_controller(device_address)
     
     success = await controller.flash_relay(channel, duration_ms=duration_ms)
     
+    # 韌體閃爍送出後立即返回，由板子計時恢復
     return {
         "success": success,
         "channel": channel,
         "duration_ms": duration_ms,
+        "firmware": controller.firmware_commands,
         "message": f"通道 {channel} 閃爍 {duration_ms}ms {'完成' if success else '失敗'}"
     }
 
@@ -157,8 +173,8 @@ async def get_raw_sensor_data():
     """取得所有感測器原始數據"""
     monitor = get_monitor_service()
     
-    # 讀取所有感測器
-    readings = await monitor.read_all_sensors()
+    # 讀取所有感測器（同時進行的請求共用一次讀取）
+    readings = await monitor.read_all_sensors_shared()
     
     # 取得感測器狀態
     sensor_status = monitor.get_sensor_status()
@@ -166,7 +182,8 @@ async def get_raw_sensor_data():
     return {
         "current_readings": readings,
         "sensor_status": sensor_status,
-        "total_sensors": len(sensor_status)
+        "total_sensors": len(sensor_status),
+        "poll_stats": monitor.get_poll_stats()
     }
 
 
@@ -180,35 +197,96 @@ async def get_sensors_status():
         "sensors": status,
         "total": len(status),
         "online": sum(1 for s in status if s['status'] == 'online'),
-        "offline": sum(1 for s in status if s['status'] == 'offline')
+        "offline": sum(1 for s in status if s['status'] == 'offline'),
+        "poll_stats": monitor.get_poll_stats()
     }
 
 
 @router.websocket("/logs")
-async def websocket_logs(websocket: WebSocket):
-    """WebSocket 端點：實時日誌推送"""
-    await manager.connect(websocket)
+async def websocket_logs(
+    websocket: WebSocket,
+    level: Optional[str] = None,
+    loggers: Optional[str] = None,
+    replay: Optional[int] = None,
+):
+    """WebSocket 端點：實時日誌推送
+
+    - **level**: 最低日誌等級（DEBUG/INFO/WARNING/ERROR）
+    - **loggers**: 逗號分隔的 logger 名稱，只推送這些 logger（含子 logger）的記錄
+    - **replay**: 連線時補送的最近記錄筆數
+
+    連線後可傳送 {"level": "...", "loggers": [...]} 調整篩選條件。
+    """
+    stream = get_log_stream()
+    await stream.connect(websocket, level=level, loggers=loggers, replay=replay)
     
     # 發送歡迎訊息
-    await websocket.send_json({
-        "timestamp": "00:00:00.000",
-        "level": "INFO",
-        "name": "websocket",
-        "message": "WebSocket 日誌推送已啟動",
-        "pathname": "server",
-        "lineno": 0
+    stream.manager.send_personal(websocket, {
+        "type": "logs",
+        "logs": [{
+            "seq": 0,
+            "timestamp": "00:00:00.000",
+            "level": "INFO",
+            "name": "websocket",
+            "message": "WebSocket 日誌推送已啟動",
+            "pathname": "server",
+            "lineno": 0
+        }]
     })
     
     try:
         while True:
-            # 保持連接活躍，接收心跳
-            data = await websocket.receive_text()
-            # 可選：處理來自客戶端的訊息
+            message = await websocket.receive_json()
+            if isinstance(message, dict):
+                stream.update_filters(websocket, message.get("level"), message.get("loggers"))
     except WebSocketDisconnect:
-        await manager.disconnect(websocket)
+        await stream.disconnect(websocket)
     except Exception as e:
         logging.error(f"WebSocket 錯誤: {e}")
-        await manager.disconnect(websocket)
+        await stream.disconnect(websocket)
+
+
+@router.get("/websocket/clients")
+async def get_websocket_clients():
+    """取得 WebSocket 連接的發送佇列與延遲統計（日誌推送與即時推送）"""
+    from services.live_state import get_live_hub
+
+    return {
+        "logs": get_log_stream().get_status_dict(),
+        "live": get_live_hub().manager.get_status_dict(),
+    }
+
+
+@router.get("/cache/config")
+async def get_config_cache_status():
+    """取得飼養箱／繼電器／排程配置快取的版本與命中統計"""
+    from services.config_cache import get_config_cache
+
+    return get_config_cache().get_status_dict()
+
+
+@router.get("/cache/single-flight")
+async def get_single_flight_status():
+    """取得硬件讀取單飛合併的統計（執行、共用、TTL 命中次數）"""
+    from services.single_flight import get_single_flight
+
+    return get_single_flight().get_status_dict()
+
+
+@router.get("/retention")
+async def get_retention_status():
+    """取得歷史資料保留策略與最近幾次執行的刪除筆數、耗時"""
+    from services.retention import get_retention_service
+
+    return get_retention_service().get_status_dict()
+
+
+@router.post("/retention/run")
+async def run_retention():
+    """立即依保留策略刪除過期記錄"""
+    from services.retention import get_retention_service
+
+    return {"runs": await get_retention_service().run_policies()}
 
 
 @router.get("/system/info")
@@ -242,58 +320,52 @@ async def get_system_info():
     }
 
 
-# 日誌處理器
-class WebSocketLogHandler(logging.Handler):
-    """自定義日誌處理器，將日誌推送到 WebSocket"""
-    
-    def __init__(self):
-        super().__init__()
-        self.loop = None
-    
-    def emit(self, record):
-        try:
-            log_entry = {
-                "timestamp": self.format_time(record),
-                "level": record.levelname,
-                "name": record.name,
-                "message": record.getMessage(),
-                "pathname": f"{record.module}.py",
-                "lineno": record.lineno,
-            }
-            
-            # 取得或建立事件循環
-            try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                # 如果沒有運行的事件循環，嘗試取得預設循環
-                loop = asyncio.get_event_loop()
-            
-            # 在事件循環中排程廣播
-            if loop and loop.is_running():
-                asyncio.run_coroutine_threadsafe(
-                    manager.broadcast(log_entry),
-                    loop
-                )
-        except Exception as e:
-            # 避免日誌處理器本身產生錯誤造成無限循環
-            pass
-    
-    def format_time(self, record):
-        from datetime import datetime
-        dt = datetime.fromtimestamp(record.created)
-        return dt.strftime('%H:%M:%S.%f')[:-3]  # 格式化為 HH:MM:SS.mmm
+@router.get("/database/pragmas")
+async def get_database_pragmas():
+    """取得 SQLite 目前生效的效能 PRAGMA 與連線池狀態"""
+    from config import settings
+    from database import engine, get_sqlite_pragmas, read_sqlite_pragmas
+
+    if not settings.database_url.startswith("sqlite"):
+        raise HTTPException(status_code=400, detail="目前資料庫不是 SQLite")
+
+    return {
+        "tuning": settings.sqlite_tuning,
+        "configured": get_sqlite_pragmas() if settings.sqlite_tuning else {},
+        "active": await asyncio.to_thread(read_sqlite_pragmas),
+        "pool": {
+            "class": type(engine.pool).__name__,
+            "status": engine.pool.status(),
+        },
+    }
+
+
+@router.get("/database/partitions")
+async def get_temperature_partitions_status():
+    """取得溫度記錄各分區的時間範圍與分區路由統計"""
+    from sqlmodel import Session
+    from database import engine
+    from services.temperature_partitions import get_temperature_partitions
+
+    def read_status():
+        with Session(engine) as session:
+            return get_temperature_partitions().get_status_dict(session)
+
+    return await asyncio.to_thread(read_status)
 
 
 # 全局日誌處理器實例
 _ws_log_handler = None
 
 
-def setup_websocket_logging():
-    """設置 WebSocket 日誌處理器"""
+async def setup_websocket_logging():
+    """設置 WebSocket 日誌處理器並啟動批次推送任務"""
     global _ws_log_handler
     
     if _ws_log_handler is None:
-        _ws_log_handler = WebSocketLogHandler()
+        stream = get_log_stream()
+        await stream.start()
+        _ws_log_handler = WebSocketLogHandler(stream)
         _ws_log_handler.setLevel(logging.DEBUG)
         
         # 添加到根日誌記錄器
@@ -301,7 +373,7 @@ def setup_websocket_logging():
         root_logger.addHandler(_ws_log_handler)
 
 
-def remove_websocket_logging():
+async def remove_websocket_logging():
     """移除 WebSocket 日誌處理器"""
     global _ws_log_handler
     
@@ -309,3 +381,4 @@ def remove_websocket_logging():
         root_logger = logging.getLogger()
         root_logger.removeHandler(_ws_log_handler)
         _ws_log_handler = None
+        await get_log_stream().stop()
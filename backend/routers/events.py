@@ -1,12 +1,18 @@
 """事件日誌和告警 API 路由"""
 
-from fastapi import APIRouter, HTTPException, Depends
+import base64
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import tuple_
 from sqlmodel import Session, select, col
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 
 from database import get_session
 from models import EventLog
+from serializers import alert_to_dict, event_to_dict
+from services.event_counters import count_recent_events
+from services.retention import get_retention_service
 
 router = APIRouter(
     prefix="/api/events",
@@ -14,23 +20,64 @@ router = APIRouter(
 )
 
 
+def encode_cursor(event: EventLog) -> str:
+    """以最後一筆事件的 (timestamp, id) 產生不透明游標"""
+    raw = json.dumps([event.timestamp.isoformat(), event.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, event_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="無效的分頁游標")
+
+
+def paginate_events(
+    session: Session, query, response: Response, limit: int, cursor: Optional[str], offset: int
+) -> List[EventLog]:
+    """依 (timestamp, id) 由新到舊分頁
+
+    有游標時以 (timestamp, id) < 游標定位，由時間索引直接跳到該位置，
+    不像 OFFSET 需要掃過前面所有略過的列。還有下一頁時以 X-Next-Cursor 標頭返回游標。
+    """
+    if cursor:
+        query = query.where(tuple_(EventLog.timestamp, EventLog.id) < tuple_(*decode_cursor(cursor)))
+    elif offset:
+        query = query.offset(offset)
+
+    events = session.exec(
+        query.order_by(col(EventLog.timestamp).desc(), col(EventLog.id).desc()).limit(limit + 1)
+    ).all()
+
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(events[-1])
+    return events
+
+
 @router.get("/", response_model=List[dict])
 async def get_events(
+    response: Response,
     event_type: Optional[str] = None,
     severity: Optional[str] = None,
-    limit: int = 100,
-    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0, deprecated=True),
     session: Session = Depends(get_session),
 ):
     """
-    獲取事件日誌列表
+    獲取事件日誌列表（由新到舊）
     
     - **event_type**: 事件類型過濾 (relay_control, temperature_alert, schedule_run, system_error)
     - **severity**: 嚴重性過濾 (debug, info, warning, error, critical)
     - **limit**: 返回數量限制
-    - **offset**: 偏移量
+    - **cursor**: 上一頁回應的 X-Next-Cursor 標頭，取得下一頁
+    - **offset**: 偏移量（已棄用，深分頁請改用 cursor）
     """
-    query = select(EventLog).order_by(col(EventLog.timestamp).desc())
+    query = select(EventLog)
     
     if event_type:
         query = query.where(EventLog.event_type == event_type)
@@ -38,58 +85,32 @@ async def get_events(
     if severity:
         query = query.where(EventLog.severity == severity)
     
-    query = query.limit(limit).offset(offset)
-    
-    events = session.exec(query).all()
+    events = paginate_events(session, query, response, limit, cursor, offset)
     
-    return [
-        {
-            "id": event.id,
-            "event_type": event.event_type,
-            "severity": event.severity,
-            "message": event.message,
-            "details": event.details,
-            "related_entity_type": event.related_entity_type,
-            "related_entity_id": event.related_entity_id,
-            "timestamp": event.timestamp.isoformat(),
-        }
-        for event in events
-    ]
+    return [event_to_dict(event) for event in events]
 
 
 @router.get("/alerts", response_model=List[dict])
 async def get_alerts(
-    limit: int = 50,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0, deprecated=True),
     session: Session = Depends(get_session),
 ):
     """
     獲取告警列表（只包含 warning, error, critical 級別的事件）
+    
+    - **cursor**: 上一頁回應的 X-Next-Cursor 標頭，取得下一頁
     """
-    query = (
-        select(EventLog)
-        .where(col(EventLog.severity).in_(["warning", "error", "critical"]))
-        .order_by(col(EventLog.timestamp).desc())
-        .limit(limit)
-        .offset(offset)
-    )
+    query = select(EventLog).where(col(EventLog.severity).in_(["warning", "error", "critical"]))
     
-    events = session.exec(query).all()
+    events = paginate_events(session, query, response, limit, cursor, offset)
     
+    # 判斷是否已解決 (超過 24 小時的告警視為已解決)
+    now = datetime.utcnow()
     return [
-        {
-            "id": event.id,
-            "type": event.severity,  # warning, error, critical
-            "message": event.message,
-            "details": event.details,
-            "event_type": event.event_type,
-            "related_entity_type": event.related_entity_type,
-            "related_entity_id": event.related_entity_id,
-            "timestamp": event.timestamp.isoformat(),
-            "time": event.timestamp.strftime("%Y-%m-%d %H:%M"),
-            # 判斷是否已解決 (超過 24 小時的告警視為已解決)
-            "resolved": (datetime.utcnow() - event.timestamp) > timedelta(hours=24),
-        }
+        alert_to_dict(event, resolved=(now - event.timestamp) > timedelta(hours=24))
         for event in events
     ]
 
@@ -114,21 +135,8 @@ async def get_active_alerts(
     
     events = session.exec(query).all()
     
-    return [
-        {
-            "id": event.id,
-            "type": event.severity,
-            "message": event.message,
-            "details": event.details,
-            "event_type": event.event_type,
-            "related_entity_type": event.related_entity_type,
-            "related_entity_id": event.related_entity_id,
-            "timestamp": event.timestamp.isoformat(),
-            "time": event.timestamp.strftime("%Y-%m-%d %H:%M"),
-            "resolved": False,  # 活躍告警都是未解決的
-        }
-        for event in events
-    ]
+    # 活躍告警都是未解決的
+    return [alert_to_dict(event, resolved=False) for event in events]
 
 
 @router.get("/stats", response_model=dict)
@@ -136,39 +144,21 @@ async def get_event_stats(
     session: Session = Depends(get_session),
 ):
     """
-    獲取事件統計資訊
+    獲取事件統計資訊（最近 24 小時的告警數，依嚴重性與事件類型分類）
     """
-    cutoff_time = datetime.utcnow() - timedelta(hours=24)
-    
-    # 最近 24 小時活躍告警數量
-    active_alerts = session.exec(
-        select(EventLog)
-        .where(col(EventLog.severity).in_(["warning", "error", "critical"]))
-        .where(EventLog.timestamp >= cutoff_time)
-    ).all()
+    counts = count_recent_events(session, hours=24)
     
-    # 按嚴重性分類
-    critical_count = len([e for e in active_alerts if e.severity == "critical"])
-    error_count = len([e for e in active_alerts if e.severity == "error"])
-    warning_count = len([e for e in active_alerts if e.severity == "warning"])
-    
-    # 按事件類型分類
-    temp_alerts = len([e for e in active_alerts if e.event_type == "temperature_alert"])
-    relay_issues = len([e for e in active_alerts if e.event_type == "relay_control"])
-    system_errors = len([e for e in active_alerts if e.event_type == "system_error"])
+    by_severity = {severity: 0 for severity in ("critical", "error", "warning")}
+    by_type = {event_type: 0 for event_type in ("temperature_alert", "relay_control", "system_error")}
+    for (severity, event_type), count in counts.items():
+        by_severity[severity] = by_severity.get(severity, 0) + count
+        if event_type in by_type:
+            by_type[event_type] += count
     
     return {
-        "total_active_alerts": len(active_alerts),
-        "by_severity": {
-            "critical": critical_count,
-            "error": error_count,
-            "warning": warning_count,
-        },
-        "by_type": {
-            "temperature_alert": temp_alerts,
-            "relay_control": relay_issues,
-            "system_error": system_errors,
-        },
+        "total_active_alerts": sum(counts.values()),
+        "by_severity": by_severity,
+        "by_type": by_type,
         "period": "last_24h",
     }
 
@@ -194,28 +184,21 @@ async def delete_event(
 @router.delete("/")
 async def clear_old_events(
     days: int = 30,
-    session: Session = Depends(get_session),
 ):
     """
-    清理舊事件日誌
+    清理舊事件日誌（分批集合式刪除）
     
     - **days**: 刪除多少天之前的事件 (預設 30 天)
     """
     cutoff_time = datetime.utcnow() - timedelta(days=days)
     
-    old_events = session.exec(
-        select(EventLog).where(EventLog.timestamp < cutoff_time)
-    ).all()
-    
-    count = len(old_events)
-    
-    for event in old_events:
-        session.delete(event)
-    
-    session.commit()
+    report = await get_retention_service().purge("eventlog", cutoff_time, trigger="api")
+    count = report["deleted"]
     
     return {
         "success": True,
         "message": f"已刪除 {count} 條 {days} 天前的事件",
         "deleted_count": count,
+        "chunks": report["chunks"],
+        "seconds": report["seconds"],
     }
@@ -0,0 +1,55 @@
+"""即時狀態推送 API 路由"""
+import logging
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.live_state import TOPICS, build_topic_snapshot, get_live_hub
+
+router = APIRouter(prefix="/api/live", tags=["即時推送"])
+
+
+def parse_topics(value) -> list:
+    """解析主題列表（逗號分隔字串或列表），忽略未知主題"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [topic.strip() for topic in value or [] if topic.strip() in TOPICS]
+
+
+def send_snapshots(websocket: WebSocket, topics):
+    """經由發送佇列送出快照，與之後的差異訊息保持順序"""
+    manager = get_live_hub().manager
+    for topic in topics:
+        manager.send_personal(websocket, {
+            "topic": topic,
+            "type": "snapshot",
+            "data": build_topic_snapshot(topic),
+        })
+
+
+@router.websocket("/ws")
+async def live_stream(websocket: WebSocket, topics: Optional[str] = None):
+    """WebSocket 端點：依主題推送狀態變化
+
+    連線時以 ?topics=relays,temperature,events 指定訂閱，之後可傳送
+    {"subscribe": [...]} 或 {"unsubscribe": [...]} 調整。
+    每個新訂閱的主題先收到一次 snapshot，之後只收到 delta。
+    """
+    hub = get_live_hub()
+    subscribed = parse_topics(topics)
+
+    await hub.manager.connect(websocket, subscribed)
+    try:
+        send_snapshots(websocket, subscribed)
+
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+
+            added = hub.manager.subscribe(websocket, parse_topics(message.get("subscribe")))
+            send_snapshots(websocket, sorted(added))
+            hub.manager.unsubscribe(websocket, parse_topics(message.get("unsubscribe")))
+    except WebSocketDisconnect:
+        await hub.manager.disconnect(websocket)
+    except Exception as e:
+        logging.error(f"即時推送 WebSocket 錯誤: {e}")
+        await hub.manager.disconnect(websocket)
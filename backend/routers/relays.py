@@ -1,11 +1,14 @@
 """繼電器控制相關 API 路由"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlmodel import Session, select
 from pydantic import BaseModel, Field
 from database import get_session
+from services.bus_scheduler import bus_priority
+from services.config_cache import cached_json_response, get_config_cache
 from models import RelayChannel, EventLog
 from services.modbus_controller import get_controller
+from services.relay_pool import get_relay_pool
 from datetime import datetime
 
 router = APIRouter(prefix="/api/relays", tags=["繼電器控制"])
@@ -14,6 +17,7 @@ router = APIRouter(prefix="/api/relays", tags=["繼電器控制"])
 # Pydantic 模型
 class RelayChannelCreate(BaseModel):
     channel: int = Field(ge=0, le=15)
+    device_address: Optional[int] = None
     name: str
     description: Optional[str] = None
     tank_id: Optional[int] = None
@@ -22,6 +26,7 @@ class RelayChannelCreate(BaseModel):
 
 
 class RelayChannelUpdate(BaseModel):
+    device_address: Optional[int] = None
     name: Optional[str] = None
     description: Optional[str] = None
     tank_id: Optional[int] = None
@@ -36,6 +41,7 @@ class RelayControlRequest(BaseModel):
 class RelayResponse(BaseModel):
     id: int
     channel: int
+    device_address: Optional[int]
     name: str
     description: Optional[str]
     tank_id: Optional[int]
@@ -47,17 +53,24 @@ class RelayResponse(BaseModel):
     updated_at: datetime
 
 
+def get_relay_controller(relay: RelayChannel):
+    """取得繼電器所在板的控制器"""
+    try:
+        return get_controller(device_address=relay.device_address)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("", response_model=List[RelayResponse])
-def get_all_relays(session: Session = Depends(get_session)):
-    """取得所有繼電器通道配置"""
-    relays = session.exec(select(RelayChannel)).all()
-    return relays
+def get_all_relays(request: Request):
+    """取得所有繼電器通道配置（讀取快取，支援 ETag / If-None-Match）"""
+    return cached_json_response(request, "relays")
 
 
 @router.get("/{relay_id}", response_model=RelayResponse)
-def get_relay(relay_id: int, session: Session = Depends(get_session)):
+def get_relay(relay_id: int):
     """取得單個繼電器通道配置"""
-    relay = session.get(RelayChannel, relay_id)
+    relay = get_config_cache().get_item("relays", relay_id)
     if not relay:
         raise HTTPException(status_code=404, detail="繼電器通道不存在")
     return relay
@@ -69,9 +82,11 @@ def create_relay(
     session: Session = Depends(get_session)
 ):
     """創建繼電器通道配置"""
-    # 檢查通道是否已存在
+    # 檢查通道是否已存在（同一塊板內）
     existing = session.exec(
-        select(RelayChannel).where(RelayChannel.channel == relay.channel)
+        select(RelayChannel)
+        .where(RelayChannel.channel == relay.channel)
+        .where(RelayChannel.device_address == relay.device_address)
     ).first()
     
     if existing:
@@ -138,7 +153,7 @@ async def control_relay(
         raise HTTPException(status_code=400, detail="該繼電器通道未啟用")
     
     # 控制繼電器
-    controller = get_controller()
+    controller = get_relay_controller(relay)
     success = await controller.set_relay(relay.channel, control.state)
     
     if not success:
@@ -180,13 +195,13 @@ async def toggle_relay(relay_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=400, detail="該繼電器通道未啟用")
     
     # 切換狀態
-    controller = get_controller()
+    controller = get_relay_controller(relay)
     success = await controller.toggle_relay(relay.channel)
     
     if not success:
         raise HTTPException(status_code=500, detail="切換繼電器失敗")
     
-    # 讀取新狀態
+    # 翻轉後的狀態由線圈映像提供，不另外讀取匯流排
     new_state = await controller.read_relay_status(relay.channel)
     
     # 更新資料庫
@@ -220,18 +235,20 @@ def clear_manual_override(relay_id: int, session: Session = Depends(get_session)
 
 
 @router.get("/status/all")
-async def get_all_relay_status():
-    """取得所有繼電器的硬件狀態"""
-    controller = get_controller()
-    status = await controller.get_status_dict()
+async def get_all_relay_status(
+    fresh: bool = Query(False, description="強制讀取匯流排，不使用線圈映像快取")
+):
+    """取得所有繼電器板的硬件狀態"""
+    status = await get_relay_pool().get_shared_status_dict(fresh=fresh)
     return status
 
 
 @router.post("/control/all-off")
 async def turn_all_relays_off(session: Session = Depends(get_session)):
     """關閉所有繼電器"""
-    controller = get_controller()
-    success = await controller.set_all_relays(False)
+    # 安全關閉優先於排隊中的所有其他請求
+    with bus_priority("safety"):
+        success = await get_relay_pool().set_all_relays(False)
     
     if not success:
         raise HTTPException(status_code=500, detail="關閉所有繼電器失敗")
@@ -286,7 +303,7 @@ async def sync_schedule_states(session: Session = Depends(get_session)):
     from models import Schedule
     from datetime import datetime, time as dt_time
     
-    controller = get_controller()
+    pool = get_relay_pool()
     now = datetime.now()
     current_time = now.time()
     current_weekday = now.weekday()  # 0=週一, 6=週日
@@ -332,23 +349,29 @@ async def sync_schedule_states(session: Session = Depends(get_session)):
                 relay_states[relay_id] = True
     
     # 更新繼電器狀態
-    updated_count = 0
     relays = session.exec(select(RelayChannel)).all()
+    changes = []  # (relay, target_state)
     
     for relay in relays:
         if relay.enabled:
             target_state = relay_states.get(relay.id, False)
 
             if relay.current_state != target_state:
-                # 更新硬體狀態
-                success = await controller.set_relay(relay.channel, target_state)
-
-                if success:
-                    relay.current_state = target_state
-                    relay.manual_override = False
-                    relay.updated_at = datetime.utcnow()
-                    session.add(relay)
-                    updated_count += 1
+                changes.append((relay, target_state))
+    
+    # 同時提交所有硬體寫入：同一塊板合併為一幀，不同匯流排並行
+    results = await pool.set_relays(
+        {(relay.device_address, relay.channel): target_state for relay, target_state in changes}
+    )
+    
+    updated_count = 0
+    for relay, target_state in changes:
+        if results[(relay.device_address, relay.channel)]:
+            relay.current_state = target_state
+            relay.manual_override = False
+            relay.updated_at = datetime.utcnow()
+            session.add(relay)
+            updated_count += 1
     
     # 記錄事件
     event = EventLog(
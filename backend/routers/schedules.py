@@ -1,9 +1,10 @@
 """排程管理相關 API 路由"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import Session
 from pydantic import BaseModel
 from database import get_session
+from services.config_cache import cached_json_response, get_config_cache
 from models import Schedule
 from services.scheduler import get_scheduler_service
 from datetime import datetime
@@ -60,16 +61,15 @@ class ScheduleResponse(BaseModel):
 
 
 @router.get("", response_model=List[ScheduleResponse])
-def get_all_schedules(session: Session = Depends(get_session)):
-    """取得所有排程"""
-    schedules = session.exec(select(Schedule)).all()
-    return schedules
+def get_all_schedules(request: Request):
+    """取得所有排程（讀取快取，支援 ETag / If-None-Match）"""
+    return cached_json_response(request, "schedules")
 
 
 @router.get("/{schedule_id}", response_model=ScheduleResponse)
-def get_schedule(schedule_id: int, session: Session = Depends(get_session)):
+def get_schedule(schedule_id: int):
     """取得單個排程"""
-    schedule = session.get(Schedule, schedule_id)
+    schedule = get_config_cache().get_item("schedules", schedule_id)
     if not schedule:
         raise HTTPException(status_code=404, detail="排程不存在")
     return schedule
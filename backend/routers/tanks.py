@@ -1,9 +1,10 @@
 """飼養箱管理相關 API 路由"""
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import Session
 from pydantic import BaseModel
 from database import get_session
+from services.config_cache import cached_json_response, get_config_cache
 from models import Tank
 from datetime import datetime
 
@@ -47,16 +48,15 @@ class TankResponse(BaseModel):
 
 
 @router.get("", response_model=List[TankResponse])
-def get_all_tanks(session: Session = Depends(get_session)):
-    """取得所有飼養箱"""
-    tanks = session.exec(select(Tank)).all()
-    return tanks
+def get_all_tanks(request: Request):
+    """取得所有飼養箱（讀取快取，支援 ETag / If-None-Match）"""
+    return cached_json_response(request, "tanks")
 
 
 @router.get("/{tank_id}", response_model=TankResponse)
-def get_tank(tank_id: int, session: Session = Depends(get_session)):
+def get_tank(tank_id: int):
     """取得單個飼養箱"""
-    tank = session.get(Tank, tank_id)
+    tank = get_config_cache().get_item("tanks", tank_id)
     if not tank:
         raise HTTPException(status_code=404, detail="飼養箱不存在")
     return tank
@@ -1,11 +1,21 @@
 """溫度監控相關 API 路由"""
+import math
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, desc
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
 from pydantic import BaseModel
-from database import get_session
-from models import TemperatureLog, Tank
+from database import get_session, engine
+from services.retention import get_retention_service
 from services.temperature_monitor import get_monitor_service
+from services.temperature_partitions import (
+    query_history,
+    query_latest,
+    query_percentile,
+    query_statistics,
+)
+from services.temperature_export import EXPORT_FORMATS, check_export_format, export_temperature_logs
+from services.temperature_rollup import ROLLUP_RESOLUTIONS, choose_resolution, query_rollups
 from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/api/temperature", tags=["溫度監控"])
@@ -20,19 +30,25 @@ class TemperatureReading(BaseModel):
 
 
 class TemperatureLogResponse(BaseModel):
-    id: int
+    id: Optional[int]
     tank_id: int
     temperature: float
     humidity: Optional[float]
     sensor_id: Optional[str]
     timestamp: datetime
+    # 彙總資料（resolution 非 raw 時）：temperature / humidity 為時間桶平均
+    resolution: str = "raw"
+    temperature_min: Optional[float] = None
+    temperature_max: Optional[float] = None
+    count: Optional[int] = None
 
 
 @router.get("/current", response_model=List[TemperatureReading])
 async def get_current_temperatures():
     """取得當前所有感測器的溫度"""
     monitor = get_monitor_service()
-    readings = await monitor.read_all_sensors()
+    # 多個客戶端同時輪詢時共用一次感測器讀取
+    readings = await monitor.read_all_sensors_shared()
     return readings
 
 
@@ -49,23 +65,61 @@ def get_temperature_history(
     tank_id: int,
     session: Session = Depends(get_session),
     hours: int = Query(24, description="查詢最近幾小時的數據"),
-    limit: int = Query(1000, description="最多返回多少筆記錄")
+    limit: int = Query(1000, description="最多返回多少筆記錄"),
+    resolution: Optional[str] = Query(
+        None, description="raw / 1m / 5m / 1h / 1d，未指定時依時間範圍自動選擇"
+    )
 ):
-    """取得飼養箱溫度歷史記錄"""
+    """取得飼養箱溫度歷史記錄
+
+    長時間範圍改讀降採樣彙總，回傳點數不隨時間範圍增長。
+    """
+    if resolution is None:
+        resolution = choose_resolution(hours, limit)
+    elif resolution != "raw" and resolution not in ROLLUP_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支援的解析度: {resolution}，可用: raw, {', '.join(ROLLUP_RESOLUTIONS)}"
+        )
+    
     # 計算時間範圍
     since = datetime.utcnow() - timedelta(hours=hours)
     
-    # 查詢
-    stmt = (
-        select(TemperatureLog)
-        .where(TemperatureLog.tank_id == tank_id)
-        .where(TemperatureLog.timestamp >= since)
-        .order_by(desc(TemperatureLog.timestamp))
-        .limit(limit)
-    )
+    if resolution != "raw":
+        return query_rollups(session, tank_id, resolution, since, limit)
     
-    logs = session.exec(stmt).all()
-    return logs
+    # 只查詢時間範圍涵蓋的月份分區
+    return query_history(session, tank_id, since, limit)
+
+
+@router.get("/export")
+def export_temperature_history(
+    format: str = Query("csv", description="csv / ndjson / parquet"),
+    tank_id: Optional[List[int]] = Query(None, description="要匯出的飼養箱，可重複指定，未指定時匯出全部"),
+    start: Optional[datetime] = Query(None, description="起始時間（含，UTC）"),
+    end: Optional[datetime] = Query(None, description="結束時間（不含，UTC）"),
+    page_size: Optional[int] = Query(None, ge=100, le=50000, description="每次查詢的筆數")
+):
+    """串流匯出溫度記錄
+
+    以 (tank_id, timestamp) 鍵集分頁逐頁讀取並分塊送出，記憶體用量不隨筆數增長。
+    """
+    try:
+        check_export_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def session_factory():
+        return Session(engine)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"temperature_{datetime.utcnow():%Y%m%d_%H%M%S}.{extension}"
+
+    return StreamingResponse(
+        export_temperature_logs(format, session_factory, tank_id, start, end, page_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/latest/{tank_id}", response_model=Optional[TemperatureLogResponse])
@@ -74,35 +128,42 @@ def get_latest_temperature(
     session: Session = Depends(get_session)
 ):
     """取得飼養箱最新溫度"""
-    stmt = (
-        select(TemperatureLog)
-        .where(TemperatureLog.tank_id == tank_id)
-        .order_by(desc(TemperatureLog.timestamp))
-        .limit(1)
-    )
-    
-    log = session.exec(stmt).first()
-    return log
+    return query_latest(session, tank_id)
+
+
+def parse_percentiles(percentiles: Optional[str]) -> List[float]:
+    """解析百分位數參數，例: 50,95,99"""
+    if not percentiles:
+        return []
+    try:
+        values = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="百分位數格式錯誤，例: 50,95,99")
+    if any(not 0 < p <= 100 for p in values):
+        raise HTTPException(status_code=400, detail="百分位數必須介於 0 到 100 之間")
+    return values
 
 
 @router.get("/statistics/{tank_id}")
 def get_temperature_statistics(
     tank_id: int,
     session: Session = Depends(get_session),
-    hours: int = Query(24, description="統計最近幾小時的數據")
+    hours: int = Query(24, description="統計最近幾小時的數據"),
+    stddev: bool = Query(False, description="是否計算標準差"),
+    percentiles: Optional[str] = Query(None, description="要計算的百分位數，例: 50,95,99")
 ):
-    """取得溫度統計資料"""
+    """取得溫度統計資料
+
+    每個涵蓋的月份分區各做一次聚合查詢（由 (tank_id, timestamp, temperature) 索引直接讀取）後合併。
+    """
     since = datetime.utcnow() - timedelta(hours=hours)
+    requested_percentiles = parse_percentiles(percentiles)
     
-    stmt = (
-        select(TemperatureLog)
-        .where(TemperatureLog.tank_id == tank_id)
-        .where(TemperatureLog.timestamp >= since)
+    count, minimum, maximum, avg, avg_square, first_reading, last_reading = (
+        query_statistics(session, tank_id, since)
     )
     
-    logs = session.exec(stmt).all()
-    
-    if not logs:
+    if not count:
         return {
             "tank_id": tank_id,
             "period_hours": hours,
@@ -112,44 +173,45 @@ def get_temperature_statistics(
             "avg": None
         }
     
-    temperatures = [log.temperature for log in logs]
-    
-    return {
+    result = {
         "tank_id": tank_id,
         "period_hours": hours,
-        "count": len(temperatures),
-        "min": min(temperatures),
-        "max": max(temperatures),
-        "avg": sum(temperatures) / len(temperatures),
-        "first_reading": logs[-1].timestamp,
-        "last_reading": logs[0].timestamp
+        "count": count,
+        "min": minimum,
+        "max": maximum,
+        "avg": avg,
+        "first_reading": first_reading,
+        "last_reading": last_reading
     }
+    
+    if stddev:
+        # 母體標準差：sqrt(E[x²] - E[x]²)，浮點誤差可能產生極小負值
+        result["stddev"] = math.sqrt(max(avg_square - avg * avg, 0.0))
+    
+    if requested_percentiles:
+        result["percentiles"] = {
+            f"p{p:g}": query_percentile(session, tank_id, since, count, p)
+            for p in requested_percentiles
+        }
+    
+    return result
 
 
 @router.delete("/history/{tank_id}")
-def delete_temperature_history(
+async def delete_temperature_history(
     tank_id: int,
-    session: Session = Depends(get_session),
     days: int = Query(30, description="刪除多少天前的數據")
 ):
-    """刪除舊的溫度記錄"""
+    """刪除舊的溫度記錄（分批集合式刪除，不阻擋溫度記錄寫入）"""
     cutoff = datetime.utcnow() - timedelta(days=days)
     
-    stmt = (
-        select(TemperatureLog)
-        .where(TemperatureLog.tank_id == tank_id)
-        .where(TemperatureLog.timestamp < cutoff)
+    report = await get_retention_service().purge(
+        "temperaturelog", cutoff, tank_id=tank_id, trigger="api"
     )
     
-    logs = session.exec(stmt).all()
-    deleted_count = len(logs)
-    
-    for log in logs:
-        session.delete(log)
-    
-    session.commit()
-    
     return {
-        "deleted_count": deleted_count,
-        "cutoff_date": cutoff.isoformat()
+        "deleted_count": report["deleted"],
+        "cutoff_date": cutoff.isoformat(),
+        "chunks": report["chunks"],
+        "seconds": report["seconds"],
     }
@@ -0,0 +1,33 @@
+"""API 與即時推送共用的模型序列化"""
+
+from models import EventLog
+
+
+def event_to_dict(event: EventLog) -> dict:
+    """事件序列化"""
+    return {
+        "id": event.id,
+        "event_type": event.event_type,
+        "severity": event.severity,
+        "message": event.message,
+        "details": event.details,
+        "related_entity_type": event.related_entity_type,
+        "related_entity_id": event.related_entity_id,
+        "timestamp": event.timestamp.isoformat(),
+    }
+
+
+def alert_to_dict(event: EventLog, resolved: bool) -> dict:
+    """告警序列化（type 為 warning, error, critical）"""
+    return {
+        "id": event.id,
+        "type": event.severity,
+        "message": event.message,
+        "details": event.details,
+        "event_type": event.event_type,
+        "related_entity_type": event.related_entity_type,
+        "related_entity_id": event.related_entity_id,
+        "timestamp": event.timestamp.isoformat(),
+        "time": event.timestamp.strftime("%Y-%m-%d %H:%M"),
+        "resolved": resolved,
+    }
@@ -0,0 +1,194 @@
+"""Modbus 匯流排健康管理：自適應逾時與斷路器
+
+每條匯流排一個 BusHealth，記錄最近成功請求的回應時間：
+
+- 自適應逾時：每次請求的逾時 = 最近回應時間 p99 × modbus_timeout_multiplier，
+  限制在 [modbus_timeout_min_ms, modbus_timeout] 之間；樣本不足時使用 modbus_timeout。
+  USB 轉換器故障時，每個請求只等待正常回應時間的數倍，而不是固定 3 秒。
+- 斷路器：連續 modbus_circuit_failures 次無回應後開路，之後的請求不送出、立即以
+  CircuitOpenError 失敗，排隊中的呼叫者依序快速失敗而不是各等一次逾時。
+  開路 modbus_circuit_open_seconds 秒後半開，下一個請求先送出一次讀取單個線圈的探測，
+  成功才閉路；失敗則再次開路，開路時間加倍（最多 MAX_OPEN_SECONDS 秒）。
+
+板子以 Modbus 例外碼回應（例如不支援韌體指令）代表匯流排正常，不計為失敗。
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from pymodbus.exceptions import ModbusException, ModbusIOException
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+MAX_OPEN_SECONDS = 60
+LATENCY_WINDOW = 200  # 保留最近成功請求的回應時間數
+MIN_SAMPLES = 20  # 樣本少於此數時使用 modbus_timeout
+
+
+class CircuitOpenError(ModbusException):
+    """匯流排斷路中，請求未送出"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """已排序列表的百分位數（最近排名法）"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class BusHealth:
+    """單條匯流排的回應時間統計、自適應逾時與斷路器（方法皆由持有匯流排鎖的呼叫者使用）"""
+
+    def __init__(self, name: str, apply_timeout: Optional[Callable[[float], None]] = None):
+        """初始化健康管理
+
+        Args:
+            name: 匯流排名稱（串口），用於日誌
+            apply_timeout: 逾時變更時呼叫，把新的逾時（秒）套用到傳輸層
+        """
+        self.name = name
+        self.apply_timeout = apply_timeout
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.timeout = float(settings.modbus_timeout)
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_seconds = settings.modbus_circuit_open_seconds
+        self._opened_at = 0.0
+
+        self.stats = {
+            "requests": 0,
+            "failures": 0,
+            "rejected": 0,
+            "circuit_opens": 0,
+            "probes": 0,
+        }
+
+    def retry_in(self) -> float:
+        """距離半開探測的秒數（未開路時為 0）"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    async def admit(self, probe: Callable[[], Awaitable]) -> bool:
+        """請求送出前檢查斷路器
+
+        開路時間已過時轉為半開並送出探測，探測成功才放行。
+
+        Args:
+            probe: 建立探測請求 coroutine 的函數
+
+        Returns:
+            True=可以送出請求，False=斷路中（呼叫者應立即失敗）
+        """
+        if self.state == CLOSED:
+            return True
+        if self.retry_in() > 0:
+            self.stats["rejected"] += 1
+            return False
+
+        self.state = HALF_OPEN
+        self.stats["probes"] += 1
+        try:
+            await self.measure(probe())
+        except Exception as e:
+            logger.debug(f"匯流排 {self.name} 半開探測失敗: {e}")
+
+        if self.state == CLOSED:
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    async def measure(self, request: Awaitable):
+        """執行請求並記錄回應時間或失敗"""
+        self.stats["requests"] += 1
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self._record_failure()
+            raise
+
+        # 舊版 pymodbus 以回應物件表示無回應
+        if isinstance(response, ModbusIOException):
+            self._record_failure()
+        else:
+            self._record_success(time.perf_counter() - start)
+        return response
+
+    def _record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"匯流排 {self.name} 探測成功，斷路器閉路")
+            self.state = CLOSED
+            self.open_seconds = settings.modbus_circuit_open_seconds
+        self._update_timeout()
+
+    def _record_failure(self):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+
+        if self.state == HALF_OPEN:
+            self.open_seconds = min(self.open_seconds * 2, MAX_OPEN_SECONDS)
+            self._open()
+        elif self.state == CLOSED and self.consecutive_failures >= settings.modbus_circuit_failures:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.stats["circuit_opens"] += 1
+        logger.error(
+            f"匯流排 {self.name} 連續 {self.consecutive_failures} 次無回應，斷路 "
+            f"{self.open_seconds:g} 秒，期間的請求立即失敗"
+        )
+
+    def _update_timeout(self):
+        """依最近回應時間 p99 調整逾時，變化超過 10% 才套用到傳輸層"""
+        timeout = float(settings.modbus_timeout)
+        if settings.modbus_adaptive_timeout and len(self.latencies) >= MIN_SAMPLES:
+            p99 = percentile(sorted(self.latencies), 99)
+            timeout = min(
+                max(p99 * settings.modbus_timeout_multiplier, settings.modbus_timeout_min_ms / 1000),
+                timeout,
+            )
+
+        if abs(timeout - self.timeout) > self.timeout * 0.1:
+            logger.debug(f"匯流排 {self.name} 逾時 {self.timeout:.3f}s -> {timeout:.3f}s")
+            self.timeout = timeout
+            if self.apply_timeout:
+                self.apply_timeout(timeout)
+
+    def reset_latencies(self):
+        """清除回應時間樣本（例如切換波特率後），逾時恢復為 modbus_timeout"""
+        self.latencies.clear()
+        self.timeout = float(settings.modbus_timeout)
+        if self.apply_timeout:
+            self.apply_timeout(self.timeout)
+
+    def get_status_dict(self) -> Dict:
+        values = sorted(self.latencies)
+        return {
+            "state": self.state,
+            "timeout_ms": round(self.timeout * 1000, 1),
+            "adaptive_timeout": settings.modbus_adaptive_timeout,
+            "latency_ms": {
+                "p50": round(percentile(values, 50) * 1000, 2),
+                "p95": round(percentile(values, 95) * 1000, 2),
+                "p99": round(percentile(values, 99) * 1000, 2),
+                "max": round(values[-1] * 1000, 2) if values else 0.0,
+            },
+            "samples": len(values),
+            "consecutive_failures": self.consecutive_failures,
+            "open_seconds": self.open_seconds,
+            "retry_in_s": round(self.retry_in(), 2),
+            **self.stats,
+        }
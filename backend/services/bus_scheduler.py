@@ -0,0 +1,211 @@
+"""Modbus 匯流排請求排程：依優先等級取得匯流排鎖
+
+同一匯流排上的請求原本以 asyncio.Lock 先到先得，使用者按下按鈕時可能排在背景狀態讀取、
+排程觸發與 DevTools 輪詢之後。BusScheduler 取代這把鎖，鎖釋放時直接交給等待中
+優先等級最高的請求：
+
+    safety（安全關閉） > manual（手動操作） > schedule（排程／自動控制） > poll（狀態輪詢）
+
+- 優先等級由呼叫端以 bus_priority() 標記，經 contextvars 傳到取得鎖的地方，
+  未標記的請求視為 manual（API 操作）
+- 老化：每等待 modbus_priority_aging_ms 毫秒提升一級，低優先等級的請求不會餓死
+- 相同的讀取在排隊中時由控制器合併（見 ModbusRelayController._deduplicated_read），
+  合併時以 Ticket.promote 把排隊中的讀取提升到最高的等級
+- 每個等級記錄排隊等待時間直方圖，見 get_status_dict
+"""
+
+import asyncio
+import contextvars
+import itertools
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config import settings
+
+# 等級名稱 -> 排序（數字越小越優先）
+PRIORITIES = {"safety": 0, "manual": 1, "schedule": 2, "poll": 3}
+DEFAULT_PRIORITY = "manual"
+
+# 排隊等待時間直方圖的桶上限（毫秒），最後一桶為更長的等待
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "modbus_priority", default=DEFAULT_PRIORITY
+)
+
+
+@contextmanager
+def bus_priority(priority: str):
+    """標記此區塊內發出的 Modbus 請求的優先等級"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"未知的優先等級 {priority}，可用: {list(PRIORITIES)}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def higher_priority(a: str, b: str) -> str:
+    return a if PRIORITIES[a] <= PRIORITIES[b] else b
+
+
+class Ticket:
+    """一次取得匯流排鎖的請求"""
+
+    __slots__ = ("scheduler", "priority", "seq", "enqueued_at", "future")
+
+    def __init__(self, scheduler: "BusScheduler", priority: str, seq: int):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = 0.0
+        self.future: Optional[asyncio.Future] = None
+
+    def promote(self, priority: str):
+        """提升排隊中的請求的優先等級（已取得鎖時無作用）"""
+        self.priority = higher_priority(self.priority, priority)
+
+    def rank(self, now: float) -> float:
+        """考慮老化後的排序值"""
+        aging = settings.modbus_priority_aging_ms / 1000
+        waited = now - self.enqueued_at
+        return PRIORITIES[self.priority] - (waited / aging if aging > 0 else 0)
+
+    async def __aenter__(self):
+        await self.scheduler._acquire(self)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler._release()
+
+
+class BusScheduler:
+    """依優先等級交出匯流排鎖（可直接以 async with 使用，等級取自 bus_priority）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._locked = False
+        self._holder: Optional[Ticket] = None
+        self._waiters: List[Ticket] = []
+        self._seq = itertools.count()
+        self.stats: Dict[str, Dict] = {
+            priority: {
+                "acquired": 0,
+                "deduplicated": 0,
+                "wait_total_ms": 0.0,
+                "wait_max_ms": 0.0,
+                "histogram": [0] * (len(WAIT_BUCKETS_MS) + 1),
+            }
+            for priority in PRIORITIES
+        }
+
+    def locked(self) -> bool:
+        return self._locked
+
+    def ticket(self, priority: Optional[str] = None) -> Ticket:
+        """建立一個取得鎖的請求，默認使用目前標記的優先等級"""
+        return Ticket(self, priority or current_priority(), next(self._seq))
+
+    async def __aenter__(self):
+        await self._acquire(self.ticket())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._release()
+
+    async def _acquire(self, ticket: Ticket):
+        ticket.enqueued_at = time.monotonic()
+        if not self._locked and not self._waiters:
+            self._locked = True
+            self._granted(ticket)
+            return
+
+        ticket.future = asyncio.get_event_loop().create_future()
+        self._waiters.append(ticket)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            if ticket.future.done() and not ticket.future.cancelled():
+                # 鎖已交給此請求，轉交下一個
+                self._release()
+            elif ticket in self._waiters:
+                self._waiters.remove(ticket)
+            raise
+        self._granted(ticket)
+
+    def _release(self):
+        self._holder = None
+
+        # 直接交給排序最前的請求（鎖保持持有狀態，不讓新來的請求插隊）
+        now = time.monotonic()
+        while self._waiters:
+            ticket = min(self._waiters, key=lambda t: (t.rank(now), t.seq))
+            self._waiters.remove(ticket)
+            if not ticket.future.done():  # 已取消的請求略過
+                ticket.future.set_result(True)
+                return
+        self._locked = False
+
+    def _granted(self, ticket: Ticket):
+        """記錄取得鎖的請求與排隊等待時間"""
+        self._holder = ticket
+        waited_ms = (time.monotonic() - ticket.enqueued_at) * 1000
+        stats = self.stats[ticket.priority]
+        stats["acquired"] += 1
+        stats["wait_total_ms"] += waited_ms
+        stats["wait_max_ms"] = max(stats["wait_max_ms"], waited_ms)
+        bucket = next(
+            (i for i, bound in enumerate(WAIT_BUCKETS_MS) if waited_ms <= bound),
+            len(WAIT_BUCKETS_MS),
+        )
+        stats["histogram"][bucket] += 1
+
+    def record_deduplicated(self, priority: str):
+        self.stats[priority]["deduplicated"] += 1
+
+    @staticmethod
+    def _histogram_percentile(histogram: List[int], pct: float) -> Optional[float]:
+        """由直方圖估計百分位數（返回所在桶的上限，超過最後一桶時為 None）"""
+        total = sum(histogram)
+        if not total:
+            return 0.0
+        target = pct / 100 * total
+        cumulative = 0
+        for i, count in enumerate(histogram):
+            cumulative += count
+            if cumulative >= target:
+                return WAIT_BUCKETS_MS[i] if i < len(WAIT_BUCKETS_MS) else None
+        return None
+
+    def get_status_dict(self) -> Dict:
+        now = time.monotonic()
+        classes = {}
+        for priority, stats in self.stats.items():
+            acquired = stats["acquired"]
+            classes[priority] = {
+                "acquired": acquired,
+                "deduplicated": stats["deduplicated"],
+                "queued": sum(1 for t in self._waiters if t.priority == priority),
+                "wait_mean_ms": round(stats["wait_total_ms"] / acquired, 2) if acquired else 0.0,
+                "wait_p95_ms": self._histogram_percentile(stats["histogram"], 95),
+                "wait_max_ms": round(stats["wait_max_ms"], 2),
+                "histogram": dict(zip(
+                    [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"],
+                    stats["histogram"],
+                )),
+            }
+        return {
+            "locked": self._locked,
+            "holder": self._holder.priority if self._holder else None,
+            "queued": len(self._waiters),
+            "oldest_wait_ms": round(
+                max((now - t.enqueued_at for t in self._waiters), default=0) * 1000, 2
+            ),
+            "aging_ms": settings.modbus_priority_aging_ms,
+            "classes": classes,
+        }
@@ -0,0 +1,175 @@
+"""飼養箱、繼電器與排程配置的讀取快取
+
+/api/tanks、/api/relays、/api/schedules 與排程器每次觸發都要讀取配置，
+但配置只在使用者修改或繼電器狀態改變時才變動。每張表有一個版本號，
+任何 Session 提交了該表的新增、修改或刪除後版本號遞增，下一次讀取才重新查詢。
+
+快取內容包含唯讀的模型物件（依 id 索引）與預先序列化的 JSON bytes 及 ETag，
+列表端點直接返回 bytes，不經過 response_model 驗證與序列化。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Type
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, SQLModel, select
+from models import RelayChannel, Schedule, Tank
+
+logger = logging.getLogger(__name__)
+
+# 快取名稱 -> 模型
+CACHED_MODELS: Dict[str, Type[SQLModel]] = {
+    "tanks": Tank,
+    "relays": RelayChannel,
+    "schedules": Schedule,
+}
+
+_MODEL_NAMES = {model: name for name, model in CACHED_MODELS.items()}
+
+
+class ConfigEntry:
+    """某個版本的配置內容（唯讀，呼叫端不可修改其中的物件）"""
+
+    __slots__ = ("version", "items", "by_id", "body", "etag")
+
+    def __init__(self, version: int, items: List[SQLModel]):
+        self.version = version
+        self.items = items
+        self.by_id = {item.id: item for item in items}
+        self.body = json.dumps(
+            [item.model_dump(mode="json") for item in items],
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+
+
+class ConfigCache:
+    """版本化的配置快取（可在任何執行緒使用）"""
+
+    def __init__(self, db_session_factory: Optional[Callable[[], Session]] = None):
+        """初始化配置快取
+
+        Args:
+            db_session_factory: 資料庫 Session 工廠函數，默認使用全局 engine
+        """
+        if db_session_factory is None:
+            from database import engine
+
+            def db_session_factory():
+                return Session(engine)
+
+        self.db_session_factory = db_session_factory
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {name: 0 for name in CACHED_MODELS}
+        self._entries: Dict[str, ConfigEntry] = {}
+        self.stats = {
+            name: {"hits": 0, "misses": 0, "invalidations": 0}
+            for name in CACHED_MODELS
+        }
+
+    def get(self, name: str) -> ConfigEntry:
+        """取得目前版本的配置，版本過期時重新查詢"""
+        with self._lock:
+            version = self._versions[name]
+            entry = self._entries.get(name)
+            if entry is not None and entry.version == version:
+                self.stats[name]["hits"] += 1
+                return entry
+            self.stats[name]["misses"] += 1
+
+        model = CACHED_MODELS[name]
+        with self.db_session_factory() as session:
+            items = list(session.exec(select(model).order_by(model.id)).all())
+        entry = ConfigEntry(version, items)
+
+        with self._lock:
+            # 查詢期間若又被失效，此內容的版本號已過期，下一次讀取會重新查詢
+            current = self._entries.get(name)
+            if current is None or current.version <= version:
+                self._entries[name] = entry
+        return entry
+
+    def get_item(self, name: str, item_id: int) -> Optional[SQLModel]:
+        """依 id 取得單筆配置（唯讀）"""
+        return self.get(name).by_id.get(item_id)
+
+    def invalidate(self, *names: str):
+        """使指定的配置失效，未指定時全部失效"""
+        with self._lock:
+            for name in names or CACHED_MODELS:
+                self._versions[name] += 1
+                self.stats[name]["invalidations"] += 1
+
+    def get_status_dict(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    "version": self._versions[name],
+                    "cached": name in self._entries
+                    and self._entries[name].version == self._versions[name],
+                    "items": len(self._entries[name].items) if name in self._entries else 0,
+                    **self.stats[name],
+                }
+                for name in CACHED_MODELS
+            }
+
+
+# 全局配置快取實例
+_cache: Optional[ConfigCache] = None
+
+
+def get_config_cache() -> ConfigCache:
+    """取得全局配置快取"""
+    global _cache
+    if _cache is None:
+        _cache = ConfigCache()
+    return _cache
+
+
+def cached_json_response(request: Request, name: str) -> Response:
+    """以快取的 JSON bytes 回應，支援 If-None-Match（未變更時返回 304）"""
+    entry = get_config_cache().get(name)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+
+    if_none_match: Optional[str] = request.headers.get("if-none-match")
+    if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _collect_changes(session: OrmSession, flush_context):
+    """flush 時記錄本交易修改了哪些配置表，commit 後才失效"""
+    changed = session.info.setdefault("config_changes", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        name = _MODEL_NAMES.get(type(instance))
+        if name is not None:
+            changed.add(name)
+
+
+def _invalidate_changes(session: OrmSession):
+    changed = session.info.pop("config_changes", None)
+    if changed:
+        get_config_cache().invalidate(*changed)
+
+
+def _discard_changes(session: OrmSession):
+    session.info.pop("config_changes", None)
+
+
+def install_config_cache_hooks():
+    """註冊配置變更失效（應用啟動時呼叫一次）
+
+    所有經過 ORM 的新增、修改、刪除（API、排程器、設備控制）都會在 commit 後
+    使對應的快取失效；不經過 ORM 的批量 UPDATE 須自行呼叫 invalidate()。
+    """
+    if event.contains(OrmSession, "after_flush", _collect_changes):
+        return
+    event.listen(OrmSession, "after_flush", _collect_changes)
+    event.listen(OrmSession, "after_commit", _invalidate_changes)
+    event.listen(OrmSession, "after_rollback", _discard_changes)
@@ -4,9 +4,12 @@ import logging
 from typing import Optional, Dict
 from datetime import datetime
 from sqlmodel import Session, select
-from models import RelayChannel, EventLog, TemperatureLog, Tank
+from models import RelayChannel, EventLog, Tank
+from services.bus_scheduler import bus_priority
 from services.modbus_controller import get_controller
+from services.relay_pool import get_relay_pool
 from services.temperature_monitor import get_monitor_service
+from services.temperature_log_writer import get_temperature_log_writer
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +61,8 @@ class DeviceControlService:
         self,
         channel: int,
         state: bool,
-        manual: bool = False
+        manual: bool = False,
+        device_address: Optional[int] = None
     ) -> bool:
         """設置繼電器通道狀態
         
@@ -66,16 +70,21 @@ class DeviceControlService:
             channel: 通道編號 (0-15)
             state: 開關狀態
             manual: 是否為手動操作
+            device_address: 繼電器板的 Modbus 設備地址，None 表示預設板
         """
         # 控制硬件
-        success = await self.relay_controller.set_relay(channel, state)
+        controller = get_controller(device_address=device_address)
+        success = await controller.set_relay(channel, state)
         
         if not success:
             logger.error(f"設置繼電器 {channel} 失敗")
             return False
         
         # 更新資料庫
-        stmt = select(RelayChannel).where(RelayChannel.channel == channel)
+        stmt = select(RelayChannel).where(
+            RelayChannel.channel == channel,
+            RelayChannel.device_address == device_address
+        )
         relay = self.db.exec(stmt).first()
         
         if relay:
@@ -111,15 +120,13 @@ class DeviceControlService:
             logger.warning(f"無法解析感測器 ID: {sensor_id}")
             return
         
-        # 記錄到資料庫
-        temp_log = TemperatureLog(
+        # 交由批次寫入器記錄到資料庫
+        await get_temperature_log_writer().submit(
             tank_id=tank_id,
             temperature=reading["temperature"],
             humidity=reading.get("humidity"),
             sensor_id=sensor_id
         )
-        self.db.add(temp_log)
-        self.db.commit()
         
         # 檢查是否需要自動控制
         await self.check_temperature_control(tank_id, reading["temperature"])
@@ -144,11 +151,17 @@ class DeviceControlService:
             if temperature < tank.target_temp_min:
                 # 溫度過低，開啟加熱
                 if not relay.current_state:
-                    await self.set_relay_channel(relay.channel, True, manual=False)
+                    with bus_priority("schedule"):
+                        await self.set_relay_channel(
+                            relay.channel, True, manual=False, device_address=relay.device_address
+                        )
             elif temperature > tank.target_temp_max:
-                # 溫度過高，關閉加熱
+                # 溫度過高，關閉加熱（安全關閉）
                 if relay.current_state:
-                    await self.set_relay_channel(relay.channel, False, manual=False)
+                    with bus_priority("safety"):
+                        await self.set_relay_channel(
+                            relay.channel, False, manual=False, device_address=relay.device_address
+                        )
     
     async def handle_temperature_alert(self, reading: Dict, alert_type: str):
         """處理溫度告警"""
@@ -164,18 +177,29 @@ class DeviceControlService:
         logger.warning(f"溫度告警: {reading['sensor_id']} = {reading['temperature']:.1f}°C")
     
     async def sync_relay_states(self):
-        """同步所有繼電器狀態到資料庫"""
-        states = await self.relay_controller.read_all_relays()
-        
-        if not states:
-            logger.error("無法讀取繼電器狀態")
-            return
-        
-        for channel, state in enumerate(states):
-            stmt = select(RelayChannel).where(RelayChannel.channel == channel)
-            relay = self.db.exec(stmt).first()
+        """同步所有繼電器板的狀態到資料庫"""
+        pool = get_relay_pool()
+        
+        # 每塊板讀取一次全部線圈，不同匯流排並行
+        addresses = list(pool.controllers)
+        with bus_priority("poll"):
+            results = await asyncio.gather(
+                *(pool.controllers[address].read_all_relays() for address in addresses)
+            )
+        board_states = dict(zip(addresses, results))
+        
+        relays = self.db.exec(select(RelayChannel)).all()
+        
+        for relay in relays:
+            address = relay.device_address or pool.default_address
+            states = board_states.get(address)
+            
+            if not states:
+                logger.error(f"無法讀取繼電器板 {address} 的狀態")
+                continue
             
-            if relay and relay.current_state != state:
+            state = states[relay.channel]
+            if relay.current_state != state:
                 relay.current_state = state
                 relay.updated_at = datetime.utcnow()
                 self.db.add(relay)
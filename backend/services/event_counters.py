@@ -0,0 +1,149 @@
+"""事件統計
+
+/api/events/stats 以 GROUP BY 在資料庫中依嚴重性與事件類型計數。
+啟用 event_counters 時，每筆 EventLog 寫入的同一交易中以 UPSERT 累加每小時計數表，
+統計只需加總最多 24 個整點時間桶，再以 (severity, timestamp) 索引補上
+視窗開頭不足一小時的部分；告警風暴時統計的成本不隨事件數增長。
+
+啟動時重算最近一個統計視窗的計數，涵蓋停用期間或舊版本寫入的事件。
+"""
+
+import logging
+from typing import Dict, Iterable, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, col, select
+from config import settings
+from models import EventCounter, EventLog
+from services.temperature_rollup import bucket_start
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 3600
+
+ALERT_SEVERITIES = ("warning", "error", "critical")
+
+Counts = Dict[Tuple[str, str], int]
+
+
+def _counter_upsert():
+    stmt = sqlite_insert(EventCounter)
+    return stmt.on_conflict_do_update(
+        index_elements=["bucket_start", "severity", "event_type"],
+        set_={"count": EventCounter.count + stmt.excluded["count"]},
+    )
+
+
+def _counter_row(target: EventLog, delta: int) -> Dict:
+    return {
+        "bucket_start": bucket_start(target.timestamp, BUCKET_SECONDS),
+        "severity": target.severity,
+        "event_type": target.event_type,
+        "count": delta,
+    }
+
+
+def _count_inserted(mapper, connection, target: EventLog):
+    connection.execute(_counter_upsert(), [_counter_row(target, 1)])
+
+
+def _count_deleted(mapper, connection, target: EventLog):
+    connection.execute(_counter_upsert(), [_counter_row(target, -1)])
+
+
+def install_event_counter_hooks():
+    """註冊 EventLog 寫入計數（應用啟動時呼叫一次，event_counters 停用時不註冊）
+
+    只涵蓋經過 ORM 的新增與逐筆刪除；批量刪除舊事件不影響統計視窗內的計數。
+    """
+    if not settings.event_counters or event.contains(EventLog, "after_insert", _count_inserted):
+        return
+    event.listen(EventLog, "after_insert", _count_inserted)
+    event.listen(EventLog, "after_delete", _count_deleted)
+
+
+def query_event_counts(
+    session: Session, since: datetime, until: datetime, severities: Iterable[str]
+) -> Counts:
+    """以 GROUP BY 計算時間範圍內各 (嚴重性, 事件類型) 的事件數"""
+    stmt = (
+        select(EventLog.severity, EventLog.event_type, func.count())
+        .where(col(EventLog.severity).in_(list(severities)))
+        .where(EventLog.timestamp >= since)
+        .where(EventLog.timestamp < until)
+        .group_by(EventLog.severity, EventLog.event_type)
+    )
+    return {(severity, event_type): count for severity, event_type, count in session.exec(stmt)}
+
+
+def query_counter_counts(
+    session: Session, since_bucket: datetime, severities: Iterable[str]
+) -> Counts:
+    """加總計數表中 since_bucket 之後的整點時間桶"""
+    stmt = (
+        select(EventCounter.severity, EventCounter.event_type, func.sum(EventCounter.count))
+        .where(col(EventCounter.severity).in_(list(severities)))
+        .where(EventCounter.bucket_start >= since_bucket)
+        .group_by(EventCounter.severity, EventCounter.event_type)
+    )
+    return {(severity, event_type): count for severity, event_type, count in session.exec(stmt)}
+
+
+def count_recent_events(
+    session: Session, hours: int = 24, severities: Iterable[str] = ALERT_SEVERITIES
+) -> Counts:
+    """最近 hours 小時內各 (嚴重性, 事件類型) 的事件數"""
+    severities = list(severities)
+    now = datetime.utcnow()
+    since = now - timedelta(hours=hours)
+
+    if not settings.event_counters:
+        return query_event_counts(session, since, now + timedelta(seconds=1), severities)
+
+    # 視窗開頭不足一小時的部分讀原始記錄，其餘讀整點計數
+    first_full_bucket = bucket_start(since, BUCKET_SECONDS)
+    if first_full_bucket < since:
+        first_full_bucket += timedelta(seconds=BUCKET_SECONDS)
+
+    counts = query_event_counts(session, since, first_full_bucket, severities)
+    for key, count in query_counter_counts(session, first_full_bucket, severities).items():
+        if count:
+            counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def rebuild_event_counters(db_session_factory, hours: int = 24) -> int:
+    """以原始記錄重算最近 hours 小時（含開頭的整點時間桶）的計數，並清除更舊的計數
+
+    Returns:
+        重算的時間桶列數
+    """
+    if not settings.event_counters:
+        return 0
+
+    since_bucket = bucket_start(datetime.utcnow() - timedelta(hours=hours), BUCKET_SECONDS)
+    hour = func.strftime("%Y-%m-%d %H:00:00", EventLog.timestamp)
+
+    with db_session_factory() as session:
+        rows = session.exec(
+            select(hour, EventLog.severity, EventLog.event_type, func.count())
+            .where(EventLog.timestamp >= since_bucket)
+            .group_by(hour, EventLog.severity, EventLog.event_type)
+        ).all()
+
+        session.execute(delete(EventCounter))
+        if rows:
+            session.execute(sqlite_insert(EventCounter), [
+                {
+                    "bucket_start": datetime.fromisoformat(bucket),
+                    "severity": severity,
+                    "event_type": event_type,
+                    "count": count,
+                }
+                for bucket, severity, event_type, count in rows
+            ])
+        session.commit()
+
+    logger.info(f"已重算最近 {hours} 小時的事件計數（{len(rows)} 個時間桶）")
+    return len(rows)
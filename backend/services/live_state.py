@@ -0,0 +1,163 @@
+"""即時狀態推送
+
+繼電器狀態變化、新的溫度讀數與新事件發生時，以差異（delta）推送給訂閱對應主題的
+WebSocket 客戶端，取代前端定時輪詢。沒有訂閱者時 publish 直接返回。
+
+主題：
+- relays: 線圈映像變化 [{"device_address", "channel", "state"}]
+- temperature: 每個輪詢週期的讀數與輪詢統計
+- events: 新寫入的 EventLog
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from models import EventLog
+from services.websocket_manager import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("relays", "temperature", "events")
+
+
+class LiveStateHub:
+    """即時狀態推送中心"""
+
+    def __init__(self):
+        self.manager = ConnectionManager()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """記錄事件循環，讓其他執行緒（同步路由、執行緒池）也能發布"""
+        self._loop = loop
+
+    def publish(self, topic: str, data: Any, coalesce_key: Optional[str] = None):
+        """發布差異訊息（可在任何執行緒呼叫，不會阻塞）
+
+        coalesce_key: 客戶端尚未送出的同鍵訊息會被取代（適用於完整狀態，不適用於差異）
+        """
+        if not self.manager.has_subscribers(topic) or self._loop is None:
+            return
+
+        message = {
+            "topic": topic,
+            "type": "delta",
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self._loop:
+            self.manager.publish(message, topic, coalesce_key)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.manager.publish, message, topic, coalesce_key)
+
+    def publish_relay_changes(
+        self, device_address: int, previous: Optional[List[bool]], current: List[bool]
+    ):
+        """比較線圈映像前後差異並發布"""
+        changes = [
+            {"device_address": device_address, "channel": channel, "state": state}
+            for channel, state in enumerate(current)
+            if previous is None or previous[channel] != state
+        ]
+        if changes:
+            self.publish("relays", changes)
+
+
+# 全局推送中心實例
+_hub: Optional[LiveStateHub] = None
+
+
+def get_live_hub() -> LiveStateHub:
+    """取得全局即時狀態推送中心"""
+    global _hub
+    if _hub is None:
+        _hub = LiveStateHub()
+    return _hub
+
+
+def _collect_event(mapper, connection, target: EventLog):
+    """EventLog 寫入時序列化並暫存於 Session，commit 後才推送"""
+    if get_live_hub().manager.has_subscribers("events"):
+        session = OrmSession.object_session(target)
+        if session is not None:
+            from serializers import event_to_dict
+
+            session.info.setdefault("live_events", []).append(event_to_dict(target))
+
+
+def _publish_events(session: OrmSession):
+    pending: List[Dict] = session.info.pop("live_events", [])
+    if pending:
+        get_live_hub().publish("events", pending)
+
+
+def _discard_events(session: OrmSession):
+    session.info.pop("live_events", None)
+
+
+def install_event_hooks():
+    """註冊 EventLog 寫入推送（應用啟動時呼叫一次）"""
+    if event.contains(EventLog, "after_insert", _collect_event):
+        return
+    event.listen(EventLog, "after_insert", _collect_event)
+    event.listen(OrmSession, "after_commit", _publish_events)
+    event.listen(OrmSession, "after_rollback", _discard_events)
+
+
+def build_topic_snapshot(topic: str) -> Dict:
+    """主題的完整初始狀態，訂閱時送出一次，之後只送差異"""
+    from sqlmodel import Session, select
+    from database import engine
+
+    if topic == "relays":
+        from services.config_cache import get_config_cache
+        from services.relay_pool import get_relay_pool
+
+        # 之後的差異由線圈映像產生，初始狀態也以線圈映像為準（映像未初始化時使用資料庫的 current_state）
+        pool = get_relay_pool()
+        images = {
+            address: controller.get_coil_image() for address, controller in pool.controllers.items()
+        }
+        relays = []
+        for relay in get_config_cache().get("relays").items:
+            data = relay.model_dump(mode="json")
+            image = images.get(
+                relay.device_address if relay.device_address is not None else pool.default_address
+            )
+            if image is not None:
+                data["current_state"] = image[relay.channel]
+            relays.append(data)
+        return {
+            "relays": relays,
+            "default_device_address": pool.default_address,
+        }
+
+    if topic == "temperature":
+        from services.temperature_monitor import get_monitor_service
+
+        monitor = get_monitor_service()
+        return {
+            "sensor_status": monitor.get_sensor_status(),
+            "poll_stats": monitor.get_poll_stats(),
+        }
+
+    if topic == "events":
+        from sqlmodel import col
+        from serializers import event_to_dict
+
+        with Session(engine) as session:
+            events = session.exec(
+                select(EventLog).order_by(col(EventLog.timestamp).desc()).limit(20)
+            ).all()
+            return {"events": [event_to_dict(event) for event in events]}
+
+    raise ValueError(f"未知的主題: {topic}")
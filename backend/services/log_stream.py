@@ -0,0 +1,301 @@
+"""開發者日誌推送（/api/dev/logs）
+
+日誌記錄只放入固定大小的環形緩衝區，emit 不建立協程也不序列化。
+有訂閱者時由單一背景任務每 websocket_log_batch_ms 毫秒把新記錄整批取出，
+依每個連接的等級與 logger 篩選組成一個 frame 推送；沒有訂閱者時不喚醒背景任務。
+新連接先補送緩衝區中最近的記錄（replay）。
+
+推送格式：{"type": "logs" | "replay", "logs": [{"seq", "timestamp", "level", ...}]}
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from fastapi import WebSocket
+from config import settings
+from services.websocket_manager import ConnectionManager, serialize_message
+
+
+def _parse_level(level) -> int:
+    """等級名稱或數值轉為 logging 等級，無法辨識時返回 DEBUG"""
+    if isinstance(level, int):
+        return level
+    if isinstance(level, str):
+        value = logging.getLevelName(level.strip().upper())
+        if isinstance(value, int):
+            return value
+    return logging.DEBUG
+
+
+def _parse_loggers(loggers) -> Tuple[str, ...]:
+    """logger 名稱列表（逗號分隔字串或列表）"""
+    if isinstance(loggers, str):
+        loggers = loggers.split(",")
+    return tuple(sorted({name.strip() for name in loggers or [] if name and name.strip()}))
+
+
+class LogSubscription:
+    """單一連接的篩選條件與已送出的最後序號"""
+
+    __slots__ = ("level", "loggers", "last_seq")
+
+    def __init__(self, level: int = logging.DEBUG, loggers: Tuple[str, ...] = (), last_seq: int = 0):
+        self.level = level
+        self.loggers = loggers
+        self.last_seq = last_seq
+
+    @property
+    def key(self) -> Tuple[int, Tuple[str, ...]]:
+        """篩選條件相同的連接共用同一份序列化結果"""
+        return self.level, self.loggers
+
+    def accepts(self, levelno: int, name: str) -> bool:
+        if levelno < self.level:
+            return False
+        if not self.loggers:
+            return True
+        return any(name == prefix or name.startswith(prefix + ".") for prefix in self.loggers)
+
+    def to_dict(self) -> Dict:
+        return {"level": logging.getLevelName(self.level), "loggers": list(self.loggers)}
+
+
+class WebSocketLogHandler(logging.Handler):
+    """日誌處理器：只寫入環形緩衝區，必要時通知背景任務（可在任何執行緒呼叫）"""
+
+    def __init__(self, stream: "LogStream"):
+        super().__init__()
+        self.stream = stream
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.append(record)
+        except Exception:
+            # 避免日誌處理器本身產生錯誤造成無限循環
+            pass
+
+
+class LogStream:
+    """日誌環形緩衝區、訂閱篩選與批次推送任務"""
+
+    def __init__(
+        self,
+        buffer_size: Optional[int] = None,
+        batch_ms: Optional[int] = None,
+        replay: Optional[int] = None,
+    ):
+        self.replay = settings.websocket_log_replay if replay is None else replay
+        self.batch_interval = (
+            settings.websocket_log_batch_ms if batch_ms is None else batch_ms
+        ) / 1000
+        self.buffer_size = max(buffer_size or settings.websocket_log_buffer_size, self.replay, 1)
+        self.manager = ConnectionManager()
+        self.subscriptions: Dict[WebSocket, LogSubscription] = {}
+        self.buffer: Deque[Tuple[int, logging.LogRecord]] = deque(maxlen=self.buffer_size)
+        self._seq = itertools.count(1)
+        self._buffer_lock = threading.Lock()
+        self._drained_seq = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wakeup_pending = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "records": 0,
+            "frames": 0,
+            "overrun": 0,  # 推送前已被環形緩衝區覆蓋的記錄
+        }
+
+    # ---- 日誌寫入（任何執行緒） ----
+
+    def append(self, record: logging.LogRecord):
+        with self._buffer_lock:
+            self.buffer.append((next(self._seq), record))
+        self.stats["records"] += 1
+
+        if not self.subscriptions or self._wakeup_pending or self._loop is None:
+            return
+        self._wakeup_pending = True
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            self._wakeup.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _records_after(self, seq: int) -> List[Tuple[int, logging.LogRecord]]:
+        with self._buffer_lock:
+            if not self.buffer or self.buffer[-1][0] <= seq:
+                return []
+            return [item for item in self.buffer if item[0] > seq]
+
+    @staticmethod
+    def format_record(seq: int, record: logging.LogRecord) -> Dict:
+        try:
+            message = record.getMessage()
+        except Exception:
+            message = str(record.msg)
+        return {
+            "seq": seq,
+            "timestamp": datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3],
+            "level": record.levelname,
+            "name": record.name,
+            "message": message,
+            "pathname": f"{record.module}.py",
+            "lineno": record.lineno,
+        }
+
+    # ---- 背景推送任務 ----
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        with self._buffer_lock:
+            self._drained_seq = self.buffer[-1][0] if self.buffer else 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._loop = None
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # 累積一個批次窗口內的記錄再推送
+            await asyncio.sleep(self.batch_interval)
+            self._wakeup.clear()
+            self._wakeup_pending = False
+            self.drain()
+
+    def drain(self) -> int:
+        """把上次推送後的新記錄依篩選條件推送給每個連接，返回送出的 frame 數"""
+        items = self._records_after(self._drained_seq)
+        if not items:
+            return 0
+        if items[0][0] > self._drained_seq + 1:
+            self.stats["overrun"] += items[0][0] - self._drained_seq - 1
+        self._drained_seq = items[-1][0]
+
+        if not self.subscriptions:
+            return 0
+
+        entries = [
+            (seq, record.levelno, record.name, self.format_record(seq, record))
+            for seq, record in items
+        ]
+        frames: Dict[Tuple, Optional[str]] = {}
+        sent = 0
+        for websocket, subscription in list(self.subscriptions.items()):
+            after = subscription.last_seq
+            subscription.last_seq = self._drained_seq
+            if after >= self._drained_seq:
+                continue
+
+            # 篩選條件相同且沒有補送重疊的連接共用同一份 frame
+            key = subscription.key if after < entries[0][0] else (*subscription.key, after)
+            if key not in frames:
+                logs = [
+                    entry for seq, levelno, name, entry in entries
+                    if seq > after and subscription.accepts(levelno, name)
+                ]
+                frames[key] = serialize_message({"type": "logs", "logs": logs}) if logs else None
+            if frames[key] is not None:
+                self.manager.send_text(websocket, frames[key])
+                sent += 1
+
+        self.stats["frames"] += sent
+        return sent
+
+    # ---- 連接管理 ----
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        level=None,
+        loggers: Optional[Iterable[str]] = None,
+        replay: Optional[int] = None,
+    ):
+        """接受連接、補送最近的記錄並開始推送
+
+        Args:
+            level: 最低日誌等級（名稱或數值）
+            loggers: 只接收這些 logger（含子 logger）的記錄，空表示全部
+            replay: 補送的最近記錄筆數，None 使用預設值，上限為緩衝區大小
+        """
+        await self.manager.connect(websocket)
+        subscription = LogSubscription(_parse_level(level), _parse_loggers(loggers))
+        count = self.replay if replay is None else max(0, min(replay, self.buffer_size))
+
+        with self._buffer_lock:
+            items = list(self.buffer)
+        subscription.last_seq = items[-1][0] if items else self._drained_seq
+        if not self.subscriptions:
+            # 沒有訂閱者期間的記錄不需要推送
+            self._drained_seq = subscription.last_seq
+        self.subscriptions[websocket] = subscription
+
+        if count:
+            logs = [
+                self.format_record(seq, record) for seq, record in items
+                if subscription.accepts(record.levelno, record.name)
+            ][-count:]
+            if logs:
+                self.manager.send_personal(websocket, {"type": "replay", "logs": logs})
+
+    def update_filters(self, websocket: WebSocket, level=None, loggers=None):
+        """調整連接的篩選條件（None 表示不變）"""
+        subscription = self.subscriptions.get(websocket)
+        if subscription is None:
+            return
+        if level is not None:
+            subscription.level = _parse_level(level)
+        if loggers is not None:
+            subscription.loggers = _parse_loggers(loggers)
+
+    async def disconnect(self, websocket: WebSocket):
+        self.subscriptions.pop(websocket, None)
+        await self.manager.disconnect(websocket)
+
+    def get_status_dict(self) -> Dict:
+        status = self.manager.get_status_dict()
+        filters = {
+            client.id: self.subscriptions[websocket].to_dict()
+            for websocket, client in list(self.manager.clients.items())
+            if websocket in self.subscriptions
+        }
+        for client in status["clients"]:
+            client["filters"] = filters.get(client["id"])
+        return {
+            **status,
+            "buffer_size": self.buffer_size,
+            "buffered": len(self.buffer),
+            "batch_ms": round(self.batch_interval * 1000),
+            "replay": self.replay,
+            "log_stream": dict(self.stats),
+        }
+
+
+# 全局日誌推送實例
+_stream: Optional[LogStream] = None
+
+
+def get_log_stream() -> LogStream:
+    """取得全局日誌推送實例"""
+    global _stream
+    if _stream is None:
+        _stream = LogStream()
+    return _stream
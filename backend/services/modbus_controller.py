@@ -2,15 +2,343 @@
 
 import asyncio
 import logging
+import time
 from typing import Optional, List, Dict
 from datetime import datetime
-from pymodbus.client import ModbusSerialClient
 from pymodbus.exceptions import ModbusException
 from config import settings
+from services.bus_health import BusHealth, CircuitOpenError
+from services.bus_scheduler import BusScheduler, bus_priority, current_priority, higher_priority
+from services.live_state import get_live_hub
+from services.single_flight import get_single_flight
+from services.modbus_simulator import SimulatedModbusClient
+from services.modbus_transport import (
+    BAUDRATE_CODES,
+    COIL_OFF,
+    COIL_ON,
+    FIRMWARE_ALL_RELAYS,
+    FIRMWARE_FLASH_MAX_UNITS,
+    FIRMWARE_FLASH_OFF,
+    FIRMWARE_FLASH_ON,
+    FIRMWARE_FLASH_UNIT_MS,
+    FIRMWARE_TOGGLE,
+    FIRMWARE_TOGGLE_ALL,
+    PARITY_CODES,
+    REGISTER_FIRMWARE_VERSION,
+    REGISTER_SERIAL,
+    ModbusTransport,
+    ExecutorTransport,
+    create_serial_transport,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class ModbusBus:
+    """一條實體 Modbus RTU 匯流排（一個串口）
+
+    同一匯流排上的所有設備共用傳輸層，並以同一把鎖序列化請求；
+    鎖依優先等級交出（services/bus_scheduler.py），不同匯流排之間互不阻塞。請求經過 health（services/bus_health.py）：
+    逾時依實測回應時間調整，連續無回應時斷路，請求立即失敗而不佔用鎖等待逾時。
+
+    波特率切換：
+    change_baudrate 在持有匯流排鎖的情況下依序探測目前波特率、寫入寄存器 0x2000、
+    以新波特率重新開啟串口並讀取韌體版本（0x8000）驗證，任一設備驗證失敗即把所有
+    設備改回原波特率。板子在回應寫入後立即切換，新的波特率保存在板上，重啟後仍然有效，
+    切換成功後須同步更新 MODBUS_BAUDRATE（或 MODBUS_BOARDS 的 baudrate）。
+    """
+
+    def __init__(self, port: str, baudrate: int, simulation_mode: bool = False):
+        """初始化匯流排
+
+        Args:
+            port: 串口端口
+            baudrate: 波特率
+            simulation_mode: 模擬模式，使用記憶體中的模擬繼電器板
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.simulation_mode = simulation_mode
+        self.lock = BusScheduler(port)
+        self.transport: Optional[ModbusTransport] = None
+        self.last_baudrate_change: Optional[Dict] = None
+        self.health = BusHealth(port, apply_timeout=self._apply_timeout)
+
+        # 模擬模式使用記憶體中的模擬板，走與實際硬件相同的程式路徑
+        if self.simulation_mode:
+            self.transport = ExecutorTransport(
+                SimulatedModbusClient(baudrate=self.baudrate), self.baudrate
+            )
+            self._apply_timeout(self.health.timeout)
+
+    def is_open(self) -> bool:
+        return self.transport.is_open() if self.transport else False
+
+    def _apply_timeout(self, seconds: float):
+        if self.transport:
+            self.transport.set_timeout(seconds)
+
+    async def connect(self) -> bool:
+        """連接匯流排（已連接時直接返回）"""
+        if self.is_open():
+            return True
+
+        if self.simulation_mode:
+            logger.info(f"模擬模式：使用模擬繼電器板 ({self.port})")
+            return await self.transport.connect()
+
+        try:
+            self.transport = create_serial_transport(self.port, self.baudrate)
+            self._apply_timeout(self.health.timeout)
+            connected = await self.transport.connect()
+        except Exception as e:
+            logger.error(f"連接 Modbus 匯流排 {self.port} 時發生錯誤: {e}")
+            return False
+
+        if connected:
+            logger.info(f"成功連接到 Modbus 匯流排: {self.port} (transport={self.transport.name})")
+        return connected
+
+    async def close(self):
+        """關閉匯流排"""
+        if not self.transport:
+            return
+
+        try:
+            await self.transport.close()
+            logger.info(f"已斷開 Modbus 匯流排: {self.port}")
+        except Exception as e:
+            logger.error(f"斷開匯流排 {self.port} 時發生錯誤: {e}")
+
+    async def _reopen(self, baudrate: int) -> bool:
+        """以指定波特率重新開啟串口（呼叫者需持有 lock）"""
+        await self.close()
+        if baudrate != self.baudrate:
+            # 回應時間隨波特率改變，重新累積樣本
+            self.health.reset_latencies()
+        self.baudrate = baudrate
+
+        if self.simulation_mode:
+            client = self.transport.client
+            client.baudrate = baudrate
+            self.transport = ExecutorTransport(client, baudrate)
+            self._apply_timeout(self.health.timeout)
+            return await self.transport.connect()
+
+        try:
+            self.transport = create_serial_transport(self.port, baudrate)
+            self._apply_timeout(self.health.timeout)
+            return await self.transport.connect()
+        except Exception as e:
+            logger.error(f"以 {baudrate} baud 重新開啟匯流排 {self.port} 時發生錯誤: {e}")
+            return False
+
+    async def _read_firmware_version(self, device_id: int) -> Optional[int]:
+        """讀取韌體版本寄存器（呼叫者需持有 lock），無回應時返回 None"""
+        try:
+            response = await self.transport.read_holding_registers(
+                address=REGISTER_FIRMWARE_VERSION, count=1, device_id=device_id
+            )
+        except Exception as e:
+            logger.debug(f"讀取設備 {device_id} 韌體版本失敗 ({self.baudrate} baud): {e}")
+            return None
+        if response.isError() or not response.registers:
+            return None
+        return response.registers[0]
+
+    async def _verify(self, device_ids: List[int]) -> Optional[Dict[int, str]]:
+        """以目前波特率讀取所有設備的韌體版本（呼叫者需持有 lock）
+
+        Returns:
+            {設備地址: 版本字串}，任一設備無回應時返回 None
+        """
+        versions = {}
+        for device_id in device_ids:
+            version = await self._read_firmware_version(device_id)
+            if version is None:
+                return None
+            versions[device_id] = f"V{version / 100:.2f}"
+        return versions
+
+    async def _measure_frames_per_second(self, device_ids: List[int], frames: int) -> float:
+        """背靠背送出韌體版本讀取，量測每秒完成的幀數（呼叫者需持有 lock）"""
+        start = time.perf_counter()
+        for i in range(frames):
+            await self._read_firmware_version(device_ids[i % len(device_ids)])
+        return round(frames / (time.perf_counter() - start), 1)
+
+    async def _probe_locked(self, device_ids: List[int]) -> Optional[int]:
+        """找出設備目前使用的波特率（呼叫者需持有 lock）
+
+        先試目前設定的波特率，再依常用程度試其餘波特率；找不到時恢復原波特率並返回 None。
+        """
+        original = self.baudrate
+        candidates = [original] + sorted(
+            (rate for rate in BAUDRATE_CODES if rate != original),
+            key=lambda rate: (rate not in (9600, 115200), rate),
+        )
+        for rate in candidates:
+            if rate != self.baudrate and not await self._reopen(rate):
+                continue
+            if await self._verify(device_ids) is not None:
+                return rate
+
+        await self._reopen(original)
+        return None
+
+    async def detect_baudrate(self, device_ids: List[int]) -> Optional[int]:
+        """探測設備目前的波特率並以之開啟匯流排
+
+        Returns:
+            偵測到的波特率，所有波特率都無回應時返回 None
+        """
+        async with self.lock:
+            configured = self.baudrate
+            detected = await self._probe_locked(device_ids)
+        if detected is not None and detected != configured:
+            logger.warning(
+                f"匯流排 {self.port} 的設備使用 {detected} baud（設定為 {configured}），"
+                f"請更新 MODBUS_BAUDRATE 或 MODBUS_BOARDS 的 baudrate"
+            )
+        return detected
+
+    async def _write_baudrate(self, device_ids: List[int], baudrate: int) -> List[int]:
+        """對每個設備寫入波特率寄存器（呼叫者需持有 lock），返回確認寫入的設備地址"""
+        value = (PARITY_CODES.get(settings.modbus_parity.upper(), 0) << 8) | BAUDRATE_CODES[baudrate]
+        written = []
+        for device_id in device_ids:
+            try:
+                response = await self.transport.write_register(
+                    address=REGISTER_SERIAL, value=value, device_id=device_id
+                )
+                if not response.isError():
+                    written.append(device_id)
+                    continue
+                logger.error(f"設備 {device_id} 拒絕波特率設定: {response}")
+            except Exception as e:
+                logger.error(f"寫入設備 {device_id} 波特率時發生錯誤: {e}")
+        return written
+
+    async def change_baudrate(
+        self, baudrate: int, device_ids: List[int], probe_frames: Optional[int] = None
+    ) -> Dict:
+        """把匯流排上所有設備切換到新的波特率，失敗時回滾
+
+        Args:
+            baudrate: 目標波特率（4800 ~ 256000 之一）
+            device_ids: 匯流排上的設備地址
+            probe_frames: 每個波特率量測吞吐量時送出的幀數
+
+        Returns:
+            {"from", "to", "success", "rolled_back", "frames_per_second", "firmware_versions", ...}
+        """
+        if baudrate not in BAUDRATE_CODES:
+            raise ValueError(f"不支援的波特率 {baudrate}，可用: {list(BAUDRATE_CODES)}")
+        if not device_ids:
+            raise ValueError("匯流排上沒有設備")
+        frames = probe_frames or settings.modbus_baud_probe_frames
+
+        report = {
+            "port": self.port,
+            "from": None,
+            "to": baudrate,
+            "success": False,
+            "rolled_back": False,
+            "frames_per_second": {},
+            "firmware_versions": {},
+            "error": None,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
+        async with self.lock:
+            current = await self._probe_locked(device_ids)
+            if current is None:
+                report["error"] = "所有波特率下都讀不到韌體版本，未做任何變更"
+                return self._finish_baudrate_change(report)
+
+            report["from"] = current
+            report["firmware_versions"] = await self._verify(device_ids)
+            report["frames_per_second"][current] = await self._measure_frames_per_second(
+                device_ids, frames
+            )
+            if current == baudrate:
+                report["success"] = True
+                return self._finish_baudrate_change(report)
+
+            written = await self._write_baudrate(device_ids, baudrate)
+            if len(written) == len(device_ids) and await self._reopen(baudrate):
+                # 板子回應寫入後才切換，稍等再驗證
+                await asyncio.sleep(0.05)
+                versions = await self._verify(device_ids)
+                if versions is not None:
+                    report["success"] = True
+                    report["firmware_versions"] = versions
+                    report["frames_per_second"][baudrate] = (
+                        await self._measure_frames_per_second(device_ids, frames)
+                    )
+                    return self._finish_baudrate_change(report)
+                report["error"] = f"以 {baudrate} baud 驗證韌體版本失敗"
+            else:
+                report["error"] = f"寫入波特率失敗（確認寫入的設備: {written}）"
+
+            report["rolled_back"] = await self._rollback_baudrate(device_ids, current, baudrate)
+            return self._finish_baudrate_change(report)
+
+    async def _rollback_baudrate(self, device_ids: List[int], original: int, attempted: int) -> bool:
+        """把所有設備改回 original（呼叫者需持有 lock）
+
+        先找出在原波特率下無回應的設備，再依序在 attempted 與其餘波特率下尋找並改回。
+        """
+        missing = device_ids
+        if await self._reopen(original):
+            await asyncio.sleep(0.05)
+            missing = [
+                device_id for device_id in device_ids
+                if await self._read_firmware_version(device_id) is None
+            ]
+
+        others = [rate for rate in BAUDRATE_CODES if rate not in (original, attempted)]
+        for rate in [attempted] + others:
+            if not missing:
+                break
+            if not await self._reopen(rate):
+                continue
+            await asyncio.sleep(0.05)
+            found = [
+                device_id for device_id in missing
+                if await self._read_firmware_version(device_id) is not None
+            ]
+            written = await self._write_baudrate(found, original)
+            missing = [device_id for device_id in missing if device_id not in written]
+
+        await self._reopen(original)
+        await asyncio.sleep(0.05)
+        if await self._verify(device_ids) is not None:
+            return True
+
+        logger.critical(
+            f"匯流排 {self.port} 回滾到 {original} baud 後仍有設備無回應，"
+            f"請檢查接線或以 detect_baudrate 重新探測"
+        )
+        return False
+
+    def _finish_baudrate_change(self, report: Dict) -> Dict:
+        report["baudrate"] = self.baudrate
+        self.last_baudrate_change = report
+        if report["success"]:
+            logger.info(
+                f"匯流排 {self.port} 已切換 {report['from']} -> {report['to']} baud，"
+                f"吞吐量: {report['frames_per_second']}；"
+                f"請將 MODBUS_BAUDRATE（或 MODBUS_BOARDS 的 baudrate）設為 {report['to']}"
+            )
+        else:
+            logger.error(
+                f"匯流排 {self.port} 切換到 {report['to']} baud 失敗: {report['error']}，"
+                f"已回滾: {report['rolled_back']}"
+            )
+        return report
+
+
 class ModbusRelayController:
     """Modbus RTU 16通道繼電器控制器
 
@@ -19,6 +347,20 @@ class ModbusRelayController:
     - 功能碼 05: 寫單線圈
     - 功能碼 0F: 寫多線圈
     - 繼電器地址: 0x0000-0x000F (0-15)
+
+    寫入合併：
+    set_relay 的請求會在短時間窗口內收集，窗口結束時只送出一幀。
+    單一通道使用功能碼 05，多個通道則以完整 16 位線圈映像用功能碼 0F 一次寫入。
+
+    線圈映像快取：
+    控制器在記憶體中保存 16 位線圈映像，寫入成功後即時更新，並由背景任務
+    每 modbus_reconcile_interval 秒讀取一次匯流排校正。狀態查詢預設由映像提供，
+    傳入 fresh=True 時才實際讀取匯流排。
+
+    韌體指令：
+    翻轉（0x0100+通道、0x01FF 全部）、全部開關（0x00FF）與閃開閃閉（0x0200 / 0x0400+通道，
+    延時以 100 ms 為單位）由板子自行完成，各只需一幀。板子以非法功能／地址例外回應時，
+    此控制器停用韌體指令並改用讀取 + 寫入的組合。
     """
 
     def __init__(
@@ -27,6 +369,7 @@ class ModbusRelayController:
         baudrate: int = None,
         device_address: int = None,
         simulation_mode: bool = False,
+        bus: Optional[ModbusBus] = None,
     ):
         """初始化 Modbus 控制器
 
@@ -35,17 +378,56 @@ class ModbusRelayController:
             baudrate: 波特率，默認 9600
             device_address: Modbus 設備地址，默認 1
             simulation_mode: 模擬模式，用於無硬件測試
+            bus: 共用的匯流排（多塊板掛在同一串口時），默認為此控制器建立獨立匯流排
         """
-        self.port = port or settings.modbus_port
-        self.baudrate = baudrate or settings.modbus_baudrate
-        self.device_address = device_address or settings.modbus_device_address
-        self.simulation_mode = simulation_mode
-
-        # 模擬狀態 (用於無硬件測試)
-        self._simulated_state = [False] * 16
+        if bus is None:
+            bus = ModbusBus(
+                port or settings.modbus_port,
+                baudrate or settings.modbus_baudrate,
+                simulation_mode=simulation_mode,
+            )
+            self._owns_bus = True
+        else:
+            self._owns_bus = False
 
-        self.client: Optional[ModbusSerialClient] = None
-        self._lock = asyncio.Lock()
+        self.bus = bus
+        self.port = bus.port
+        self.device_address = device_address or settings.modbus_device_address
+        self.simulation_mode = bus.simulation_mode
+
+        # 同一匯流排上的請求共用一把鎖
+        self._lock = bus.lock
+
+        # 寫入合併
+        self.write_coalesce_ms = settings.modbus_write_coalesce_ms
+        self._pending_writes: Dict[int, bool] = {}
+        self._pending_futures: Dict[int, List[asyncio.Future]] = {}
+        self._pending_priority: Optional[str] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # 排隊中的讀取（相同的讀取共用結果）
+        self._pending_reads: Dict[tuple, tuple] = {}
+
+        # 板子正在韌體閃爍的通道 -> 閃爍結束的計時
+        self._flashing: Dict[int, asyncio.TimerHandle] = {}
+
+        # 16 位線圈映像快取（讀取或寫入成功後更新）
+        self._coil_image: Optional[List[bool]] = None
+        self._coil_image_updated_at: Optional[datetime] = None
+        self.reconcile_interval = settings.modbus_reconcile_interval
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+        # 板載韌體指令（不支援時自動改用讀寫組合）
+        self.firmware_commands = settings.modbus_firmware_commands
+
+        # 匯流排統計
+        self.stats = {
+            "frames_sent": 0,
+            "write_requests": 0,
+            "write_flushes": 0,
+            "firmware_commands": 0,
+            "firmware_fallbacks": 0,
+        }
 
         logger.info(
             f"ModbusRelayController 初始化: port={self.port}, "
@@ -53,52 +435,128 @@ class ModbusRelayController:
             f"simulation={self.simulation_mode}"
         )
 
-    async def connect(self) -> bool:
-        """連接到 Modbus 設備"""
-        if self.simulation_mode:
-            logger.info("模擬模式：跳過實際連接")
-            return True
+    @property
+    def transport(self) -> Optional[ModbusTransport]:
+        return self.bus.transport
 
-        try:
-            self.client = ModbusSerialClient(
-                port=self.port,
-                baudrate=self.baudrate,
-                parity=settings.modbus_parity,
-                stopbits=settings.modbus_stopbits,
-                bytesize=settings.modbus_bytesize,
-                timeout=settings.modbus_timeout,
-            )
-
-            # 在事件循環中運行同步操作
-            connected = await asyncio.get_event_loop().run_in_executor(None, self.client.connect)
-
-            if connected:
-                logger.info(f"成功連接到 Modbus 設備: {self.port}")
-                return True
-            else:
-                logger.error(f"無法連接到 Modbus 設備: {self.port}")
-                return False
+    @property
+    def baudrate(self) -> int:
+        return self.bus.baudrate
 
-        except Exception as e:
-            logger.error(f"連接 Modbus 設備時發生錯誤: {e}")
+    async def connect(self) -> bool:
+        """連接到 Modbus 設備"""
+        if not await self.bus.connect():
+            logger.error(f"無法連接到 Modbus 設備: {self.port} (address={self.device_address})")
             return False
 
+        # 初始化線圈映像並啟動背景校正
+        if await self.read_all_relays() is None and settings.modbus_baud_autodetect:
+            # 板子可能已切換到其他波特率（例如切換後未同步更新設定）
+            if await self.bus.detect_baudrate([self.device_address]) is not None:
+                await self.read_all_relays()
+        self.start_reconciliation()
+        return True
+
     async def disconnect(self):
         """斷開連接"""
-        if self.simulation_mode or not self.client:
+        await self.stop_reconciliation()
+        await self.flush_pending_writes()
+
+        # 共用匯流排由擁有者（控制器池）關閉
+        if self._owns_bus:
+            await self.bus.close()
+
+    def _update_coil_image(self, values: List[bool]):
+        """以完整 16 位狀態更新線圈映像，並推送變化的通道"""
+        previous = self._coil_image
+        self._coil_image = list(values)
+        self._coil_image_updated_at = datetime.utcnow()
+        if previous != self._coil_image:
+            get_single_flight().invalidate("relay_status")
+        get_live_hub().publish_relay_changes(self.device_address, previous, self._coil_image)
+
+    def _update_coil_image_channel(self, channel: int, state: bool):
+        """更新線圈映像中的單個通道（映像未初始化時略過）"""
+        if self._coil_image is not None:
+            previous = self._coil_image.copy()
+            self._coil_image[channel] = state
+            self._coil_image_updated_at = datetime.utcnow()
+            if previous[channel] != state:
+                get_single_flight().invalidate("relay_status")
+            get_live_hub().publish_relay_changes(self.device_address, previous, self._coil_image)
+
+    def get_coil_image(self) -> Optional[List[bool]]:
+        """取得線圈映像副本，未初始化時返回 None"""
+        return self._coil_image.copy() if self._coil_image is not None else None
+
+    def get_coil_image_age(self) -> Optional[float]:
+        """取得線圈映像距上次更新的秒數"""
+        if self._coil_image_updated_at is None:
+            return None
+        return (datetime.utcnow() - self._coil_image_updated_at).total_seconds()
+
+    def start_reconciliation(self):
+        """啟動背景線圈映像校正任務"""
+        if self.reconcile_interval <= 0 or self._reconcile_task is not None:
+            return
+        self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop_reconciliation(self):
+        """停止背景線圈映像校正任務"""
+        if self._reconcile_task is None:
             return
 
+        self._reconcile_task.cancel()
         try:
-            await asyncio.get_event_loop().run_in_executor(None, self.client.close)
-            logger.info("已斷開 Modbus 連接")
-        except Exception as e:
-            logger.error(f"斷開連接時發生錯誤: {e}")
+            await self._reconcile_task
+        except asyncio.CancelledError:
+            pass
+        self._reconcile_task = None
+
+    async def _reconcile_loop(self):
+        """背景任務：定期讀取匯流排校正線圈映像"""
+        logger.info(f"線圈映像校正啟動，間隔: {self.reconcile_interval}秒")
+
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                cached = self.get_coil_image()
+                with bus_priority("poll"):
+                    statuses = await self.read_all_relays()
 
-    async def read_relay_status(self, channel: int) -> Optional[bool]:
+                if statuses is not None and cached is not None and statuses != cached:
+                    changed = [ch for ch in range(16) if statuses[ch] != cached[ch]]
+                    logger.warning(f"線圈映像與硬件不一致，已校正通道: {changed}")
+
+            except Exception as e:
+                logger.error(f"線圈映像校正時發生錯誤: {e}")
+
+    async def _execute(self, request):
+        """透過傳輸層執行一次 Modbus 請求並計為一幀（呼叫者需持有 _lock）
+
+        匯流排斷路中時不送出請求，立即拋出 CircuitOpenError。
+
+        Args:
+            request: 傳輸層請求 coroutine
+        """
+        health = self.bus.health
+        if not await health.admit(self._probe):
+            request.close()
+            raise CircuitOpenError(f"匯流排 {self.port} 斷路中，{health.retry_in():.1f} 秒後重試")
+
+        self.stats["frames_sent"] += 1
+        return await health.measure(request)
+
+    def _probe(self):
+        """斷路器半開時的探測請求：讀取單個線圈"""
+        return self.transport.read_coils(address=0, count=1, device_id=self.device_address)
+
+    async def read_relay_status(self, channel: int, fresh: bool = False) -> Optional[bool]:
         """讀取單個繼電器狀態
 
         Args:
             channel: 繼電器通道 (0-15)
+            fresh: True=強制讀取匯流排，False=優先使用線圈映像
 
         Returns:
             True=ON, False=OFF, None=錯誤
@@ -106,30 +564,35 @@ class ModbusRelayController:
         if not 0 <= channel <= 15:
             raise ValueError(f"通道編號必須在 0-15 之間，得到 {channel}")
 
-        if self.simulation_mode:
-            return self._simulated_state[channel]
+        if not fresh and self._coil_image is not None:
+            return self._coil_image[channel]
 
-        async with self._lock:
-            try:
-                # 功能碼 01: 讀取線圈狀態
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.read_coils(
-                        address=channel, count=1, device_id=self.device_address
-                    ),
+        return await self._deduplicated_read(
+            ("coil", channel), lambda: self._read_relay_status_locked(channel)
+        )
+
+    async def _read_relay_status_locked(self, channel: int) -> Optional[bool]:
+        """讀取單個繼電器狀態（呼叫者需持有 _lock）"""
+        try:
+            # 功能碼 01: 讀取線圈狀態
+            response = await self._execute(
+                self.transport.read_coils(
+                    address=channel, count=1, device_id=self.device_address
                 )
+            )
 
-                if response.isError():
-                    logger.error(f"讀取繼電器 {channel} 狀態失敗: {response}")
-                    return None
+            if response.isError():
+                logger.error(f"讀取繼電器 {channel} 狀態失敗: {response}")
+                return None
 
-                status = response.bits[0]
-                logger.debug(f"繼電器 {channel} 狀態: {status}")
-                return status
+            status = response.bits[0]
+            self._update_coil_image_channel(channel, status)
+            logger.debug(f"繼電器 {channel} 狀態: {status}")
+            return status
 
-            except Exception as e:
-                logger.error(f"讀取繼電器 {channel} 狀態時發生錯誤: {e}")
-                return None
+        except Exception as e:
+            logger.error(f"讀取繼電器 {channel} 狀態時發生錯誤: {e}")
+            return None
 
     async def read_all_relays(self) -> Optional[List[bool]]:
         """讀取所有繼電器狀態
@@ -137,34 +600,69 @@ class ModbusRelayController:
         Returns:
             16個布林值的列表，或 None 如果發生錯誤
         """
-        if self.simulation_mode:
-            return self._simulated_state.copy()
+        statuses = await self._deduplicated_read(("all",), self._read_all_relays_locked)
+        return list(statuses) if statuses is not None else None
 
-        async with self._lock:
-            try:
-                # 功能碼 01: 讀取所有 16 個線圈
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.read_coils(
-                        address=0, count=16, device_id=self.device_address
-                    ),
-                )
+    async def _deduplicated_read(self, key: tuple, read_locked):
+        """排隊取得匯流排鎖後執行讀取；相同的讀取已在排隊時共用其結果
 
-                if response.isError():
-                    logger.error(f"讀取所有繼電器狀態失敗: {response}")
-                    return None
+        讀取在獨立任務中執行，個別呼叫者取消不影響其他共用者；
+        讀取開始後才到的請求另外排隊，確保讀到請求之後的狀態。
 
-                statuses = response.bits[:16]
-                logger.debug(f"所有繼電器狀態: {statuses}")
-                return statuses
+        Args:
+            key: 讀取的識別（相同 key 的讀取結果相同）
+            read_locked: 持有 _lock 時執行讀取的函數
+        """
+        pending = self._pending_reads.get(key)
+        if pending is None:
+            ticket = self._lock.ticket()
+            task = asyncio.ensure_future(self._run_read(key, ticket, read_locked))
+            self._pending_reads[key] = (task, ticket)
+        else:
+            task, ticket = pending
+            priority = current_priority()
+            ticket.promote(priority)
+            self._lock.record_deduplicated(priority)
+        return await asyncio.shield(task)
+
+    async def _run_read(self, key: tuple, ticket, read_locked):
+        try:
+            async with ticket:
+                self._pending_reads.pop(key, None)
+                return await read_locked()
+        finally:
+            if self._pending_reads.get(key, (None,))[0] is asyncio.current_task():
+                self._pending_reads.pop(key, None)
+
+    async def _read_all_relays_locked(self) -> Optional[List[bool]]:
+        """讀取所有繼電器狀態（呼叫者需持有 _lock）"""
+        try:
+            # 功能碼 01: 讀取所有 16 個線圈
+            response = await self._execute(
+                self.transport.read_coils(
+                    address=0, count=16, device_id=self.device_address
+                )
+            )
 
-            except Exception as e:
-                logger.error(f"讀取所有繼電器狀態時發生錯誤: {e}")
+            if response.isError():
+                logger.error(f"讀取所有繼電器狀態失敗: {response}")
                 return None
 
+            statuses = list(response.bits[:16])
+            self._update_coil_image(statuses)
+            logger.debug(f"所有繼電器狀態: {statuses}")
+            return statuses
+
+        except Exception as e:
+            logger.error(f"讀取所有繼電器狀態時發生錯誤: {e}")
+            return None
+
     async def set_relay(self, channel: int, state: bool) -> bool:
         """設置單個繼電器狀態
 
+        寫入合併啟用時（modbus_write_coalesce_ms > 0），請求會先進入待寫佇列，
+        與窗口內的其他通道變更合併成一幀送出。
+
         Args:
             channel: 繼電器通道 (0-15)
             state: True=ON, False=OFF
@@ -172,38 +670,192 @@ class ModbusRelayController:
         Returns:
             操作是否成功
         """
+        return await self.submit_relay_write(channel, state)
+
+    def submit_relay_write(self, channel: int, state: bool) -> asyncio.Future:
+        """提交繼電器寫入請求，返回該通道的結果 Future
+
+        窗口內對同一通道的多次請求以最後一次為準，所有請求共享同一結果。
+
+        Args:
+            channel: 繼電器通道 (0-15)
+            state: True=ON, False=OFF
+
+        Returns:
+            完成時結果為操作是否成功的 Future
+        """
         if not 0 <= channel <= 15:
             raise ValueError(f"通道編號必須在 0-15 之間，得到 {channel}")
 
-        if self.simulation_mode:
-            self._simulated_state[channel] = state
-            logger.info(f"[模擬] 繼電器 {channel} 設為 {'ON' if state else 'OFF'}")
-            return True
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.stats["write_requests"] += 1
 
-        async with self._lock:
-            try:
-                # 功能碼 05: 寫單個線圈
-                # 0xFF00 = ON, 0x0000 = OFF
-                value = 0xFF00 if state else 0x0000
-
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.write_coil(
-                        address=channel, value=state, device_id=self.device_address
-                    ),
+        self._pending_writes[channel] = state
+        self._pending_futures.setdefault(channel, []).append(future)
+        # 合併的寫入以窗口內最高的優先等級送出
+        priority = current_priority()
+        self._pending_priority = (
+            higher_priority(self._pending_priority, priority) if self._pending_priority else priority
+        )
+
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_after_window())
+
+        return future
+
+    async def _flush_after_window(self):
+        """等待合併窗口結束後送出待寫請求"""
+        if self.write_coalesce_ms > 0:
+            await asyncio.sleep(self.write_coalesce_ms / 1000.0)
+        await self._flush_pending_writes()
+
+    async def flush_pending_writes(self):
+        """立即送出所有待寫請求（不等待合併窗口）"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self._flush_pending_writes()
+
+    async def _flush_pending_writes(self):
+        """將待寫請求合併為一幀送出，並完成各通道的 Future"""
+        pending, futures = self._pending_writes, self._pending_futures
+        priority = self._pending_priority or current_priority()
+        self._pending_writes, self._pending_futures = {}, {}
+        self._pending_priority = None
+        self._flush_task = None
+
+        if not pending:
+            return
+
+        async with self._lock.ticket(priority):
+            if len(pending) == 1:
+                channel, state = next(iter(pending.items()))
+                success = await self._write_coil_locked(channel, state)
+            else:
+                success = await self._write_coil_image_locked(pending)
+
+        self.stats["write_flushes"] += 1
+
+        for channel_futures in futures.values():
+            for future in channel_futures:
+                if not future.done():
+                    future.set_result(success)
+
+    async def _write_coil_locked(self, channel: int, state: bool) -> bool:
+        """以功能碼 05 寫入單個線圈（呼叫者需持有 _lock）"""
+        try:
+            # 功能碼 05: 寫單個線圈
+            # 0xFF00 = ON, 0x0000 = OFF
+            response = await self._execute(
+                self.transport.write_coil(
+                    address=channel, value=state, device_id=self.device_address
                 )
+            )
 
-                if response.isError():
-                    logger.error(f"設置繼電器 {channel} 失敗: {response}")
-                    return False
+            if response.isError():
+                logger.error(f"設置繼電器 {channel} 失敗: {response}")
+                return False
 
-                logger.info(f"繼電器 {channel} 已設為 {'ON' if state else 'OFF'}")
-                return True
+            self._update_coil_image_channel(channel, state)
+            logger.info(f"繼電器 {channel} 已設為 {'ON' if state else 'OFF'}")
+            return True
 
-            except Exception as e:
-                logger.error(f"設置繼電器 {channel} 時發生錯誤: {e}")
+        except Exception as e:
+            logger.error(f"設置繼電器 {channel} 時發生錯誤: {e}")
+            return False
+
+    async def _write_coil_image_locked(self, changes: Dict[int, bool]) -> bool:
+        """以功能碼 0F 寫入完整 16 位線圈映像（呼叫者需持有 _lock）
+
+        有通道正在韌體閃爍且不在 changes 中時，完整映像會覆寫板子正在計時的通道，
+        改以功能碼 05 逐一寫入變更的通道。
+
+        Args:
+            changes: 通道 -> 目標狀態，套用在最後已知的線圈映像上
+        """
+        if any(channel not in changes for channel in self._flashing):
+            results = [
+                await self._write_coil_locked(channel, state)
+                for channel, state in sorted(changes.items())
+            ]
+            return all(results)
+
+        image = self._coil_image
+        if image is None:
+            image = await self._read_all_relays_locked()
+            if image is None:
                 return False
 
+        values = list(image)
+        for channel, state in changes.items():
+            values[channel] = state
+
+        try:
+            # 功能碼 0F: 寫多個線圈
+            response = await self._execute(
+                self.transport.write_coils(
+                    address=0, values=values, device_id=self.device_address
+                )
+            )
+
+            if response.isError():
+                logger.error(f"合併寫入繼電器 {sorted(changes)} 失敗: {response}")
+                return False
+
+            self._update_coil_image(values)
+            logger.info(
+                "合併寫入繼電器: "
+                + ", ".join(f"{ch}={'ON' if st else 'OFF'}" for ch, st in sorted(changes.items()))
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"合併寫入繼電器 {sorted(changes)} 時發生錯誤: {e}")
+            return False
+
+    async def _firmware_write_locked(
+        self, address: int, value: int, description: str
+    ) -> Optional[bool]:
+        """送出一個韌體指令（呼叫者需持有 _lock）
+
+        Returns:
+            True=成功, False=失敗, None=板子不支援（已停用韌體指令，呼叫者應改用讀寫組合）
+        """
+        try:
+            response = await self._execute(
+                self.transport.write_coil_value(
+                    address=address, value=value, device_id=self.device_address
+                )
+            )
+        except Exception as e:
+            logger.error(f"{description}時發生錯誤: {e}")
+            return False
+
+        if response.isError():
+            # 01 非法功能 / 02 非法數據地址 / 03 非法數據值：板子沒有此指令
+            if getattr(response, "exception_code", None) in (0x01, 0x02, 0x03):
+                self.firmware_commands = False
+                self.stats["firmware_fallbacks"] += 1
+                logger.warning(
+                    f"繼電器板 {self.device_address} 不支援韌體指令（{description}: {response}），"
+                    f"改用讀取 + 寫入"
+                )
+                return None
+            logger.error(f"{description}失敗: {response}")
+            return False
+
+        self.stats["firmware_commands"] += 1
+        return True
+
+    def _toggle_coil_image(self, channels: List[int]):
+        """韌體翻轉成功後翻轉映像中的通道（映像未初始化時略過，由下一次讀取取得實際狀態）"""
+        if self._coil_image is None:
+            return
+        values = self._coil_image.copy()
+        for channel in channels:
+            values[channel] = not values[channel]
+        self._update_coil_image(values)
+
     async def set_all_relays(self, state: bool) -> bool:
         """設置所有繼電器為相同狀態
 
@@ -213,27 +865,36 @@ class ModbusRelayController:
         Returns:
             操作是否成功
         """
-        if self.simulation_mode:
-            self._simulated_state = [state] * 16
-            logger.info(f"[模擬] 所有繼電器設為 {'ON' if state else 'OFF'}")
-            return True
+        # 先送出較早提交的待寫請求，保持寫入順序
+        await self.flush_pending_writes()
 
         async with self._lock:
+            if self.firmware_commands:
+                # 0x00FF：以 8 字節的功能碼 05 控制全部繼電器
+                result = await self._firmware_write_locked(
+                    FIRMWARE_ALL_RELAYS, COIL_ON if state else COIL_OFF, "設置所有繼電器"
+                )
+                if result is not None:
+                    if result:
+                        self._update_coil_image([state] * 16)
+                        logger.info(f"所有繼電器已設為 {'ON' if state else 'OFF'}")
+                    return result
+
             try:
                 # 功能碼 0F: 寫多個線圈
                 values = [state] * 16
 
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.client.write_coils(
+                response = await self._execute(
+                    self.transport.write_coils(
                         address=0, values=values, device_id=self.device_address
-                    ),
+                    )
                 )
 
                 if response.isError():
                     logger.error(f"設置所有繼電器失敗: {response}")
                     return False
 
+                self._update_coil_image(values)
                 logger.info(f"所有繼電器已設為 {'ON' if state else 'OFF'}")
                 return True
 
@@ -244,23 +905,78 @@ class ModbusRelayController:
     async def toggle_relay(self, channel: int) -> bool:
         """切換繼電器狀態
 
+        支援韌體指令時寫入 0x0100+通道，由板子依實際狀態翻轉（一幀）；
+        否則讀取目前狀態（優先使用線圈映像）後寫入相反狀態。
+
         Args:
             channel: 繼電器通道 (0-15)
 
         Returns:
             操作是否成功
         """
+        if not 0 <= channel <= 15:
+            raise ValueError(f"通道編號必須在 0-15 之間，得到 {channel}")
+
+        if self.firmware_commands:
+            # 先送出較早提交的待寫請求，翻轉才會以其結果為準
+            await self.flush_pending_writes()
+            async with self._lock:
+                result = await self._firmware_write_locked(
+                    FIRMWARE_TOGGLE + channel, COIL_ON, f"翻轉繼電器 {channel}"
+                )
+            if result is not None:
+                if result:
+                    self._toggle_coil_image([channel])
+                    logger.info(f"繼電器 {channel} 已翻轉")
+                return result
+
         current = await self.read_relay_status(channel)
         if current is None:
             return False
 
         return await self.set_relay(channel, not current)
 
+    async def toggle_all_relays(self) -> bool:
+        """翻轉所有繼電器
+
+        支援韌體指令時寫入 0x01FF（一幀）；否則以線圈映像（未初始化時先讀取）
+        取反後用功能碼 0F 寫入。
+
+        Returns:
+            操作是否成功
+        """
+        await self.flush_pending_writes()
+
+        async with self._lock:
+            if self.firmware_commands:
+                result = await self._firmware_write_locked(
+                    FIRMWARE_TOGGLE_ALL, COIL_ON, "翻轉所有繼電器"
+                )
+                if result is not None:
+                    if result:
+                        self._toggle_coil_image(list(range(16)))
+                        logger.info("所有繼電器已翻轉")
+                    return result
+
+            image = self._coil_image
+            if image is None:
+                image = await self._read_all_relays_locked()
+                if image is None:
+                    return False
+
+            return await self._write_coil_image_locked(
+                {channel: not state for channel, state in enumerate(image)}
+            )
+
     async def flash_relay(
         self, channel: int, duration_ms: int = 500, initial_state: bool = True
     ) -> bool:
         """繼電器閃爍（開啟後自動關閉，或關閉後自動開啟）
 
+        支援韌體指令時以一幀閃開（0x0200+通道）或閃閉（0x0400+通道）指令交給板子計時，
+        送出後立即返回；延時以 100 ms 為單位（四捨五入，最少 100 ms）。
+        否則依序寫入目標狀態、等待、恢復原狀態。
+
         Args:
             channel: 繼電器通道 (0-15)
             duration_ms: 持續時間（毫秒）
@@ -277,6 +993,34 @@ class ModbusRelayController:
         if original_state is None:
             return False
 
+        # 韌體閃爍結束時固定回到相反狀態，只在原狀態與之相同時使用
+        if self.firmware_commands and original_state != initial_state:
+            units = min(
+                max(round(duration_ms / FIRMWARE_FLASH_UNIT_MS), 1), FIRMWARE_FLASH_MAX_UNITS
+            )
+            base = FIRMWARE_FLASH_ON if initial_state else FIRMWARE_FLASH_OFF
+
+            await self.flush_pending_writes()
+            async with self._lock:
+                result = await self._firmware_write_locked(
+                    base + channel, units, f"繼電器 {channel} {'閃開' if initial_state else '閃閉'}"
+                )
+            if result is not None:
+                if result:
+                    self._update_coil_image_channel(channel, initial_state)
+                    previous = self._flashing.pop(channel, None)
+                    if previous is not None:
+                        previous.cancel()
+                    self._flashing[channel] = asyncio.get_running_loop().call_later(
+                        units * FIRMWARE_FLASH_UNIT_MS / 1000,
+                        self._end_flash, channel, initial_state,
+                    )
+                    logger.info(
+                        f"繼電器 {channel} {'閃開' if initial_state else '閃閉'} "
+                        f"{units * FIRMWARE_FLASH_UNIT_MS}ms"
+                    )
+                return result
+
         # 設置為目標狀態
         if not await self.set_relay(channel, initial_state):
             return False
@@ -287,46 +1031,74 @@ class ModbusRelayController:
         # 恢復原狀態
         return await self.set_relay(channel, original_state)
 
-    async def get_status_dict(self) -> Dict:
-        """取得控制器狀態字典"""
-        statuses = await self.read_all_relays()
+    def _end_flash(self, channel: int, initial_state: bool):
+        """韌體閃爍結束時更新映像（期間已有其他寫入改變此通道時不覆蓋）"""
+        self._flashing.pop(channel, None)
+        if self._coil_image is not None and self._coil_image[channel] == initial_state:
+            self._update_coil_image_channel(channel, not initial_state)
+
+    async def get_status_dict(self, fresh: bool = False) -> Dict:
+        """取得控制器狀態字典
+
+        Args:
+            fresh: True=強制讀取匯流排，False=由線圈映像提供（映像未初始化時仍會讀取）
+        """
+        statuses = None if fresh else self.get_coil_image()
+        source = "cache"
+        if statuses is None:
+            statuses = await self.read_all_relays()
+            source = "bus"
 
         return {
-            "connected": self.client.is_socket_open() if self.client else False,
+            "connected": self.bus.is_open(),
+            "transport": self.transport.name if self.transport else None,
             "simulation_mode": self.simulation_mode,
             "device_address": self.device_address,
             "port": self.port,
             "baudrate": self.baudrate,
             "relay_states": statuses if statuses else [None] * 16,
+            "relay_states_source": source,
+            "relay_states_updated_at": (
+                self._coil_image_updated_at.isoformat() if self._coil_image_updated_at else None
+            ),
+            "relay_states_age_s": self.get_coil_image_age(),
+            "reconcile_interval": self.reconcile_interval,
+            "write_coalesce_ms": self.write_coalesce_ms,
+            "pending_writes": len(self._pending_writes),
+            "firmware_commands": self.firmware_commands,
+            "last_baudrate_change": self.bus.last_baudrate_change,
+            "bus_health": self.bus.health.get_status_dict(),
+            "bus_scheduler": self._lock.get_status_dict(),
+            "bus_stats": dict(self.stats),
             "timestamp": datetime.utcnow().isoformat(),
         }
 
 
-# 全局控制器實例
-_controller: Optional[ModbusRelayController] = None
-
-
-def get_controller(simulation_mode: bool = True) -> ModbusRelayController:
+def get_controller(
+    simulation_mode: bool = True, device_address: Optional[int] = None
+) -> ModbusRelayController:
     """取得全局控制器實例
 
+    控制器由全局控制器池（services.relay_pool）管理，依設備地址路由。
+
     Args:
         simulation_mode: 是否使用模擬模式（無實際硬件時設為 True）
+        device_address: Modbus 設備地址，None 表示預設板
     """
-    global _controller
-    if _controller is None:
-        _controller = ModbusRelayController(simulation_mode=simulation_mode)
-    return _controller
+    from services.relay_pool import get_relay_pool
+
+    return get_relay_pool(simulation_mode=simulation_mode).get(device_address)
 
 
 async def initialize_controller(simulation_mode: bool = True) -> bool:
-    """初始化並連接控制器"""
-    controller = get_controller(simulation_mode=simulation_mode)
-    return await controller.connect()
+    """初始化並連接所有繼電器板"""
+    from services.relay_pool import get_relay_pool
+
+    return await get_relay_pool(simulation_mode=simulation_mode).connect()
 
 
 async def shutdown_controller():
-    """關閉控制器"""
-    global _controller
-    if _controller:
-        await _controller.disconnect()
-        _controller = None
+    """關閉所有繼電器板"""
+    from services.relay_pool import shutdown_relay_pool
+
+    await shutdown_relay_pool()
@@ -0,0 +1,218 @@
+"""模擬 Modbus RTU 繼電器板（無硬件測試用）
+
+介面對齊 pymodbus 的 ModbusSerialClient，讓控制器在模擬模式下
+走與實際硬件相同的程式路徑，並可統計送出的幀數與線路時間。
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+from pymodbus.exceptions import ModbusIOException
+from services.modbus_transport import (
+    BAUDRATE_CODES,
+    COIL_OFF,
+    COIL_ON,
+    FIRMWARE_ALL_RELAYS,
+    FIRMWARE_FLASH_OFF,
+    FIRMWARE_FLASH_ON,
+    FIRMWARE_FLASH_UNIT_MS,
+    FIRMWARE_TOGGLE,
+    FIRMWARE_TOGGLE_ALL,
+    REGISTER_DEVICE_ADDRESS,
+    REGISTER_FIRMWARE_VERSION,
+    REGISTER_SERIAL,
+)
+
+# Modbus 例外碼 02：非法數據地址
+ILLEGAL_DATA_ADDRESS = 0x02
+# 0x5500：單個或全部繼電器翻轉
+COIL_TOGGLE = 0x5500
+# 模擬板的韌體版本（V3.00）
+FIRMWARE_VERSION = 0x012C
+
+
+class SimulatedResponse:
+    """模擬 pymodbus 回應物件"""
+
+    def __init__(
+        self,
+        bits: Optional[List[bool]] = None,
+        registers: Optional[List[int]] = None,
+        exception_code: Optional[int] = None,
+    ):
+        self.bits = bits or []
+        self.registers = registers or []
+        self.exception_code = exception_code
+
+    def isError(self) -> bool:
+        return self.exception_code is not None
+
+
+class SimulatedModbusClient:
+    """模擬 Waveshare Modbus RTU Relay 16CH
+
+    - 線圈狀態保存在記憶體中，依設備地址區分（同一匯流排可掛多塊板）
+    - 每個請求計為一幀，並依波特率模擬 RTU 線路時間
+    - offline=True 模擬 USB 轉換器故障：所有請求等待逾時後無回應
+    - 每塊板有自己的波特率（寄存器 0x2000），與客戶端波特率不符時不回應；
+      寫入 0x2000 後板子以原波特率回應，再切換到新的波特率
+    - 支援韌體翻轉、全部控制與閃開閃閉指令；firmware_commands=False 時
+      對這些地址回應非法地址例外，模擬不支援的板子
+    """
+
+    # 從機處理請求的轉向時間（秒）
+    TURNAROUND_S = 0.004
+
+    def __init__(
+        self, baudrate: int = 9600, simulate_latency: bool = True, firmware_commands: bool = True
+    ):
+        """初始化模擬客戶端
+
+        Args:
+            baudrate: 模擬的波特率，用於計算線路時間
+            simulate_latency: 是否模擬線路延遲
+            firmware_commands: 是否支援韌體指令（翻轉、全部控制、閃開閃閉）
+        """
+        self.baudrate = baudrate
+        self.simulate_latency = simulate_latency
+        self.firmware_commands = firmware_commands
+        self.timeout = 3.0
+        self.offline = False
+        self.boards: Dict[int, List[bool]] = {}
+        self.board_serial: Dict[int, int] = {}
+        self.frame_count = 0
+        self.frames_by_function: Dict[int, int] = {}
+        self._connected = False
+        self._lock = threading.Lock()
+
+    def connect(self) -> bool:
+        self._connected = True
+        return True
+
+    def close(self):
+        self._connected = False
+
+    def is_socket_open(self) -> bool:
+        return self._connected
+
+    def coils(self, device_id: int = 1) -> List[bool]:
+        """取得指定設備地址的線圈狀態"""
+        return self.boards.setdefault(device_id, [False] * 16)
+
+    def board_baudrate(self, device_id: int = 1) -> int:
+        """取得指定設備地址的板子目前使用的波特率（默認與客戶端相同）"""
+        code = self.board_serial.get(device_id)
+        if code is None:
+            return self.baudrate
+        return next(rate for rate, value in BAUDRATE_CODES.items() if value == code & 0xFF)
+
+    def reset_counters(self):
+        """重置幀計數"""
+        self.frame_count = 0
+        self.frames_by_function = {}
+
+    def _transact(
+        self, function_code: int, request_len: int, response_len: int, device_id: int = 1
+    ):
+        """記錄一次請求/回應並模擬線路時間
+
+        RTU 每個字元 10 bit（起始位 + 8 數據位 + 停止位），
+        請求與回應前各有 3.5 字元的幀間隔。
+        離線或板子的波特率與客戶端不符時收不到有效的幀，等待逾時後無回應。
+        """
+        with self._lock:
+            self.frame_count += 1
+            self.frames_by_function[function_code] = (
+                self.frames_by_function.get(function_code, 0) + 1
+            )
+
+        if self.offline or self.board_baudrate(device_id) != self.baudrate:
+            if self.simulate_latency:
+                time.sleep(self.timeout)
+            raise ModbusIOException(f"設備 {device_id} 無回應")
+
+        if self.simulate_latency:
+            chars = request_len + response_len + 7
+            time.sleep(chars * 10 / self.baudrate + self.TURNAROUND_S)
+
+    def read_coils(self, address: int, count: int = 1, device_id: int = 1) -> SimulatedResponse:
+        # 功能碼 01：請求 8 字節，回應 5 + 數據字節
+        self._transact(0x01, 8, 5 + (count + 7) // 8, device_id)
+        return SimulatedResponse(bits=self.coils(device_id)[address:address + count])
+
+    def write_coil(self, address: int, value: bool, device_id: int = 1) -> SimulatedResponse:
+        return self.write_coil_value(address, COIL_ON if value else COIL_OFF, device_id)
+
+    def execute(self, no_response_expected: bool, request) -> SimulatedResponse:
+        """執行自訂請求（目前只有功能碼 05 的任意值寫入）"""
+        return self.write_coil_value(request.address, request.value, request.dev_id)
+
+    def write_coil_value(self, address: int, value: int, device_id: int = 1) -> SimulatedResponse:
+        # 功能碼 05：請求與回應皆為 8 字節
+        self._transact(0x05, 8, 8, device_id)
+        coils = self.coils(device_id)
+
+        if address < len(coils):
+            coils[address] = not coils[address] if value == COIL_TOGGLE else value == COIL_ON
+            return SimulatedResponse()
+
+        if not self.firmware_commands:
+            return SimulatedResponse(exception_code=ILLEGAL_DATA_ADDRESS)
+
+        if address == FIRMWARE_ALL_RELAYS:
+            for channel in range(len(coils)):
+                coils[channel] = not coils[channel] if value == COIL_TOGGLE else value == COIL_ON
+        elif address == FIRMWARE_TOGGLE_ALL:
+            if value == COIL_ON:
+                coils[:] = [not state for state in coils]
+        elif FIRMWARE_TOGGLE <= address < FIRMWARE_TOGGLE + len(coils):
+            if value == COIL_ON:
+                channel = address - FIRMWARE_TOGGLE
+                coils[channel] = not coils[channel]
+        elif (
+            FIRMWARE_FLASH_ON <= address < FIRMWARE_FLASH_ON + len(coils)
+            or FIRMWARE_FLASH_OFF <= address < FIRMWARE_FLASH_OFF + len(coils)
+        ):
+            state = address < FIRMWARE_FLASH_OFF
+            channel = address - (FIRMWARE_FLASH_ON if state else FIRMWARE_FLASH_OFF)
+            coils[channel] = state
+            timer = threading.Timer(
+                value * FIRMWARE_FLASH_UNIT_MS / 1000, coils.__setitem__, (channel, not state)
+            )
+            timer.daemon = True
+            timer.start()
+        else:
+            return SimulatedResponse(exception_code=ILLEGAL_DATA_ADDRESS)
+        return SimulatedResponse()
+
+    def write_coils(
+        self, address: int, values: List[bool], device_id: int = 1
+    ) -> SimulatedResponse:
+        # 功能碼 0F：請求 9 + 數據字節，回應 8 字節
+        self._transact(0x0F, 9 + (len(values) + 7) // 8, 8, device_id)
+        coils = self.coils(device_id)
+        for offset, value in enumerate(values):
+            coils[address + offset] = bool(value)
+        return SimulatedResponse()
+
+    def read_holding_registers(
+        self, address: int, count: int = 1, device_id: int = 1
+    ) -> SimulatedResponse:
+        # 功能碼 03：請求 8 字節，回應 5 + 2 × 寄存器數
+        self._transact(0x03, 8, 5 + 2 * count, device_id)
+        registers = {
+            REGISTER_SERIAL: self.board_serial.get(device_id, BAUDRATE_CODES.get(self.baudrate, 0x01)),
+            REGISTER_DEVICE_ADDRESS: device_id,
+            REGISTER_FIRMWARE_VERSION: FIRMWARE_VERSION,
+        }
+        if count != 1 or address not in registers:
+            return SimulatedResponse(exception_code=ILLEGAL_DATA_ADDRESS)
+        return SimulatedResponse(registers=[registers[address]])
+
+    def write_register(self, address: int, value: int, device_id: int = 1) -> SimulatedResponse:
+        # 功能碼 06：請求與回應皆為 8 字節（以原波特率回應後才切換）
+        self._transact(0x06, 8, 8, device_id)
+        if address != REGISTER_SERIAL or value & 0xFF not in BAUDRATE_CODES.values():
+            return SimulatedResponse(exception_code=ILLEGAL_DATA_ADDRESS)
+        self.board_serial[device_id] = value
+        return SimulatedResponse(registers=[value])
@@ -0,0 +1,300 @@
+"""Modbus RTU 傳輸層
+
+提供兩種後端，由 settings.modbus_transport 選擇：
+- executor: 同步 ModbusSerialClient，每個請求在執行緒池中執行（相容舊行為）
+- async: pymodbus AsyncModbusSerialClient，直接在事件循環上收發
+
+RTU 為半雙工單主站協議，同一匯流排上同時只能有一個未完成的請求。
+兩種後端都在請求之間維持 3.5 字元的幀間隔，async 後端讓請求在事件循環上
+背靠背送出，省去每次請求的執行緒切換。
+"""
+
+import asyncio
+import logging
+import struct
+import time
+from typing import List, Optional
+
+from pymodbus.client import AsyncModbusSerialClient, ModbusSerialClient
+from pymodbus.pdu.bit_message import WriteSingleCoilRequest
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 功能碼 05 的線圈值
+COIL_ON = 0xFF00
+COIL_OFF = 0x0000
+
+# Waveshare 16CH 韌體指令（功能碼 05 寫入特殊地址，見 docs/modbus_16channel_contorller.md）
+FIRMWARE_ALL_RELAYS = 0x00FF  # 0xFF00=全部開啟, 0x0000=全部關閉
+FIRMWARE_TOGGLE = 0x0100  # + 通道，0xFF00=翻轉
+FIRMWARE_TOGGLE_ALL = 0x01FF  # 0xFF00=全部翻轉
+FIRMWARE_FLASH_ON = 0x0200  # + 通道，值為延時（100 ms 單位），先開後關
+FIRMWARE_FLASH_OFF = 0x0400  # + 通道，值為延時（100 ms 單位），先關後開
+FIRMWARE_FLASH_UNIT_MS = 100
+FIRMWARE_FLASH_MAX_UNITS = 0x7FFF
+
+# 保持寄存器（功能碼 03 讀取 / 06 寫入）
+REGISTER_SERIAL = 0x2000  # 高 8 位校驗方式，低 8 位波特率代碼
+REGISTER_DEVICE_ADDRESS = 0x4000
+REGISTER_FIRMWARE_VERSION = 0x8000  # 十進制後小數點左移兩位，例: 0x012C = V3.00
+
+BAUDRATE_CODES = {
+    4800: 0x00,
+    9600: 0x01,
+    19200: 0x02,
+    38400: 0x03,
+    57600: 0x04,
+    115200: 0x05,
+    128000: 0x06,
+    256000: 0x07,
+}
+PARITY_CODES = {"N": 0x00, "E": 0x01, "O": 0x02}
+
+
+class RawWriteCoilRequest(WriteSingleCoilRequest):
+    """功能碼 05，但寫入任意 16 位值（pymodbus 只會送出 0xFF00 / 0x0000）"""
+
+    def __init__(self, address: int, value: int, dev_id: int):
+        super().__init__(address=address, bits=[bool(value)], dev_id=dev_id)
+        self.value = value
+
+    def encode(self) -> bytes:
+        self.verifyAddress()
+        return struct.pack(">HH", self.address, self.value)
+
+
+def calculate_inter_frame_delay(baudrate: int) -> float:
+    """計算 RTU 幀間隔（秒）
+
+    Modbus RTU 規範：幀之間至少 3.5 字元的靜默時間（每字元 11 bit）；
+    波特率高於 19200 時固定為 1.75 ms。
+    """
+    if baudrate > 19200:
+        return 0.00175
+    return 3.5 * 11 / baudrate
+
+
+class ModbusTransport:
+    """Modbus 傳輸層基類"""
+
+    name = "base"
+
+    def __init__(self, baudrate: int, inter_frame_delay_ms: float = 0):
+        """初始化傳輸層
+
+        Args:
+            baudrate: 波特率，用於計算幀間隔
+            inter_frame_delay_ms: 幀間隔（毫秒），0 表示依波特率自動計算
+        """
+        self.baudrate = baudrate
+        if inter_frame_delay_ms > 0:
+            self.inter_frame_delay = inter_frame_delay_ms / 1000.0
+        else:
+            self.inter_frame_delay = calculate_inter_frame_delay(baudrate)
+        self._last_frame_end = 0.0
+
+    async def _wait_inter_frame(self):
+        """確保與上一幀之間保持幀間隔"""
+        remaining = self._last_frame_end + self.inter_frame_delay - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    def _mark_frame_end(self):
+        self._last_frame_end = time.monotonic()
+
+    async def connect(self) -> bool:
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+    def is_open(self) -> bool:
+        raise NotImplementedError
+
+    def set_timeout(self, seconds: float):
+        """設置每次收發的逾時（秒）"""
+        raise NotImplementedError
+
+    async def read_coils(self, address: int, count: int, device_id: int):
+        raise NotImplementedError
+
+    async def write_coil(self, address: int, value: bool, device_id: int):
+        raise NotImplementedError
+
+    async def write_coils(self, address: int, values: List[bool], device_id: int):
+        raise NotImplementedError
+
+    async def write_coil_value(self, address: int, value: int, device_id: int):
+        """以功能碼 05 寫入任意 16 位值（韌體指令）"""
+        raise NotImplementedError
+
+    async def read_holding_registers(self, address: int, count: int, device_id: int):
+        raise NotImplementedError
+
+    async def write_register(self, address: int, value: int, device_id: int):
+        raise NotImplementedError
+
+
+class ExecutorTransport(ModbusTransport):
+    """同步客戶端 + 執行緒池
+
+    用於 ModbusSerialClient 及模擬繼電器板（SimulatedModbusClient）。
+    """
+
+    name = "executor"
+
+    def __init__(self, client, baudrate: int, inter_frame_delay_ms: float = 0):
+        super().__init__(baudrate, inter_frame_delay_ms)
+        self.client = client
+
+    async def _run(self, func, *args, **kwargs):
+        await self._wait_inter_frame()
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                None, lambda: func(*args, **kwargs)
+            )
+        finally:
+            self._mark_frame_end()
+
+    async def connect(self) -> bool:
+        return await asyncio.get_event_loop().run_in_executor(None, self.client.connect)
+
+    async def close(self):
+        await asyncio.get_event_loop().run_in_executor(None, self.client.close)
+
+    def is_open(self) -> bool:
+        return self.client.is_socket_open()
+
+    def set_timeout(self, seconds: float):
+        if isinstance(self.client, ModbusSerialClient):
+            # 接收迴圈與串口讀取各自使用一份 comm_params
+            self.client.comm_params.timeout_connect = seconds
+            self.client.transaction.comm_params.timeout_connect = seconds
+            if self.client.socket:
+                self.client.socket.timeout = seconds
+        else:
+            self.client.timeout = seconds
+
+    async def read_coils(self, address: int, count: int, device_id: int):
+        return await self._run(
+            self.client.read_coils, address=address, count=count, device_id=device_id
+        )
+
+    async def write_coil(self, address: int, value: bool, device_id: int):
+        return await self._run(
+            self.client.write_coil, address=address, value=value, device_id=device_id
+        )
+
+    async def write_coils(self, address: int, values: List[bool], device_id: int):
+        return await self._run(
+            self.client.write_coils, address=address, values=values, device_id=device_id
+        )
+
+    async def write_coil_value(self, address: int, value: int, device_id: int):
+        return await self._run(
+            self.client.execute, False, RawWriteCoilRequest(address, value, device_id)
+        )
+
+    async def read_holding_registers(self, address: int, count: int, device_id: int):
+        return await self._run(
+            self.client.read_holding_registers, address=address, count=count, device_id=device_id
+        )
+
+    async def write_register(self, address: int, value: int, device_id: int):
+        return await self._run(
+            self.client.write_register, address=address, value=value, device_id=device_id
+        )
+
+
+class AsyncSerialTransport(ModbusTransport):
+    """pymodbus AsyncModbusSerialClient，請求直接在事件循環上收發"""
+
+    name = "async"
+
+    def __init__(
+        self, client: AsyncModbusSerialClient, baudrate: int, inter_frame_delay_ms: float = 0
+    ):
+        super().__init__(baudrate, inter_frame_delay_ms)
+        self.client = client
+
+    async def _run(self, func, *args, **kwargs):
+        await self._wait_inter_frame()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self._mark_frame_end()
+
+    async def connect(self) -> bool:
+        return await self.client.connect()
+
+    async def close(self):
+        self.client.close()
+
+    def is_open(self) -> bool:
+        return self.client.connected
+
+    def set_timeout(self, seconds: float):
+        self.client.ctx.comm_params.timeout_connect = seconds
+
+    async def read_coils(self, address: int, count: int, device_id: int):
+        return await self._run(
+            self.client.read_coils, address=address, count=count, device_id=device_id
+        )
+
+    async def write_coil(self, address: int, value: bool, device_id: int):
+        return await self._run(
+            self.client.write_coil, address=address, value=value, device_id=device_id
+        )
+
+    async def write_coils(self, address: int, values: List[bool], device_id: int):
+        return await self._run(
+            self.client.write_coils, address=address, values=values, device_id=device_id
+        )
+
+    async def write_coil_value(self, address: int, value: int, device_id: int):
+        return await self._run(
+            self.client.execute, False, RawWriteCoilRequest(address, value, device_id)
+        )
+
+    async def read_holding_registers(self, address: int, count: int, device_id: int):
+        return await self._run(
+            self.client.read_holding_registers, address=address, count=count, device_id=device_id
+        )
+
+    async def write_register(self, address: int, value: int, device_id: int):
+        return await self._run(
+            self.client.write_register, address=address, value=value, device_id=device_id
+        )
+
+
+def create_serial_transport(
+    port: str, baudrate: int, backend: Optional[str] = None
+) -> ModbusTransport:
+    """依設定建立串口傳輸層
+
+    Args:
+        port: 串口端口
+        baudrate: 波特率
+        backend: executor 或 async，默認使用 settings.modbus_transport
+    """
+    backend = backend or settings.modbus_transport
+    params = dict(
+        port=port,
+        baudrate=baudrate,
+        parity=settings.modbus_parity,
+        stopbits=settings.modbus_stopbits,
+        bytesize=settings.modbus_bytesize,
+        timeout=settings.modbus_timeout,
+    )
+
+    if backend == "async":
+        return AsyncSerialTransport(
+            AsyncModbusSerialClient(**params), baudrate, settings.modbus_inter_frame_delay_ms
+        )
+    if backend == "executor":
+        return ExecutorTransport(
+            ModbusSerialClient(**params), baudrate, settings.modbus_inter_frame_delay_ms
+        )
+
+    raise ValueError(f"不支援的 Modbus 傳輸後端: {backend}")
@@ -0,0 +1,217 @@
+"""多板繼電器控制器池
+
+一個或多個 Waveshare 16CH 繼電器板可掛在同一條 RS-485 匯流排（不同設備地址），
+也可分佈在多個 USB 轉接器上。控制器池：
+- 每個實體匯流排（串口）一把鎖，匯流排內請求序列化
+- 依設備地址路由請求到對應的控制器
+- 不同匯流排之間的請求並行執行
+- 提供所有板的彙總狀態
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from config import settings
+from services.bus_scheduler import bus_priority
+from services.modbus_controller import ModbusBus, ModbusRelayController
+from services.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+
+class RelayControllerPool:
+    """繼電器控制器池，以 (device_address, channel) 定位繼電器"""
+
+    def __init__(self, boards: List[Dict], simulation_mode: bool = False):
+        """初始化控制器池
+
+        Args:
+            boards: 板配置列表，每項包含 port、device_address，可選 baudrate
+            simulation_mode: 模擬模式，用於無硬件測試
+        """
+        self.simulation_mode = simulation_mode
+        self.buses: Dict[str, ModbusBus] = {}
+        self.controllers: Dict[int, ModbusRelayController] = {}
+
+        for board in boards:
+            port = board["port"]
+            address = board["device_address"]
+
+            if address in self.controllers:
+                raise ValueError(f"設備地址 {address} 重複，每塊板必須有唯一的地址")
+
+            bus = self.buses.get(port)
+            if bus is None:
+                bus = ModbusBus(
+                    port,
+                    board.get("baudrate") or settings.modbus_baudrate,
+                    simulation_mode=simulation_mode,
+                )
+                self.buses[port] = bus
+
+            self.controllers[address] = ModbusRelayController(device_address=address, bus=bus)
+
+        if settings.modbus_device_address in self.controllers:
+            self.default_address = settings.modbus_device_address
+        else:
+            self.default_address = next(iter(self.controllers))
+
+        logger.info(
+            f"RelayControllerPool 初始化: {len(self.controllers)} 塊板, "
+            f"{len(self.buses)} 條匯流排, simulation={simulation_mode}"
+        )
+
+    @property
+    def total_channels(self) -> int:
+        return len(self.controllers) * 16
+
+    def get(self, device_address: Optional[int] = None) -> ModbusRelayController:
+        """依設備地址取得控制器
+
+        Args:
+            device_address: Modbus 設備地址，None 表示預設板
+
+        Raises:
+            ValueError: 找不到該地址的繼電器板
+        """
+        if device_address is None:
+            device_address = self.default_address
+
+        controller = self.controllers.get(device_address)
+        if controller is None:
+            raise ValueError(f"找不到設備地址為 {device_address} 的繼電器板")
+        return controller
+
+    async def connect(self) -> bool:
+        """連接所有匯流排與繼電器板
+
+        Returns:
+            是否全部連接成功
+        """
+        results = await asyncio.gather(
+            *(controller.connect() for controller in self.controllers.values())
+        )
+        return all(results)
+
+    async def disconnect(self):
+        """斷開所有繼電器板與匯流排"""
+        await asyncio.gather(
+            *(controller.disconnect() for controller in self.controllers.values())
+        )
+        await asyncio.gather(*(bus.close() for bus in self.buses.values()))
+
+    async def set_relays(self, changes: Dict[Tuple[Optional[int], int], bool]) -> Dict:
+        """同時設置多個繼電器
+
+        同一塊板的變更由控制器合併寫入，不同匯流排之間並行執行。
+
+        Args:
+            changes: (device_address, channel) -> 目標狀態
+
+        Returns:
+            (device_address, channel) -> 操作是否成功
+        """
+        keys = list(changes)
+        results = await asyncio.gather(
+            *(self._set_relay(address, channel, changes[(address, channel)])
+              for address, channel in keys)
+        )
+        return dict(zip(keys, results))
+
+    async def _set_relay(self, device_address: Optional[int], channel: int, state: bool) -> bool:
+        try:
+            controller = self.get(device_address)
+        except ValueError as e:
+            logger.error(f"設置繼電器 {device_address}:{channel} 失敗: {e}")
+            return False
+        return await controller.set_relay(channel, state)
+
+    async def set_all_relays(self, state: bool) -> bool:
+        """設置所有板的所有繼電器"""
+        results = await asyncio.gather(
+            *(controller.set_all_relays(state) for controller in self.controllers.values())
+        )
+        return all(results)
+
+    async def toggle_all_relays(self) -> bool:
+        """翻轉所有板的所有繼電器"""
+        results = await asyncio.gather(
+            *(controller.toggle_all_relays() for controller in self.controllers.values())
+        )
+        return all(results)
+
+    async def change_baudrate(self, baudrate: int, port: Optional[str] = None) -> List[Dict]:
+        """切換匯流排上所有板的波特率（見 ModbusBus.change_baudrate）
+
+        Args:
+            baudrate: 目標波特率
+            port: 只切換此串口，None 表示所有匯流排
+        """
+        if port is not None and port not in self.buses:
+            raise KeyError(f"未配置串口 {port}")
+
+        buses = [self.buses[port]] if port is not None else list(self.buses.values())
+        return list(await asyncio.gather(*(
+            bus.change_baudrate(
+                baudrate,
+                sorted(address for address, c in self.controllers.items() if c.bus is bus),
+            )
+            for bus in buses
+        )))
+
+    async def get_shared_status_dict(self, fresh: bool = False) -> Dict:
+        """供狀態輪詢端點使用的 get_status_dict
+
+        以狀態輪詢等級讀取匯流排；同時進行的相同查詢共用一次讀取，
+        結果在 single_flight_ttl_ms 內重用，線圈映像改變時失效。返回的字典不可修改。
+        """
+        with bus_priority("poll"):
+            return await get_single_flight().run(
+                ("relay_status", fresh), lambda: self.get_status_dict(fresh=fresh)
+            )
+
+    async def get_status_dict(self, fresh: bool = False) -> Dict:
+        """取得彙總狀態
+
+        頂層欄位沿用預設板的狀態（與單板時的格式相容），
+        boards 列出所有板的狀態。
+        """
+        addresses = list(self.controllers)
+        statuses = await asyncio.gather(
+            *(self.controllers[address].get_status_dict(fresh=fresh) for address in addresses)
+        )
+        boards = dict(zip(addresses, statuses))
+
+        return {
+            **boards[self.default_address],
+            "boards": [boards[address] for address in sorted(addresses)],
+            "total_boards": len(addresses),
+            "total_buses": len(self.buses),
+            "total_channels": self.total_channels,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+
+
+# 全局控制器池實例
+_pool: Optional[RelayControllerPool] = None
+
+
+def get_relay_pool(simulation_mode: bool = True) -> RelayControllerPool:
+    """取得全局控制器池
+
+    Args:
+        simulation_mode: 是否使用模擬模式（無實際硬件時設為 True）
+    """
+    global _pool
+    if _pool is None:
+        _pool = RelayControllerPool(settings.get_modbus_boards(), simulation_mode=simulation_mode)
+    return _pool
+
+
+async def shutdown_relay_pool():
+    """關閉控制器池"""
+    global _pool
+    if _pool:
+        await _pool.disconnect()
+        _pool = None
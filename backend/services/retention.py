@@ -0,0 +1,264 @@
+"""歷史資料保留（retention）
+
+以集合式 DELETE ... WHERE id IN (SELECT id ... LIMIT n) 分批刪除過期的溫度與事件記錄，
+每批在執行緒池中以獨立交易執行並 commit，批次之間讓出事件循環並暫停
+retention_chunk_pause_ms 毫秒，讓溫度記錄寫入與 API 在批次之間取得資料庫鎖；
+不載入 ORM 物件，記憶體用量與刪除筆數無關。
+
+溫度記錄依月份分區（見 services/temperature_partitions.py）：整個月份都已過期的分區
+直接 DROP TABLE，只有跨過截止時間的分區與舊表才分批刪除；
+保留天數超過一個月時，分批刪除只發生在已關閉的舊月份，不會碰到正在寫入的當月分區。
+
+降採樣彙總（見 services/temperature_rollup.py）每個解析度各自一個保留天數，
+依時間桶起點分批刪除；細解析度只在短時間範圍的查詢中使用，可以比粗解析度更早刪除。
+
+背景任務每 retention_interval_hours 小時依各表的保留天數執行一次，
+每次執行的刪除筆數與耗時保留在 history 中。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import Table, delete
+from sqlmodel import Session, select
+from config import settings
+from models import EventCounter, EventLog, TemperatureLog, TemperatureRollup
+from services.temperature_partitions import get_temperature_partitions
+from services.temperature_rollup import ROLLUP_RESOLUTIONS
+
+logger = logging.getLogger(__name__)
+
+# 保留策略名稱 -> (模型, 保留天數設定名稱, 彙總解析度)
+RETENTION_TABLES: Dict[str, tuple] = {
+    "temperaturelog": (TemperatureLog, "retention_temperature_days", None),
+    "eventlog": (EventLog, "retention_event_days", None),
+    **{
+        f"temperaturerollup_{resolution}": (
+            TemperatureRollup, f"retention_rollup_{resolution}_days", resolution
+        )
+        for resolution in ROLLUP_RESOLUTIONS
+    },
+}
+
+
+class RetentionService:
+    """分批刪除過期記錄的背景服務"""
+
+    def __init__(
+        self,
+        db_session_factory: Optional[Callable[[], Session]] = None,
+        chunk_size: Optional[int] = None,
+        chunk_pause_ms: Optional[int] = None,
+    ):
+        """初始化保留服務
+
+        Args:
+            db_session_factory: 資料庫 Session 工廠函數，默認使用全局 engine
+            chunk_size: 每批刪除筆數
+            chunk_pause_ms: 批次之間暫停的毫秒數
+        """
+        if db_session_factory is None:
+            from database import engine
+
+            def db_session_factory():
+                return Session(engine)
+
+        self.db_session_factory = db_session_factory
+        self.chunk_size = chunk_size or settings.retention_chunk_size
+        self.chunk_pause = (
+            settings.retention_chunk_pause_ms if chunk_pause_ms is None else chunk_pause_ms
+        ) / 1000
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.history: Deque[Dict] = deque(maxlen=20)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def get_policies(self) -> Dict[str, int]:
+        """各表的保留天數（0 表示永久保留）"""
+        return {table: getattr(settings, name) for table, (_, name, _) in RETENTION_TABLES.items()}
+
+    async def start(self):
+        """啟動背景保留任務（所有表皆永久保留時不啟動）"""
+        if self.running:
+            return
+        if not any(self.get_policies().values()) or settings.retention_interval_hours <= 0:
+            logger.info("歷史資料保留未啟用（所有表永久保留）")
+            return
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"歷史資料保留已啟動，每 {settings.retention_interval_hours} 小時執行，"
+            f"保留天數: {self.get_policies()}"
+        )
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_policies()
+            except Exception as e:
+                logger.error(f"執行歷史資料保留時發生錯誤: {e}")
+            await asyncio.sleep(settings.retention_interval_hours * 3600)
+
+    async def run_policies(self) -> List[Dict]:
+        """依各表的保留天數刪除過期記錄"""
+        reports = []
+        for table, days in self.get_policies().items():
+            if days > 0:
+                reports.append(await self.purge(table, datetime.utcnow() - timedelta(days=days)))
+        return reports
+
+    def _delete_chunk(self, table: Table, conditions: List[Any]) -> int:
+        """刪除一批符合條件的記錄（在執行緒池中執行）"""
+        ids = select(table.c.id).where(*conditions).limit(self.chunk_size)
+        with self.db_session_factory() as session:
+            result = session.execute(delete(table).where(table.c.id.in_(ids)))
+            session.commit()
+            return result.rowcount
+
+    def _plan(
+        self, table: str, cutoff: datetime, tank_id: Optional[int]
+    ) -> Tuple[List[str], List[Table]]:
+        """決定要整表刪除的分區與要分批刪除的表（在執行緒池中執行）
+
+        Returns:
+            (整表刪除的分區名稱, 分批刪除的表)
+        """
+        model, _, _ = RETENTION_TABLES[table]
+        if model is not TemperatureLog:
+            return [], [model.__table__]
+
+        with self.db_session_factory() as session:
+            partitions = get_temperature_partitions().partitions_for(session, until=cutoff)
+
+        drops, chunked = [], []
+        for partition in partitions:
+            # 只刪除單一飼養箱時不能整表刪除
+            if tank_id is None and not partition.legacy and partition.end <= cutoff:
+                drops.append(partition.name)
+            else:
+                chunked.append(partition.table)
+        return drops, chunked
+
+    def _drop_partition(self, name: str):
+        with self.db_session_factory() as session:
+            bind = session.get_bind()
+        get_temperature_partitions().drop(bind, name)
+
+    async def purge(
+        self, table: str, cutoff: datetime, tank_id: Optional[int] = None, trigger: str = "policy"
+    ) -> Dict:
+        """刪除 cutoff 之前的記錄（過期的溫度分區整表刪除，其餘分批刪除）
+
+        Args:
+            table: RETENTION_TABLES 中的名稱（temperaturelog / eventlog / temperaturerollup_<解析度>）
+            cutoff: 刪除此時間之前的記錄
+            tank_id: 只刪除此飼養箱的溫度記錄
+            trigger: 觸發來源（policy / api），記錄於 history
+
+        Returns:
+            {"table", "cutoff", "deleted", "chunks", "dropped_partitions", "seconds", ...}
+        """
+        # 同一時間只有一個刪除任務，避免兩個大量刪除互相搶鎖
+        async with self._lock:
+            started_at = datetime.utcnow()
+            start = time.perf_counter()
+            deleted = 0
+            chunks = 0
+            max_chunk_ms = 0.0
+
+            drops, chunked = await asyncio.to_thread(self._plan, table, cutoff, tank_id)
+            for name in drops:
+                await asyncio.to_thread(self._drop_partition, name)
+
+            _, _, resolution = RETENTION_TABLES[table]
+            for target in chunked:
+                if resolution is not None:
+                    conditions = [
+                        target.c.resolution == resolution, target.c.bucket_start < cutoff
+                    ]
+                else:
+                    conditions = [target.c.timestamp < cutoff]
+                if tank_id is not None:
+                    conditions.append(target.c.tank_id == tank_id)
+
+                while True:
+                    chunk_start = time.perf_counter()
+                    count = await asyncio.to_thread(self._delete_chunk, target, conditions)
+                    max_chunk_ms = max(max_chunk_ms, (time.perf_counter() - chunk_start) * 1000)
+                    deleted += count
+                    chunks += 1
+                    if count < self.chunk_size:
+                        break
+                    await asyncio.sleep(self.chunk_pause)
+
+            if table == "eventlog" and deleted:
+                await asyncio.to_thread(self._sync_event_counters, cutoff)
+
+        report = {
+            "table": table,
+            "tank_id": tank_id,
+            "trigger": trigger,
+            "cutoff": cutoff.isoformat(),
+            "started_at": started_at.isoformat(),
+            "deleted": deleted,
+            "chunks": chunks,
+            "dropped_partitions": drops,
+            "seconds": round(time.perf_counter() - start, 3),
+            "max_chunk_ms": round(max_chunk_ms, 2),
+        }
+        self.history.append(report)
+        dropped = f"，整表刪除分區 {', '.join(drops)}" if drops else ""
+        logger.info(
+            f"已刪除 {table} 中 {deleted} 筆 {cutoff:%Y-%m-%d %H:%M} 之前的記錄，"
+            f"{chunks} 批{dropped}，耗時 {report['seconds']} 秒"
+        )
+        return report
+
+    def _sync_event_counters(self, cutoff: datetime):
+        """批量刪除不經過 ORM，事件計數須另外同步"""
+        from services.event_counters import rebuild_event_counters
+
+        if cutoff > datetime.utcnow() - timedelta(hours=25):
+            # 刪除範圍進入統計視窗，重算視窗內的計數
+            rebuild_event_counters(self.db_session_factory)
+            return
+        with self.db_session_factory() as session:
+            session.execute(delete(EventCounter).where(EventCounter.bucket_start < cutoff))
+            session.commit()
+
+    def get_status_dict(self) -> Dict:
+        return {
+            "running": self.running,
+            "interval_hours": settings.retention_interval_hours,
+            "chunk_size": self.chunk_size,
+            "chunk_pause_ms": round(self.chunk_pause * 1000),
+            "policies": self.get_policies(),
+            "history": list(self.history),
+        }
+
+
+# 全局保留服務實例
+_retention_service: Optional[RetentionService] = None
+
+
+def get_retention_service(db_session_factory=None) -> RetentionService:
+    """取得全局歷史資料保留服務"""
+    global _retention_service
+    if _retention_service is None:
+        _retention_service = RetentionService(db_session_factory)
+    return _retention_service
@@ -6,8 +6,11 @@ from datetime import datetime, time
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import update
 from sqlmodel import Session, select
 from models import Schedule, RelayChannel, EventLog
+from services.bus_scheduler import bus_priority
+from services.config_cache import get_config_cache
 from services.modbus_controller import get_controller
 
 logger = logging.getLogger(__name__)
@@ -183,14 +186,15 @@ class SchedulerService:
         """
         with self.db_session_factory() as session:
             try:
-                # 查詢排程
-                schedule = session.get(Schedule, schedule_id)
+                # 排程與繼電器配置從快取讀取（唯讀），不必每次觸發都查詢資料庫
+                cache = get_config_cache()
+                schedule = cache.get_item("schedules", schedule_id)
                 if not schedule or not schedule.active:
                     logger.warning(f"排程 {schedule_id} 不存在或已停用")
                     return
                 
                 # 查詢關聯的繼電器
-                relay = session.get(RelayChannel, schedule.relay_channel_id)
+                relay = cache.get_item("relays", schedule.relay_channel_id)
                 if not relay:
                     logger.error(f"排程 {schedule_id} 關聯的繼電器不存在")
                     return
@@ -259,18 +263,25 @@ class SchedulerService:
         should_turn_on: bool
     ):
         """執行排程動作"""
-        controller = get_controller()
+        controller = get_controller(device_address=relay.device_address)
         
         # 執行控制
-        success = await controller.set_relay(relay.channel, should_turn_on)
+        with bus_priority("schedule"):
+            success = await controller.set_relay(relay.channel, should_turn_on)
         
         if success:
-            # 更新資料庫
-            relay.current_state = should_turn_on
-            relay.manual_override = False
-            relay.updated_at = datetime.utcnow()
-            session.add(relay)
+            # 更新資料庫（relay 是快取中的唯讀物件，以 UPDATE 語句寫入後使快取失效）
+            session.exec(
+                update(RelayChannel)
+                .where(RelayChannel.id == relay.id)
+                .values(
+                    current_state=should_turn_on,
+                    manual_override=False,
+                    updated_at=datetime.utcnow(),
+                )
+            )
             session.commit()
+            get_config_cache().invalidate("relays")
             
             action = "開啟" if should_turn_on else "關閉"
             logger.info(f"排程 '{schedule.name}' 成功{action}繼電器 {relay.name}")
@@ -290,6 +301,24 @@ class SchedulerService:
             })
         
         return jobs
+    
+    def get_upcoming_runs(self, limit: int = 5) -> List[Dict]:
+        """取得即將執行的排程任務（依下次執行時間排序）"""
+        jobs = sorted(
+            (job for job in self.scheduler.get_jobs() if job.next_run_time),
+            key=lambda job: job.next_run_time
+        )
+        
+        return [
+            {
+                "job_id": job.id,
+                "schedule_id": job.args[0],
+                "name": job.name,
+                "action": {True: "on", False: "off"}.get(job.args[1], "auto"),
+                "next_run_time": job.next_run_time.isoformat(),
+            }
+            for job in jobs[:limit]
+        ]
 
 
 # 全局排程器實例
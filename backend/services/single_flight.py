@@ -0,0 +1,113 @@
+"""硬件讀取的單飛合併（single-flight）
+
+多個分頁同時輪詢 /api/relays/status/all、/api/dev/controller/status、/api/system/status、
+/api/temperature/current 或 /api/dev/sensors/raw 時，每個請求原本各自觸發一次匯流排或感測器讀取。
+
+SingleFlight 以 key（(名稱, *參數) 元組）識別相同的讀取：
+- 同一 key 已有讀取在進行中時，後到的請求等待同一個結果，不另外讀取
+- 讀取完成後的 single_flight_ttl_ms 毫秒內，相同的請求直接返回該結果
+硬件負載因此由 TTL 決定，而不是輪詢的客戶端數。
+
+讀取在獨立任務中執行，個別請求斷線取消不影響其他等待者；讀取失敗時不保留結果。
+狀態改變時（例如繼電器寫入後更新線圈映像）以 invalidate 丟棄該名稱保留的結果。
+返回的結果由所有請求共用，呼叫端不可修改。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """合併同時進行的相同讀取，並在短時間內重用結果"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self._results: Dict[Tuple, Tuple[float, Any]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    async def run(
+        self, key: Tuple[Hashable, ...], func: Callable[[], Awaitable], ttl_ms: Optional[int] = None
+    ) -> Any:
+        """執行或共用一次讀取
+
+        Args:
+            key: 讀取的識別（相同 key 的讀取結果相同，例如 ("relay_status", fresh)）
+            func: 建立實際讀取 coroutine 的函數
+            ttl_ms: 結果重用時間（毫秒），默認使用 settings.single_flight_ttl_ms，0 表示只合併進行中的讀取
+        """
+        ttl = (settings.single_flight_ttl_ms if ttl_ms is None else ttl_ms) / 1000
+        stats = self.stats.setdefault(
+            str(key), {"calls": 0, "executions": 0, "shared": 0, "cached": 0, "errors": 0}
+        )
+        stats["calls"] += 1
+
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            stats["cached"] += 1
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            stats["executions"] += 1
+            task = asyncio.ensure_future(self._execute(key, func))
+            self._inflight[key] = task
+        else:
+            stats["shared"] += 1
+        return await asyncio.shield(task)
+
+    async def _execute(self, key: Tuple[Hashable, ...], func: Callable[[], Awaitable]) -> Any:
+        try:
+            result = await func()
+        except Exception:
+            self.stats[str(key)]["errors"] += 1
+            self._results.pop(key, None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # 從讀取完成起計算 TTL
+        self._results[key] = (time.monotonic(), result)
+        return result
+
+    def invalidate(self, name: Optional[str] = None):
+        """丟棄名稱為 name 的所有保留結果（None 表示全部），進行中的讀取不受影響"""
+        if name is None:
+            self._results.clear()
+            return
+        for key in [key for key in self._results if key[0] == name]:
+            del self._results[key]
+
+    def get_status_dict(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "ttl_ms": settings.single_flight_ttl_ms,
+            "in_flight": [str(key) for key in self._inflight],
+            "keys": {
+                name: {
+                    **stats,
+                    "result_age_ms": next(
+                        (round((now - at) * 1000, 1) for key, (at, _) in self._results.items()
+                         if str(key) == name),
+                        None,
+                    ),
+                }
+                for name, stats in self.stats.items()
+            },
+        }
+
+
+# 全局單飛合併實例
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """取得全局硬件讀取單飛合併"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
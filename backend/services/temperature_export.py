@@ -0,0 +1,199 @@
+"""溫度記錄串流匯出
+
+以 (tank_id, timestamp, id) 鍵集分頁（keyset pagination）逐頁讀取時間範圍涵蓋的溫度記錄分區，
+每頁使用獨立的 Session 並立即編碼為 CSV / NDJSON / Parquet 區塊送出，
+記憶體用量只與頁大小有關，不隨匯出筆數增長；
+長時間下載也不會一直持有讀取交易而阻擋 WAL checkpoint。
+
+Parquet 需要選用套件 pyarrow（uv sync --extra parquet），每頁寫成一個 row group。
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlmodel import Session, select
+from config import settings
+from models import Tank
+from services.temperature_partitions import get_temperature_partitions
+
+EXPORT_COLUMNS = ("id", "tank_id", "timestamp", "temperature", "humidity", "sensor_id")
+
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    # 格式 -> (media type, 副檔名)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+Row = Tuple[int, int, datetime, float, Optional[float], Optional[str]]
+
+
+def iter_temperature_pages(
+    session_factory: Callable[[], Session],
+    tank_ids: Optional[List[int]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    page_size: Optional[int] = None,
+) -> Iterator[List[Row]]:
+    """依 (tank_id, timestamp, id) 順序逐頁產生溫度記錄
+
+    每個飼養箱在每個分區中各自以 (timestamp, id) > (上一頁最後一筆) 續讀，
+    由 (tank_id, timestamp) 複合索引定位，頁數再多也不需要 OFFSET 掃描。
+
+    Args:
+        session_factory: 資料庫 Session 工廠函數（每頁開一個 Session）
+        tank_ids: 要匯出的飼養箱，None 表示全部
+        start: 起始時間（含）
+        end: 結束時間（不含）
+        page_size: 每頁筆數
+    """
+    page_size = page_size or settings.temp_export_page_size
+
+    if tank_ids is None:
+        with session_factory() as session:
+            tank_ids = list(session.exec(select(Tank.id).order_by(Tank.id)).all())
+
+    with session_factory() as session:
+        partitions = get_temperature_partitions().partitions_for(session, start, end)
+
+    for tank_id in sorted(tank_ids):
+        # 月份分區的時間範圍互不重疊，依分區順序讀取即為時間順序
+        for partition in partitions:
+            table = partition.table
+            columns = [table.c[name] for name in EXPORT_COLUMNS]
+            last: Optional[Tuple[datetime, int]] = None
+            while True:
+                stmt = select(*columns).where(table.c.tank_id == tank_id)
+                if start is not None:
+                    stmt = stmt.where(table.c.timestamp >= start)
+                if end is not None:
+                    stmt = stmt.where(table.c.timestamp < end)
+                if last is not None:
+                    stmt = stmt.where(tuple_(table.c.timestamp, table.c.id) > tuple_(*last))
+                stmt = stmt.order_by(table.c.timestamp, table.c.id).limit(page_size)
+
+                with session_factory() as session:
+                    rows = [tuple(row) for row in session.execute(stmt).all()]
+                if not rows:
+                    break
+
+                yield rows
+                if len(rows) < page_size:
+                    break
+                last = (rows[-1][2], rows[-1][0])
+
+
+def encode_csv(pages: Iterator[List[Row]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in pages:
+        writer.writerows(
+            (log_id, tank_id, timestamp.isoformat(), temperature, humidity, sensor_id)
+            for log_id, tank_id, timestamp, temperature, humidity, sensor_id in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(pages: Iterator[List[Row]]) -> Iterator[bytes]:
+    for rows in pages:
+        yield "".join(
+            json.dumps(
+                {
+                    "id": log_id,
+                    "tank_id": tank_id,
+                    "timestamp": timestamp.isoformat(),
+                    "temperature": temperature,
+                    "humidity": humidity,
+                    "sensor_id": sensor_id,
+                },
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ) + "\n"
+            for log_id, tank_id, timestamp, temperature, humidity, sensor_id in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """只追加的輸出，寫入的位元組由串流取走後即釋放"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_parquet(pages: Iterator[List[Row]]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("tank_id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("temperature", pa.float64()),
+        ("humidity", pa.float64()),
+        ("sensor_id", pa.string()),
+    ])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in pages:
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                schema=schema,
+            ))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    yield sink.take()
+
+
+def check_export_format(export_format: str):
+    """檢查匯出格式，不支援或缺少選用套件時拋出 ValueError"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支援的匯出格式: {export_format}，可用: {', '.join(EXPORT_FORMATS)}")
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet 匯出需要安裝 pyarrow（uv sync --extra parquet）")
+
+
+def export_temperature_logs(
+    export_format: str,
+    session_factory: Callable[[], Session],
+    tank_ids: Optional[List[int]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    page_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """產生匯出檔的位元組區塊（同步產生器，由 StreamingResponse 在執行緒池中迭代）"""
+    check_export_format(export_format)
+    pages = iter_temperature_pages(session_factory, tank_ids, start, end, page_size)
+    encoders = {"csv": encode_csv, "ndjson": encode_ndjson, "parquet": encode_parquet}
+    return encoders[export_format](pages)
@@ -0,0 +1,242 @@
+"""溫度記錄批次寫入服務
+
+溫度讀數先進入非同步佇列，由背景任務每 temp_log_flush_interval 秒
+或累積 temp_log_batch_size 筆時以一次批量 INSERT 寫入資料庫，
+避免每筆讀數各自 commit（SD 卡上每次 commit 都會觸發 fsync）。
+記錄依時間寫入月份分區（見 services/temperature_partitions.py），
+同一交易中累加降採樣彙總（見 services/temperature_rollup.py）。
+寫入失敗時整批重試（交易已回滾，重試不會重複累加），重試用盡才放棄並計入 rows_dropped。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, List
+from datetime import datetime
+from sqlmodel import Session
+from config import settings
+from services.temperature_partitions import insert_temperature_rows
+from services.temperature_rollup import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class TemperatureLogWriter:
+    """溫度記錄批次寫入器
+
+    - 佇列滿時 submit 會等待（背壓），讓輪詢速度配合寫入速度
+    - stop() 時會寫入佇列中剩餘的所有記錄
+    """
+
+    def __init__(
+        self,
+        db_session_factory=None,
+        flush_interval: float = None,
+        batch_size: int = None,
+        max_queue_size: int = None,
+        max_retries: int = None,
+        retry_backoff: float = None,
+    ):
+        """初始化批次寫入器
+
+        Args:
+            db_session_factory: 資料庫 Session 工廠函數，默認使用全局 engine
+            flush_interval: 最長寫入間隔（秒）
+            batch_size: 累積多少筆即寫入
+            max_queue_size: 佇列上限，超過時 submit 等待
+            max_retries: 寫入失敗時的重試次數
+            retry_backoff: 第一次重試前的等待（秒），之後每次加倍
+        """
+        if db_session_factory is None:
+            from database import engine
+
+            def db_session_factory():
+                return Session(engine)
+
+        self.db_session_factory = db_session_factory
+        self.flush_interval = flush_interval or settings.temp_log_flush_interval
+        self.batch_size = batch_size or settings.temp_log_batch_size
+        self.max_retries = settings.temp_log_flush_retries if max_retries is None else max_retries
+        self.retry_backoff = (
+            settings.temp_log_retry_backoff if retry_backoff is None else retry_backoff
+        )
+        self.queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max_queue_size or settings.temp_log_queue_size
+        )
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[Dict] = []  # 正在累積、尚未寫入的記錄
+        self._flushing: Optional[asyncio.Future] = None
+
+        # 統計
+        self.stats = {
+            "rows_submitted": 0,
+            "rows_written": 0,
+            "flushes": 0,
+            "flush_errors": 0,  # 失敗的寫入嘗試次數（含之後重試成功的）
+            "flush_retries": 0,
+            "rows_dropped": 0,  # 重試用盡後放棄的記錄數
+            "backpressure_waits": 0,
+            "last_flush_rows": 0,
+            "last_flush_ms": None,
+            "max_flush_ms": None,
+            "last_flush_at": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """啟動背景寫入任務"""
+        if self.running:
+            logger.warning("溫度記錄寫入服務已在運行")
+            return
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"溫度記錄寫入服務已啟動，間隔: {self.flush_interval}秒，批量: {self.batch_size}"
+        )
+
+    async def stop(self):
+        """停止背景寫入任務，並寫入佇列中剩餘的記錄"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # 等待進行中的寫入完成，再寫入累積中與佇列內剩餘的記錄
+        if self._flushing:
+            await self._flushing
+
+        remaining = self._batch + self._drain(self.queue.qsize())
+        self._batch = []
+        if remaining:
+            await self._flush(remaining)
+
+        logger.info(f"溫度記錄寫入服務已停止，共寫入 {self.stats['rows_written']} 筆")
+
+    async def submit(
+        self,
+        tank_id: int,
+        temperature: float,
+        humidity: Optional[float] = None,
+        sensor_id: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ):
+        """提交一筆溫度記錄（佇列滿時等待）"""
+        row = {
+            "tank_id": tank_id,
+            "temperature": temperature,
+            "humidity": humidity,
+            "sensor_id": sensor_id,
+            "timestamp": timestamp or datetime.utcnow(),
+        }
+
+        if self.queue.full():
+            self.stats["backpressure_waits"] += 1
+            logger.warning(f"溫度記錄佇列已滿 ({self.queue.maxsize})，等待寫入")
+
+        await self.queue.put(row)
+        self.stats["rows_submitted"] += 1
+
+    def _drain(self, limit: int) -> List[Dict]:
+        """從佇列取出最多 limit 筆記錄（不等待）"""
+        rows = []
+        while len(rows) < limit and not self.queue.empty():
+            rows.append(self.queue.get_nowait())
+        return rows
+
+    async def _run(self):
+        """背景任務：等待第一筆記錄後，於間隔或批量上限時寫入"""
+        loop = asyncio.get_event_loop()
+
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._drain(self.batch_size - len(self._batch)))
+                if len(self._batch) >= self.batch_size:
+                    break
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rows, self._batch = self._batch, []
+            # shield: stop() 取消任務時不中斷進行中的寫入
+            self._flushing = asyncio.ensure_future(self._flush(rows))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+
+    def _insert_rows(self, rows: List[Dict]):
+        """以一次批量 INSERT 寫入並累加彙總（在執行緒池中執行）"""
+        with self.db_session_factory() as session:
+            insert_temperature_rows(session, rows)
+            apply_rollups(session, rows)
+            session.commit()
+
+    async def _flush(self, rows: List[Dict]):
+        """寫入一批記錄並更新統計，失敗時以指數退避重試"""
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(None, self._insert_rows, rows)
+                break
+            except Exception as e:
+                self.stats["flush_errors"] += 1
+                if attempt >= self.max_retries:
+                    self.stats["rows_dropped"] += len(rows)
+                    logger.error(
+                        f"批次寫入 {len(rows)} 筆溫度記錄失敗，已重試 {attempt} 次，放棄: {e}"
+                    )
+                    return
+                delay = self.retry_backoff * (2 ** attempt)
+                attempt += 1
+                self.stats["flush_retries"] += 1
+                logger.warning(
+                    f"批次寫入 {len(rows)} 筆溫度記錄失敗，{delay:g} 秒後重試 "
+                    f"({attempt}/{self.max_retries}): {e}"
+                )
+                await asyncio.sleep(delay)
+
+        flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.stats["rows_written"] += len(rows)
+        self.stats["flushes"] += 1
+        self.stats["last_flush_rows"] = len(rows)
+        self.stats["last_flush_ms"] = flush_ms
+        self.stats["max_flush_ms"] = max(self.stats["max_flush_ms"] or 0, flush_ms)
+        self.stats["last_flush_at"] = datetime.utcnow().isoformat()
+        logger.debug(f"已批次寫入 {len(rows)} 筆溫度記錄，耗時 {flush_ms}ms")
+
+    def get_status_dict(self) -> Dict:
+        """取得寫入器狀態（佇列深度與寫入延遲）"""
+        return {
+            "running": self.running,
+            "queue_depth": self.queue.qsize(),
+            "queue_max": self.queue.maxsize,
+            "flush_interval": self.flush_interval,
+            "batch_size": self.batch_size,
+            **self.stats,
+        }
+
+
+# 全局寫入器實例
+_log_writer: Optional[TemperatureLogWriter] = None
+
+
+def get_temperature_log_writer(db_session_factory=None) -> TemperatureLogWriter:
+    """取得全局溫度記錄寫入器"""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = TemperatureLogWriter(db_session_factory)
+    return _log_writer
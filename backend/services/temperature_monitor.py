@@ -4,12 +4,35 @@
 import asyncio
 import logging
 import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, List, Dict
 from datetime import datetime
 from config import settings
+from services.live_state import get_live_hub
+from services.single_flight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
+# 感測器阻塞 I/O 專用執行緒池（與 Modbus 等其他執行緒池工作分開）
+_sensor_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_sensor_executor() -> ThreadPoolExecutor:
+    """取得感測器 I/O 執行緒池
+
+    大小為並發讀取上限的兩倍：逾時的讀取無法取消，執行緒會繼續卡在 sysfs 直到返回，
+    多出的執行緒讓正常的感測器不必排在卡住的讀取後面。執行緒全被卡住時，
+    排隊中的讀取仍受 sensor_timeout 限制，逾時後從佇列取消。
+    """
+    global _sensor_executor
+    if _sensor_executor is None:
+        _sensor_executor = ThreadPoolExecutor(
+            max_workers=max(2, settings.temp_read_concurrency * 2),
+            thread_name_prefix="sensor-io"
+        )
+    return _sensor_executor
+
 
 class TemperatureSensor:
     """溫度感測器基類"""
@@ -20,6 +43,11 @@ class TemperatureSensor:
         self.last_reading: Optional[float] = None
         self.last_update: Optional[datetime] = None
     
+    @property
+    def busy(self) -> bool:
+        """上一次讀取是否仍在進行中"""
+        return False
+    
     async def read_temperature(self) -> Optional[float]:
         """讀取溫度"""
         raise NotImplementedError
@@ -35,13 +63,41 @@ class DS18B20Sensor(TemperatureSensor):
     def __init__(self, sensor_id: str, device_path: str = None):
         super().__init__(sensor_id, "DS18B20")
         self.device_path = device_path or f"/sys/bus/w1/devices/{sensor_id}/w1_slave"
+        # 進行中的阻塞讀取（逾時後仍可能在執行緒中執行）
+        self._io: Optional[Future] = None
+    
+    @property
+    def busy(self) -> bool:
+        return self._io is not None and not self._io.done()
+    
+    def _read_lines(self) -> List[str]:
+        """讀取 w1_slave 文件（阻塞，每次讀取觸發約 750ms 的溫度轉換）"""
+        with open(self.device_path, 'r') as f:
+            return f.readlines()
+    
+    async def _read_lines_async(self) -> List[str]:
+        """在執行緒池中讀取 w1_slave
+        
+        呼叫端逾時取消時，尚在排隊的讀取一併取消；已開始的讀取無法中斷，
+        執行緒會繼續到讀取返回，期間 busy 為 True。
+        """
+        self._io = get_sensor_executor().submit(self._read_lines)
+        try:
+            return await asyncio.wrap_future(self._io)
+        except asyncio.CancelledError:
+            self._io.cancel()
+            raise
     
     async def read_temperature(self) -> Optional[float]:
         """從 1-Wire 文件系統讀取溫度"""
+        if self.busy:
+            logger.warning(f"感測器 {self.sensor_id} 上一次讀取尚未返回，略過")
+            return None
+        
         try:
             # 在 Linux 上，DS18B20 數據位於 /sys/bus/w1/devices/
-            with open(self.device_path, 'r') as f:
-                lines = f.readlines()
+            # 阻塞的 sysfs 讀取在執行緒池中進行，避免卡住事件循環
+            lines = await self._read_lines_async()
             
             # 檢查 CRC 是否正確
             if lines[0].strip()[-3:] != 'YES':
@@ -109,6 +165,13 @@ class TemperatureMonitorService:
         self.polling_task: Optional[asyncio.Task] = None
         self._running = False
         
+        # 並發讀取設定
+        self.read_concurrency = settings.temp_read_concurrency
+        self.sensor_timeout = settings.temp_sensor_timeout
+        
+        # 最近一次輪詢統計
+        self.last_poll_stats: Optional[Dict] = None
+        
         # 溫度記錄回調
         self.on_temperature_reading: Optional[callable] = None
         self.on_temperature_alert: Optional[callable] = None
@@ -163,17 +226,71 @@ class TemperatureMonitorService:
             "timestamp": datetime.utcnow().isoformat()
         }
     
+    async def _read_sensor_bounded(
+        self, sensor_id: str, semaphore: asyncio.Semaphore
+    ) -> Optional[Dict]:
+        """在並發上限與逾時限制下讀取單個感測器
+        
+        逾時涵蓋等待執行緒池空閒執行緒的時間，執行緒被卡住的讀取佔滿時也不會拖長輪詢週期。
+        
+        Raises:
+            asyncio.TimeoutError: 超過 sensor_timeout 秒
+        """
+        async with semaphore:
+            return await asyncio.wait_for(self.read_sensor(sensor_id), self.sensor_timeout)
+    
     async def read_all_sensors(self) -> List[Dict]:
-        """讀取所有感測器"""
+        """並發讀取所有感測器
+        
+        同時讀取的感測器數量受 read_concurrency 限制，
+        單個感測器超過 sensor_timeout 秒即放棄，不影響其他感測器。
+        上一次讀取仍卡在執行緒中的感測器本輪略過（記錄於 busy），不重複送出讀取。
+        """
+        start = time.perf_counter()
+        busy = [sensor_id for sensor_id, sensor in self.sensors.items() if sensor.busy]
+        sensor_ids = [sensor_id for sensor_id in self.sensors if sensor_id not in busy]
+        semaphore = asyncio.Semaphore(max(1, self.read_concurrency))
+        
+        results = await asyncio.gather(
+            *(self._read_sensor_bounded(sensor_id, semaphore) for sensor_id in sensor_ids),
+            return_exceptions=True
+        )
+        
         readings = []
+        timeouts = []
+        errors = []
         
-        for sensor_id in self.sensors:
-            reading = await self.read_sensor(sensor_id)
-            if reading:
-                readings.append(reading)
+        for sensor_id, result in zip(sensor_ids, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning(f"讀取感測器 {sensor_id} 逾時 ({self.sensor_timeout}秒)")
+                timeouts.append(sensor_id)
+            elif isinstance(result, Exception):
+                logger.error(f"讀取感測器 {sensor_id} 時發生錯誤: {result}")
+                errors.append(sensor_id)
+            elif result:
+                readings.append(result)
+        
+        cycle_ms = (time.perf_counter() - start) * 1000
+        self.last_poll_stats = {
+            "cycle_ms": round(cycle_ms, 1),
+            "sensors": len(self.sensors),
+            "readings": len(readings),
+            "timeouts": timeouts,
+            "errors": errors,
+            "busy": busy,
+            "concurrency": self.read_concurrency,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        logger.debug(
+            f"感測器輪詢完成: {len(readings)}/{len(self.sensors)} 筆, 耗時 {cycle_ms:.1f}ms"
+        )
         
         return readings
     
+    async def read_all_sensors_shared(self) -> List[Dict]:
+        """供 API 輪詢：同時進行的請求共用一次 read_all_sensors，結果在 single_flight_ttl_ms 內重用"""
+        return await get_single_flight().run(("sensor_readings",), self.read_all_sensors)
+
     async def poll_temperatures(self):
         """背景任務：定期輪詢溫度"""
         logger.info(f"溫度監控服務啟動，輪詢間隔: {settings.temp_poll_interval}秒")
@@ -181,6 +298,15 @@ class TemperatureMonitorService:
         while self._running:
             try:
                 readings = await self.read_all_sensors()
+                logger.info(
+                    f"溫度輪詢週期: {self.last_poll_stats['cycle_ms']}ms "
+                    f"({len(readings)}/{self.last_poll_stats['sensors']} 個感測器)"
+                )
+                get_live_hub().publish(
+                    "temperature",
+                    {"readings": readings, "poll_stats": self.last_poll_stats},
+                    coalesce_key="temperature",
+                )
                 
                 # 處理每個讀數
                 for reading in readings:
@@ -241,6 +367,10 @@ class TemperatureMonitorService:
             })
         
         return status
+    
+    def get_poll_stats(self) -> Optional[Dict]:
+        """取得最近一次輪詢統計（週期耗時、逾時與錯誤的感測器）"""
+        return self.last_poll_stats
 
 
 # 全局服務實例
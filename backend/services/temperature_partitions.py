@@ -0,0 +1,412 @@
+"""溫度記錄時間分區
+
+溫度原始記錄依月份寫入各自的表（temperaturelog_YYYYMM），欄位與 TemperatureLog 相同，
+各有 (tank_id, timestamp, temperature) 與 timestamp 索引。
+查詢只讀取時間範圍涵蓋的分區；保留期限已過的整個月份直接 DROP TABLE，
+不需逐筆刪除，也不會與正在寫入的當月分區爭用同一棵 B-tree。
+
+啟用分區之前寫入的 temperaturelog 表視為「舊表」分區，以其最早／最晚時間參與查詢路由，
+由保留任務分批刪除逐漸清空。
+id 由寫入器統一分配，跨分區遞增且不重複，API 與匯出中的 id 仍是唯一鍵。
+
+temp_log_partitioning 停用時新記錄寫回舊表，查詢仍經過分區路由（已存在的分區照常讀取）。
+"""
+
+import logging
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    desc,
+    func,
+    insert,
+    inspect,
+    select,
+    union_all,
+)
+from sqlmodel import Session, col
+from config import settings
+from models import Tank, TemperatureLog
+
+logger = logging.getLogger(__name__)
+
+LEGACY_TABLE = TemperatureLog.__tablename__
+PARTITION_PREFIX = f"{LEGACY_TABLE}_"
+
+
+def next_month(start: datetime) -> datetime:
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(timestamp: datetime) -> str:
+    """記錄所屬的分區表名，例: temperaturelog_202410"""
+    return f"{PARTITION_PREFIX}{timestamp:%Y%m}"
+
+
+def parse_partition_name(name: str) -> Optional[datetime]:
+    """分區表名對應的月份起點，不是分區表時返回 None"""
+    suffix = name[len(PARTITION_PREFIX):]
+    if not name.startswith(PARTITION_PREFIX) or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    try:
+        return datetime(int(suffix[:4]), int(suffix[4:]), 1)
+    except ValueError:
+        return None
+
+
+class Partition:
+    """一個分區：表與其涵蓋的時間範圍 [start, end)"""
+
+    __slots__ = ("name", "table", "start", "end")
+
+    def __init__(self, name: str, table: Table, start: datetime, end: datetime):
+        self.name = name
+        self.table = table
+        self.start = start
+        self.end = end
+
+    @property
+    def legacy(self) -> bool:
+        return self.name == LEGACY_TABLE
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "start": self.start.isoformat(), "end": self.end.isoformat()}
+
+
+class TemperaturePartitions:
+    """分區表目錄：建立、列出、刪除分區，並統一分配記錄 id"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._metadata = MetaData()
+        self._tables: Dict[str, Table] = {}
+        self._months: Optional[Dict[str, datetime]] = None  # 分區表名 -> 月份起點
+        self._next_id: Optional[int] = None
+        self.stats = {"created": 0, "dropped": 0, "queries": 0, "partitions_scanned": 0}
+
+    def table(self, name: str) -> Table:
+        """分區表的 SQLAlchemy Table（索引名稱帶分區名，避免在同一資料庫中衝突）"""
+        if name == LEGACY_TABLE:
+            return TemperatureLog.__table__
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                table = Table(
+                    name,
+                    self._metadata,
+                    Column("id", Integer, primary_key=True, autoincrement=False),
+                    Column("tank_id", Integer, nullable=False),
+                    Column("temperature", Float, nullable=False),
+                    Column("humidity", Float),
+                    Column("sensor_id", String),
+                    Column("timestamp", DateTime, nullable=False),
+                    Index(f"ix_{name}_tank_timestamp", "tank_id", "timestamp", "temperature"),
+                    Index(f"ix_{name}_timestamp", "timestamp"),
+                )
+                self._tables[name] = table
+            return table
+
+    def _load(self, connection) -> Dict[str, datetime]:
+        """第一次使用時從資料庫讀取既有的分區表"""
+        if self._months is None:
+            months = {}
+            for name in inspect(connection).get_table_names():
+                start = parse_partition_name(name)
+                if start is not None:
+                    months[name] = start
+            with self._lock:
+                if self._months is None:
+                    self._months = months
+        return self._months
+
+    def monthly(self, connection) -> List[Tuple[str, datetime]]:
+        """既有的月份分區 [(表名, 月份起點)]，由舊到新"""
+        return sorted(self._load(connection).items(), key=lambda item: item[1])
+
+    def _legacy_partition(self, connection) -> Optional[Partition]:
+        """舊表的時間範圍（兩次索引查找），沒有記錄時返回 None"""
+        table = TemperatureLog.__table__
+        first, last = connection.execute(select(
+            select(func.min(table.c.timestamp)).scalar_subquery(),
+            select(func.max(table.c.timestamp)).scalar_subquery(),
+        )).one()
+        if first is None:
+            return None
+        if isinstance(first, str):
+            first, last = datetime.fromisoformat(first), datetime.fromisoformat(last)
+        return Partition(LEGACY_TABLE, table, first, last + timedelta(microseconds=1))
+
+    def partitions_for(
+        self,
+        session: Session,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Partition]:
+        """時間範圍 [since, until) 涵蓋的分區，依結束時間由舊到新
+
+        舊表的記錄早於所有月份分區時，舊表排在最前面（第一個月份分區可能從月中才開始寫入）。
+        """
+        connection = session.connection()
+        partitions = []
+
+        legacy = self._legacy_partition(connection)
+        if legacy is not None:
+            partitions.append(legacy)
+
+        for name, start in self.monthly(connection):
+            partitions.append(Partition(name, self.table(name), start, next_month(start)))
+
+        touched = [
+            partition for partition in partitions
+            if (since is None or partition.end > since)
+            and (until is None or partition.start < until)
+        ]
+        self.stats["queries"] += 1
+        self.stats["partitions_scanned"] += len(touched)
+        return sorted(touched, key=lambda partition: partition.end)
+
+    def ensure(self, bind, names: Iterable[str]):
+        """建立尚不存在的分區表（獨立的短交易，不在寫入交易中做 DDL）"""
+        existing = self._months
+        if existing is None:
+            with bind.connect() as connection:
+                existing = self._load(connection)
+        missing = [name for name in names if name not in existing]
+        if not missing:
+            return
+
+        with bind.begin() as connection:
+            for name in missing:
+                self.table(name).create(connection, checkfirst=True)
+        with self._lock:
+            for name in missing:
+                self._months[name] = parse_partition_name(name)
+                self.stats["created"] += 1
+                logger.info(f"已建立溫度記錄分區 {name}")
+
+    def drop(self, bind, name: str):
+        """刪除整個分區表"""
+        if name == LEGACY_TABLE:
+            raise ValueError("舊表不能整表刪除")
+        table = self.table(name)
+        with bind.begin() as connection:
+            table.drop(connection, checkfirst=True)
+        with self._lock:
+            if self._months is not None:
+                self._months.pop(name, None)
+            self._tables.pop(name, None)
+            self._metadata.remove(table)
+            self.stats["dropped"] += 1
+        logger.info(f"已刪除溫度記錄分區 {name}")
+
+    def allocate_ids(self, bind, count: int) -> int:
+        """分配 count 個連續 id，返回第一個（寫入失敗時 id 留空，不重用）"""
+        with self._lock:
+            if self._next_id is None:
+                self._next_id = self._max_id(bind) + 1
+            first = self._next_id
+            self._next_id += count
+            return first
+
+    def _max_id(self, bind) -> int:
+        with bind.connect() as connection:
+            names = [LEGACY_TABLE] + list(self._load(connection))
+            return max(
+                connection.execute(select(func.max(self.table(name).c.id))).scalar() or 0
+                for name in names
+            )
+
+    def get_status_dict(self, session: Session) -> Dict:
+        legacy = self._legacy_partition(session.connection())
+        return {
+            "partitioning": settings.temp_log_partitioning,
+            "legacy": legacy.to_dict() if legacy else None,
+            "partitions": [
+                Partition(name, self.table(name), start, next_month(start)).to_dict()
+                for name, start in self.monthly(session.connection())
+            ],
+            "next_id": self._next_id,
+            **self.stats,
+        }
+
+
+# 全局分區目錄實例
+_partitions: Optional[TemperaturePartitions] = None
+
+
+def get_temperature_partitions() -> TemperaturePartitions:
+    """取得全局溫度記錄分區目錄"""
+    global _partitions
+    if _partitions is None:
+        _partitions = TemperaturePartitions()
+    return _partitions
+
+
+def insert_temperature_rows(session: Session, rows: List[Dict]):
+    """在 session 的交易中寫入一批溫度記錄（依時間寫入各自的月份分區）"""
+    partitions = get_temperature_partitions()
+    bind = session.get_bind()
+
+    if settings.temp_log_partitioning:
+        groups: Dict[str, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(partition_name(row["timestamp"]), []).append(row)
+        partitions.ensure(bind, groups)
+    else:
+        groups = {LEGACY_TABLE: rows}
+
+    next_id = partitions.allocate_ids(bind, len(rows))
+    for name, group in groups.items():
+        numbered = []
+        for row in group:
+            numbered.append({**row, "id": next_id})
+            next_id += 1
+        session.execute(insert(partitions.table(name)), numbered)
+
+
+def _to_log(row) -> TemperatureLog:
+    return TemperatureLog(**row._mapping)
+
+
+def query_history(
+    session: Session,
+    tank_id: int,
+    since: Optional[datetime],
+    limit: int,
+) -> List[TemperatureLog]:
+    """某飼養箱 since 之後的記錄，由新到舊
+
+    從最新的分區開始查，取滿 limit 筆且剩下的分區都比第 limit 筆舊時即停止。
+    """
+    partitions = get_temperature_partitions().partitions_for(session, since)
+    logs: List[TemperatureLog] = []
+
+    for partition in sorted(partitions, key=lambda partition: partition.end, reverse=True):
+        if len(logs) >= limit and partition.end <= logs[limit - 1].timestamp:
+            break
+        table = partition.table
+        stmt = select(table).where(table.c.tank_id == tank_id)
+        if since is not None:
+            stmt = stmt.where(table.c.timestamp >= since)
+        stmt = stmt.order_by(desc(table.c.timestamp)).limit(limit)
+        logs.extend(_to_log(row) for row in session.execute(stmt))
+        logs.sort(key=lambda log: log.timestamp, reverse=True)
+
+    return logs[:limit]
+
+
+def query_latest(session: Session, tank_id: int) -> Optional[TemperatureLog]:
+    logs = query_history(session, tank_id, None, 1)
+    return logs[0] if logs else None
+
+
+def query_latest_by_tank(session: Session) -> Dict[int, TemperatureLog]:
+    """每個飼養箱的最新記錄
+
+    由最新的分區往回查，每個分區對尚未找到的飼養箱各做一次 (tank_id, timestamp) 索引查找。
+    """
+    tank_ids = set(session.execute(select(Tank.id)).scalars())
+    partitions = get_temperature_partitions().partitions_for(session)
+    latest: Dict[int, TemperatureLog] = {}
+
+    for partition in sorted(partitions, key=lambda partition: partition.end, reverse=True):
+        oldest_found = min((log.timestamp for log in latest.values()), default=None)
+        # 只有舊表可能與月份分區時間重疊，此時已找到的飼養箱也要再比較一次
+        overlaps = oldest_found is not None and partition.end > oldest_found
+        pending = tank_ids - latest.keys()
+        if not pending and not overlaps:
+            break
+        targets = tank_ids if overlaps else pending
+        table = partition.table
+        latest_id = (
+            select(table.c.id)
+            .where(table.c.tank_id == Tank.id)
+            .order_by(desc(table.c.timestamp))
+            .limit(1)
+            .correlate(Tank)
+            .scalar_subquery()
+        )
+        stmt = select(table).where(
+            table.c.id.in_(select(latest_id).where(col(Tank.id).in_(targets)))
+        )
+        for row in session.execute(stmt):
+            current = latest.get(row.tank_id)
+            if current is None or row.timestamp > current.timestamp:
+                latest[row.tank_id] = _to_log(row)
+
+    return latest
+
+
+def query_statistics(session: Session, tank_id: int, since: datetime) -> Tuple:
+    """各分區分別聚合後合併
+
+    Returns:
+        (count, min, max, avg, avg_square, first_reading, last_reading)，沒有記錄時 count 為 0
+    """
+    count, total, total_square = 0, 0.0, 0.0
+    minimum = maximum = first_reading = last_reading = None
+
+    for partition in get_temperature_partitions().partitions_for(session, since):
+        table = partition.table
+        temperature = table.c.temperature
+        stmt = (
+            select(
+                func.count(temperature),
+                func.min(temperature),
+                func.max(temperature),
+                func.sum(temperature),
+                func.sum(temperature * temperature),
+                func.min(table.c.timestamp),
+                func.max(table.c.timestamp),
+            )
+            .where(table.c.tank_id == tank_id)
+            .where(table.c.timestamp >= since)
+        )
+        part_count, part_min, part_max, part_sum, part_square, part_first, part_last = (
+            session.execute(stmt).one()
+        )
+        if not part_count:
+            continue
+        count += part_count
+        total += part_sum
+        total_square += part_square
+        minimum = part_min if minimum is None else min(minimum, part_min)
+        maximum = part_max if maximum is None else max(maximum, part_max)
+        first_reading = part_first if first_reading is None else min(first_reading, part_first)
+        last_reading = part_last if last_reading is None else max(last_reading, part_last)
+
+    if not count:
+        return 0, None, None, None, None, None, None
+    return (
+        count, minimum, maximum, total / count, total_square / count, first_reading, last_reading
+    )
+
+
+def query_percentile(
+    session: Session, tank_id: int, since: datetime, count: int, percentile: float
+) -> Optional[float]:
+    """以 nearest-rank 法取得百分位數，排序在資料庫中完成，不載入整個區間"""
+    offset = max(math.ceil(percentile / 100 * count) - 1, 0)
+    selects = [
+        select(partition.table.c.temperature.label("temperature"))
+        .where(partition.table.c.tank_id == tank_id)
+        .where(partition.table.c.timestamp >= since)
+        for partition in get_temperature_partitions().partitions_for(session, since)
+    ]
+    if not selects:
+        return None
+
+    values = union_all(*selects).subquery() if len(selects) > 1 else selects[0].subquery()
+    stmt = select(values.c.temperature).order_by(values.c.temperature).offset(offset).limit(1)
+    return session.execute(stmt).scalar()
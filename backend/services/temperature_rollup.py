@@ -0,0 +1,271 @@
+"""溫度降採樣彙總（rollup）
+
+每筆溫度記錄寫入時，同時以 UPSERT 累加到各解析度的時間桶（每個飼養箱一列），
+保存 count / min / max / sum，歷史查詢在長時間範圍時讀取彙總表，
+回傳點數與時間範圍無關。
+
+既有資料庫的舊記錄由 backfill_rollups() 在背景補算，進度保存在 SystemStatus，
+中斷後重啟會從上次的位置繼續。
+"""
+
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, desc
+from config import settings
+from models import SystemStatus, TemperatureLog, TemperatureRollup
+
+logger = logging.getLogger(__name__)
+
+# 解析度名稱 -> 時間桶長度（秒），由細到粗
+ROLLUP_RESOLUTIONS: Dict[str, int] = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+BACKFILL_STATUS_KEY = "temperature_rollup_backfill"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    """計算時間所屬時間桶的起點（UTC 對齊）"""
+    offset = (timestamp - _EPOCH) // timedelta(seconds=seconds) * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def aggregate_rows(rows: List[Dict]) -> List[Dict]:
+    """將一批溫度記錄彙總為各解析度的時間桶"""
+    buckets: Dict[tuple, Dict] = {}
+
+    for row in rows:
+        temperature = row["temperature"]
+        humidity = row.get("humidity")
+
+        for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+            key = (row["tank_id"], resolution, bucket_start(row["timestamp"], seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    "tank_id": key[0],
+                    "resolution": resolution,
+                    "bucket_start": key[2],
+                    "count": 0,
+                    "temp_min": temperature,
+                    "temp_max": temperature,
+                    "temp_sum": 0.0,
+                    "humidity_count": 0,
+                    "humidity_sum": 0.0,
+                }
+
+            bucket["count"] += 1
+            bucket["temp_min"] = min(bucket["temp_min"], temperature)
+            bucket["temp_max"] = max(bucket["temp_max"], temperature)
+            bucket["temp_sum"] += temperature
+            if humidity is not None:
+                bucket["humidity_count"] += 1
+                bucket["humidity_sum"] += humidity
+
+    return list(buckets.values())
+
+
+def apply_rollups(session: Session, rows: List[Dict]):
+    """將一批溫度記錄累加到彙總表（與記錄寫入在同一交易中呼叫）"""
+    buckets = aggregate_rows(rows)
+    if not buckets:
+        return
+
+    stmt = sqlite_insert(TemperatureRollup)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tank_id", "resolution", "bucket_start"],
+        set_={
+            "count": TemperatureRollup.count + excluded["count"],
+            "temp_min": func.min(TemperatureRollup.temp_min, excluded.temp_min),
+            "temp_max": func.max(TemperatureRollup.temp_max, excluded.temp_max),
+            "temp_sum": TemperatureRollup.temp_sum + excluded.temp_sum,
+            "humidity_count": TemperatureRollup.humidity_count + excluded.humidity_count,
+            "humidity_sum": TemperatureRollup.humidity_sum + excluded.humidity_sum,
+        },
+    )
+    session.execute(stmt, buckets)
+
+
+def choose_rollup_resolution(hours: float, max_points: int) -> str:
+    """選擇時間桶數不超過 max_points 的最細彙總解析度"""
+    span_seconds = hours * 3600
+
+    for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+        if span_seconds / seconds <= max_points:
+            return resolution
+
+    return list(ROLLUP_RESOLUTIONS)[-1]
+
+
+def choose_resolution(hours: float, limit: int) -> str:
+    """依查詢時間範圍選擇解析度
+
+    選擇預估點數不超過 min(limit, temp_history_max_points) 的最細解析度，
+    原始記錄的點數以輪詢間隔估算。
+    """
+    max_points = min(limit, settings.temp_history_max_points)
+
+    if hours * 3600 / max(settings.temp_poll_interval, 1) <= max_points:
+        return "raw"
+
+    return choose_rollup_resolution(hours, max_points)
+
+
+def query_rollups(
+    session: Session, tank_id: int, resolution: str, since: datetime, limit: int
+) -> List[Dict]:
+    """查詢彙總歷史（新到舊），欄位與原始記錄相容，另附 min / max / count"""
+    since_bucket = bucket_start(since, ROLLUP_RESOLUTIONS[resolution])
+    stmt = (
+        select(TemperatureRollup)
+        .where(TemperatureRollup.tank_id == tank_id)
+        .where(TemperatureRollup.resolution == resolution)
+        .where(TemperatureRollup.bucket_start >= since_bucket)
+        .order_by(desc(TemperatureRollup.bucket_start))
+        .limit(limit)
+    )
+
+    return [
+        {
+            "id": None,
+            "tank_id": rollup.tank_id,
+            "temperature": rollup.temp_sum / rollup.count,
+            "humidity": (
+                rollup.humidity_sum / rollup.humidity_count if rollup.humidity_count else None
+            ),
+            "sensor_id": None,
+            "timestamp": rollup.bucket_start,
+            "resolution": resolution,
+            "temperature_min": rollup.temp_min,
+            "temperature_max": rollup.temp_max,
+            "count": rollup.count,
+        }
+        for rollup in session.exec(stmt).all()
+    ]
+
+
+def query_sparklines(
+    session: Session, resolution: str, since: datetime
+) -> Dict[int, List[Dict]]:
+    """以單一查詢取得所有飼養箱的彙總序列（舊到新）
+
+    Returns:
+        tank_id -> [{"timestamp", "temperature", "humidity"}, ...]
+    """
+    since_bucket = bucket_start(since, ROLLUP_RESOLUTIONS[resolution])
+    stmt = (
+        select(TemperatureRollup)
+        .where(TemperatureRollup.resolution == resolution)
+        .where(TemperatureRollup.bucket_start >= since_bucket)
+        .order_by(TemperatureRollup.tank_id, TemperatureRollup.bucket_start)
+    )
+
+    series: Dict[int, List[Dict]] = {}
+    for rollup in session.exec(stmt).all():
+        series.setdefault(rollup.tank_id, []).append({
+            "timestamp": rollup.bucket_start,
+            "temperature": rollup.temp_sum / rollup.count,
+            "humidity": (
+                rollup.humidity_sum / rollup.humidity_count if rollup.humidity_count else None
+            ),
+        })
+    return series
+
+
+def _load_backfill_status(session: Session) -> Optional[SystemStatus]:
+    return session.exec(
+        select(SystemStatus).where(SystemStatus.key == BACKFILL_STATUS_KEY)
+    ).first()
+
+
+def prepare_backfill(db_session_factory) -> Optional[Dict]:
+    """記錄需要補算的記錄範圍（必須在溫度記錄寫入服務啟動前呼叫）
+
+    第一次執行時以目前最大的記錄 id 為補算上限，之後寫入的記錄由寫入服務即時彙總。
+
+    Returns:
+        {"until": 上限 id, "done": 已完成 id}，已完成或無資料時回傳 None
+    """
+    with db_session_factory() as session:
+        status = _load_backfill_status(session)
+        if status is None:
+            max_id = session.exec(select(func.max(TemperatureLog.id))).one() or 0
+            progress = {"until": max_id, "done": 0}
+            session.add(SystemStatus(key=BACKFILL_STATUS_KEY, value=json.dumps(progress)))
+            session.commit()
+        else:
+            progress = json.loads(status.value)
+
+    if progress["done"] >= progress["until"]:
+        return None
+    return progress
+
+
+def backfill_rollups(
+    db_session_factory,
+    progress: Dict,
+    chunk_size: int = 20000,
+    stop_event: Optional[threading.Event] = None,
+) -> int:
+    """分批補算舊記錄的彙總（在執行緒中執行）
+
+    Args:
+        db_session_factory: 資料庫 Session 工廠函數
+        progress: prepare_backfill() 回傳的範圍
+        chunk_size: 每批處理的記錄數
+        stop_event: 設定後於下一批開始前停止（進度已保存，下次啟動繼續）
+
+    Returns:
+        補算的記錄數
+    """
+    total = 0
+    done, until = progress["done"], progress["until"]
+    logger.info(f"開始補算溫度彙總，記錄 id {done + 1} ~ {until}")
+
+    while done < until:
+        if stop_event and stop_event.is_set():
+            logger.info(f"溫度彙總補算暫停於記錄 id {done}")
+            return total
+
+        with db_session_factory() as session:
+            rows = session.exec(
+                select(
+                    TemperatureLog.id,
+                    TemperatureLog.tank_id,
+                    TemperatureLog.temperature,
+                    TemperatureLog.humidity,
+                    TemperatureLog.timestamp,
+                )
+                .where(TemperatureLog.id > done)
+                .where(TemperatureLog.id <= until)
+                .order_by(TemperatureLog.id)
+                .limit(chunk_size)
+            ).all()
+
+            if rows:
+                apply_rollups(session, [row._asdict() for row in rows])
+                done = rows[-1].id
+                total += len(rows)
+            else:
+                done = until
+
+            # 彙總與進度在同一交易中提交，中斷後不會重複累加
+            status = _load_backfill_status(session)
+            status.value = json.dumps({"until": until, "done": done})
+            status.updated_at = datetime.utcnow()
+            session.add(status)
+            session.commit()
+
+    logger.info(f"溫度彙總補算完成，共 {total} 筆")
+    return total
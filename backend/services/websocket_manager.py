@@ -0,0 +1,258 @@
+"""WebSocket 連接管理
+
+開發者日誌推送（/api/dev/logs）與即時狀態推送（/api/live/ws）共用。
+每個連接可訂閱若干主題，未指定主題的連接接收所有訊息。
+
+廣播不等待任何一個客戶端：訊息只序列化一次，放入每個連接的有界發送佇列，
+由各連接自己的寫入任務送出。慢速客戶端的佇列滿時依設定丟棄最舊的訊息或斷開連接；
+帶有合併鍵（coalesce_key）的訊息若仍有同鍵訊息在佇列中等待，直接取代該訊息。
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+from fastapi import WebSocket
+from config import settings
+
+ALL_TOPICS = "*"
+
+_client_ids = itertools.count(1)
+
+
+def serialize_message(message: Any) -> str:
+    """序列化為 JSON 文字（與 send_json 相同格式）"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _Outgoing:
+    """佇列中的待發送訊息"""
+
+    __slots__ = ("text", "coalesce_key", "enqueued_at")
+
+    def __init__(self, text: str, coalesce_key: Optional[str]):
+        self.text = text
+        self.coalesce_key = coalesce_key
+        self.enqueued_at = time.monotonic()
+
+
+class ClientConnection:
+    """單一 WebSocket 連接：訂閱主題、發送佇列、寫入任務與延遲統計"""
+
+    def __init__(self, websocket: WebSocket, topics: Set[str], queue_size: int):
+        self.id = next(_client_ids)
+        self.websocket = websocket
+        self.topics = topics
+        self.queue_size = queue_size
+        self.queue: Deque[_Outgoing] = deque()
+        self.pending_keys: Dict[str, _Outgoing] = {}
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.stats = {
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0,
+        }
+
+    def wants(self, topic: Optional[str]) -> bool:
+        return topic is None or topic in self.topics or ALL_TOPICS in self.topics
+
+    def enqueue(self, text: str, coalesce_key: Optional[str] = None) -> bool:
+        """放入發送佇列（不等待）
+
+        Returns:
+            False 表示佇列已滿且策略為斷開連接
+        """
+        if coalesce_key is not None:
+            pending = self.pending_keys.get(coalesce_key)
+            if pending is not None:
+                # 舊訊息尚未送出，以新內容取代，保留原本的排隊位置與時間
+                pending.text = text
+                self.stats["coalesced"] += 1
+                return True
+
+        if len(self.queue) >= self.queue_size:
+            if settings.websocket_slow_client_policy == "disconnect":
+                return False
+            dropped = self.queue.popleft()
+            if dropped.coalesce_key is not None:
+                self.pending_keys.pop(dropped.coalesce_key, None)
+            self.stats["dropped"] += 1
+
+        item = _Outgoing(text, coalesce_key)
+        self.queue.append(item)
+        if coalesce_key is not None:
+            self.pending_keys[coalesce_key] = item
+        self.wakeup.set()
+        return True
+
+    async def run_writer(self, on_error):
+        """依序送出佇列中的訊息，發送失敗時呼叫 on_error 移除連接"""
+        try:
+            while True:
+                while not self.queue:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+
+                item = self.queue.popleft()
+                if item.coalesce_key is not None:
+                    self.pending_keys.pop(item.coalesce_key, None)
+
+                lag_ms = (time.monotonic() - item.enqueued_at) * 1000
+                self.stats["last_lag_ms"] = round(lag_ms, 2)
+                self.stats["max_lag_ms"] = round(max(self.stats["max_lag_ms"], lag_ms), 2)
+
+                await self.websocket.send_text(item.text)
+                self.stats["sent"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await on_error(self, e)
+
+    def get_status_dict(self) -> Dict:
+        client = self.websocket.client
+        return {
+            "id": self.id,
+            "remote": f"{client.host}:{client.port}" if client else None,
+            "topics": sorted(self.topics),
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "queued": len(self.queue),
+            "oldest_queued_ms": (
+                round((time.monotonic() - self.queue[0].enqueued_at) * 1000, 2)
+                if self.queue else 0.0
+            ),
+            **self.stats,
+        }
+
+
+class ConnectionManager:
+    """WebSocket 連接管理，可依主題訂閱，廣播不阻塞"""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.websocket_send_queue_size
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.stats = {
+            "broadcasts": 0,
+            "slow_client_disconnects": 0,
+        }
+
+    async def connect(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None):
+        """接受連接並啟動寫入任務
+
+        Args:
+            websocket: WebSocket 連接
+            topics: 訂閱的主題，None 表示接收所有訊息
+        """
+        await websocket.accept()
+        client = ClientConnection(
+            websocket,
+            set(topics) if topics is not None else {ALL_TOPICS},
+            self.queue_size,
+        )
+        client.writer = asyncio.create_task(client.run_writer(self._on_send_error))
+        self.clients[websocket] = client
+        logging.info(f"WebSocket 連接建立，總連接數: {len(self.clients)}")
+
+    async def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+        logging.info(f"WebSocket 連接關閉，總連接數: {len(self.clients)}")
+
+    async def _on_send_error(self, client: ClientConnection, error: Exception):
+        # 先移除再記錄日誌，避免錯誤日誌又推送給同一個失效的連接
+        await self.disconnect(client.websocket)
+        logging.error(f"發送 WebSocket 訊息失敗: {error}")
+
+    def _drop_slow_client(self, client: ClientConnection):
+        self.clients.pop(client.websocket, None)
+        if client.writer is not None:
+            client.writer.cancel()
+        self.stats["slow_client_disconnects"] += 1
+        asyncio.create_task(self._close_slow_client(client))
+
+    async def _close_slow_client(self, client: ClientConnection):
+        try:
+            await client.websocket.close(code=1013)
+        except Exception:
+            pass
+        logging.warning(f"WebSocket 客戶端 #{client.id} 發送佇列已滿，已斷開連接")
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> Set[str]:
+        """增加訂閱，返回新增的主題"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return set()
+        added = set(topics) - client.topics
+        client.topics.update(added)
+        return added
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        client = self.clients.get(websocket)
+        if client is not None:
+            client.topics.difference_update(topics)
+
+    def has_subscribers(self, topic: Optional[str] = None) -> bool:
+        """是否有連接會收到此主題的訊息（可在任何執行緒呼叫）"""
+        return any(client.wants(topic) for client in list(self.clients.values()))
+
+    def send_personal(self, websocket: WebSocket, message: dict):
+        """經由發送佇列送訊息給單一連接，與廣播訊息保持順序"""
+        self.send_text(websocket, serialize_message(message))
+
+    def send_text(self, websocket: WebSocket, text: str):
+        """送出已序列化的訊息給單一連接（多個連接共用同一份序列化結果時使用）"""
+        client = self.clients.get(websocket)
+        if client is not None and not client.enqueue(text):
+            self._drop_slow_client(client)
+
+    def publish(
+        self, message: dict, topic: Optional[str] = None, coalesce_key: Optional[str] = None
+    ) -> int:
+        """廣播訊息到訂閱此主題的客戶端（必須在事件循環執行緒呼叫，不等待發送）
+
+        Args:
+            message: 訊息內容，只序列化一次
+            topic: 主題，None 表示送給所有連接
+            coalesce_key: 合併鍵，客戶端仍有同鍵訊息未送出時以新訊息取代
+
+        Returns:
+            放入佇列的連接數
+        """
+        targets: List[ClientConnection] = [
+            client for client in self.clients.values() if client.wants(topic)
+        ]
+        if not targets:
+            return 0
+
+        text = serialize_message(message)
+        self.stats["broadcasts"] += 1
+
+        for client in targets:
+            if not client.enqueue(text, coalesce_key):
+                self._drop_slow_client(client)
+        return len(targets)
+
+    async def broadcast(
+        self, message: dict, topic: Optional[str] = None, coalesce_key: Optional[str] = None
+    ):
+        """廣播訊息（協程版本，供 run_coroutine_threadsafe 使用）"""
+        self.publish(message, topic, coalesce_key)
+
+    def get_status_dict(self) -> Dict:
+        """取得連接數、佇列與每個客戶端的延遲統計"""
+        return {
+            "connections": len(self.clients),
+            "queue_size": self.queue_size,
+            "slow_client_policy": settings.websocket_slow_client_policy,
+            **self.stats,
+            "clients": [client.get_status_dict() for client in list(self.clients.values())],
+        }
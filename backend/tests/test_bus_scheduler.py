@@ -0,0 +1,129 @@
+"""BusScheduler 優先交接、老化與取消的測試"""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from services.bus_scheduler import BusScheduler
+
+pytestmark = pytest.mark.asyncio
+
+
+async def acquire(scheduler: BusScheduler, priority: str, order: list):
+    async with scheduler.ticket(priority):
+        order.append(priority)
+
+
+async def enqueue(scheduler: BusScheduler, priority: str, order: list) -> asyncio.Task:
+    """建立排隊中的請求（讓任務執行到等待鎖為止）"""
+    task = asyncio.ensure_future(acquire(scheduler, priority, order))
+    await asyncio.sleep(0)
+    return task
+
+
+async def hold(scheduler: BusScheduler):
+    """以 manual 等級取得鎖，返回持有的請求"""
+    holder = scheduler.ticket("manual")
+    await holder.__aenter__()
+    return holder
+
+
+async def test_safety_granted_before_queued_poll():
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    poll = await enqueue(scheduler, "poll", order)
+    safety = await enqueue(scheduler, "safety", order)
+    await holder.__aexit__(None, None, None)
+    await asyncio.gather(poll, safety)
+
+    assert order == ["safety", "poll"]
+    assert not scheduler.locked()
+
+
+async def test_poll_ages_past_manual(monkeypatch):
+    monkeypatch.setattr(settings, "modbus_priority_aging_ms", 20)
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    poll = await enqueue(scheduler, "poll", order)
+    # 等待 100 ms 後 poll 已提升超過兩級，排在剛到的 manual 之前
+    await asyncio.sleep(0.1)
+    manual = await enqueue(scheduler, "manual", order)
+    await holder.__aexit__(None, None, None)
+    await asyncio.gather(poll, manual)
+
+    assert order == ["poll", "manual"]
+
+
+async def test_poll_without_aging_waits_behind_manual(monkeypatch):
+    monkeypatch.setattr(settings, "modbus_priority_aging_ms", 60_000)
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    poll = await enqueue(scheduler, "poll", order)
+    await asyncio.sleep(0.05)
+    manual = await enqueue(scheduler, "manual", order)
+    await holder.__aexit__(None, None, None)
+    await asyncio.gather(poll, manual)
+
+    assert order == ["manual", "poll"]
+
+
+async def test_cancel_after_grant_releases_lock():
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    waiter = await enqueue(scheduler, "poll", order)
+    # 釋放時鎖已交給 waiter（set_result），waiter 恢復執行前被取消
+    await holder.__aexit__(None, None, None)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert order == []
+    assert not scheduler.locked()
+    assert scheduler._holder is None
+
+    await asyncio.wait_for(acquire(scheduler, "manual", order), 1)
+    assert order == ["manual"]
+
+
+async def test_cancel_after_grant_hands_lock_to_next_waiter():
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    first = await enqueue(scheduler, "safety", order)
+    second = await enqueue(scheduler, "poll", order)
+    await holder.__aexit__(None, None, None)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    await asyncio.wait_for(second, 1)
+
+    assert order == ["poll"]
+    assert not scheduler.locked()
+
+
+async def test_cancel_before_grant_removes_waiter():
+    scheduler = BusScheduler("test")
+    order = []
+    holder = await hold(scheduler)
+
+    waiter = await enqueue(scheduler, "poll", order)
+    assert len(scheduler._waiters) == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert scheduler._waiters == []
+    assert scheduler.locked()
+    await holder.__aexit__(None, None, None)
+    assert not scheduler.locked()
+    assert order == []
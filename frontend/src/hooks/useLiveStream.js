@@ -0,0 +1,31 @@
+import { useEffect, useRef } from 'react';
+
+// 訂閱 /api/live/ws 即時推送：每個主題先收到一次 snapshot，之後只收到 delta
+export function useLiveStream(topics, onMessage) {
+  const handlerRef = useRef(onMessage);
+  handlerRef.current = onMessage;
+  const topicKey = topics.join(',');
+
+  useEffect(() => {
+    let ws = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      ws = new WebSocket(`${protocol}//${window.location.host}/api/live/ws?topics=${topicKey}`);
+      ws.onmessage = (event) => handlerRef.current(JSON.parse(event.data));
+      ws.onclose = () => {
+        // 斷線後 3 秒重連，重連時會重新收到 snapshot
+        if (!closed) retryTimer = setTimeout(connect, 3000);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (ws) ws.close();
+    };
+  }, [topicKey]);
+}
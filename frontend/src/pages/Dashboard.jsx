@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useIsMobile } from '../hooks/useIsMobile';
 import GlassCard from '../components/ui/GlassCard';
@@ -250,22 +250,9 @@ function ActivityCard({ events }) {
   );
 }
 
-function UpcomingCard({ schedules, tanks }) {
-  const now = new Date();
-  const nowMin = now.getHours() * 60 + now.getMinutes();
+function UpcomingCard({ upcoming, tanks }) {
   const toneByType = { daily: 'amber', weekly: 'violet', cron: 'sky', temperature: 'crimson' };
 
-  const upcoming = schedules
-    .filter(s => s.is_enabled && s.start_time)
-    .map(s => {
-      const [h, m] = (s.start_time || '00:00').split(':').map(Number);
-      const sMin = h * 60 + (m || 0);
-      const diff = sMin >= nowMin ? sMin - nowMin : 1440 - nowMin + sMin;
-      return { ...s, diffMin: diff, sMin };
-    })
-    .sort((a, b) => a.diffMin - b.diffMin)
-    .slice(0, 5);
-
   return (
     <GlassCard style={{ padding: 22 }}>
       <div className="t-label" style={{ marginBottom: 14 }}>即將執行</div>
@@ -277,9 +264,11 @@ function UpcomingCard({ schedules, tanks }) {
             const tone = toneByType[s.schedule_type] || 'amber';
             const tank = tanks.find(t => t.id === s.tank_id);
             return (
-              <div key={s.id ?? i} className="row gap-3">
+              <div key={s.job_id ?? i} className="row gap-3">
                 <span className="t-num" style={{ fontSize: 12, color: `var(--${tone})`, width: 40, flexShrink: 0 }}>
-                  {s.start_time?.slice(0, 5) || '--:--'}
+                  {s.next_run_time
+                    ? new Date(s.next_run_time).toLocaleTimeString('zh-TW', { hour: '2-digit', minute: '2-digit', hour12: false })
+                    : '--:--'}
                 </span>
                 <div style={{ width: 3, alignSelf: 'stretch', borderRadius: 2, background: `var(--${tone})`, flexShrink: 0 }} />
                 <div style={{ flex: 1, minWidth: 0 }}>
@@ -304,55 +293,42 @@ export default function Dashboard() {
   const [relays, setRelays] = useState([]);
   const [alerts, setAlerts] = useState([]);
   const [events, setEvents] = useState([]);
-  const [schedules, setSchedules] = useState([]);
+  const [upcoming, setUpcoming] = useState([]);
   const [loading, setLoading] = useState(true);
+  const snapshotEtag = useRef(null);
 
-  const loadTanks = useCallback(async () => {
-    const r = await fetch('/api/tanks');
-    const data = await r.json();
-    const withTemp = await Promise.all(data.map(async (tank, i) => {
-      try {
-        const [tr, hr] = await Promise.all([
-          fetch(`/api/temperature/latest/${tank.id}`).then(x => x.json()),
-          fetch(`/api/temperature/history/${tank.id}?hours=24`).then(x => x.json()).catch(() => []),
-        ]);
-        return {
-          ...tank,
-          currentTemp: tr?.temperature ?? null,
-          humidity: tr?.humidity ?? null,
-          history24h: Array.isArray(hr) ? hr : [],
-        };
-      } catch {
-        return { ...tank, currentTemp: null, humidity: null, history24h: [] };
-      }
-    }));
-    setTanks(withTemp);
-  }, []);
-
-  const loadAlerts = useCallback(async () => {
+  // 單一快照請求取代逐缸請求；內容未變時伺服器返回 304，不重新渲染
+  const loadSnapshot = useCallback(async () => {
     try {
-      const r = await fetch('/api/events/alerts/active?limit=5');
-      setAlerts(await r.json());
-    } catch { setAlerts([]); }
+      const r = await fetch('/api/dashboard/snapshot', {
+        headers: snapshotEtag.current ? { 'If-None-Match': snapshotEtag.current } : {},
+      });
+      if (r.status === 304 || !r.ok) return;
+      snapshotEtag.current = r.headers.get('ETag');
+      const data = await r.json();
+      setTanks(data.tanks.map(tank => ({
+        ...tank,
+        currentTemp: tank.latest?.temperature ?? null,
+        humidity: tank.latest?.humidity ?? null,
+        history24h: tank.sparkline,
+      })));
+      setRelays(data.relays);
+      setAlerts(data.alerts);
+      setEvents(data.events);
+      setUpcoming(data.upcoming);
+    } catch { /* 保留上一次的快照 */ }
   }, []);
 
   useEffect(() => {
     const init = async () => {
       setLoading(true);
-      await Promise.all([
-        loadTanks(),
-        loadAlerts(),
-        fetch('/api/relays').then(r => r.json()).then(setRelays).catch(() => {}),
-        fetch('/api/events?limit=6').then(r => r.json()).then(setEvents).catch(() => {}),
-        fetch('/api/schedules').then(r => r.json()).then(setSchedules).catch(() => {}),
-      ]);
+      await loadSnapshot();
       setLoading(false);
     };
     init();
-    const t1 = setInterval(loadTanks, 5000);
-    const t2 = setInterval(loadAlerts, 30000);
-    return () => { clearInterval(t1); clearInterval(t2); };
-  }, [loadTanks, loadAlerts]);
+    const t = setInterval(loadSnapshot, 5000);
+    return () => clearInterval(t);
+  }, [loadSnapshot]);
 
   const activeTanks = tanks.filter(t => t.currentTemp != null).length;
   const activeDevices = relays.filter(r => r.current_state && r.enabled).length;
@@ -421,7 +397,7 @@ export default function Dashboard() {
       {/* Activity + Upcoming */}
       <div style={{ display: 'grid', gridTemplateColumns: isMobile ? '1fr' : '1.4fr 1fr', gap: 16 }}>
         <ActivityCard events={events} />
-        <UpcomingCard schedules={schedules} tanks={tanks} />
+        <UpcomingCard upcoming={upcoming} tanks={tanks} />
       </div>
     </div>
   );
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useRef } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { 
   Power, 
   PowerOff, 
@@ -18,10 +18,20 @@ import {
   X,
   Save
 } from 'lucide-react';
+import { useLiveStream } from '../hooks/useLiveStream';
 
 // 動態獲取 API base URL，支援本地和遠程訪問
 const API_BASE = window.location.origin;
 
+// 感測器讀數轉為卡片資料
+const toSensorCard = (reading) => ({
+  id: reading.sensor_id,
+  type: reading.sensor_type,
+  temperature: reading.temperature,
+  humidity: reading.humidity,
+  timestamp: reading.timestamp
+});
+
 // 簡單的 Card 組件
 const Card = ({ children, className = '' }) => (
   <div className={`bg-white rounded-lg shadow-md ${className}`}>
@@ -161,7 +171,7 @@ const DevTools = () => {
     try {
       const response = await fetch(`${API_BASE}/api/dev/sensors/raw`);
       const data = await response.json();
-      setSensors(data.sensors || []);
+      setSensors((data.current_readings || []).map(toSensorCard));
     } catch (error) {
       console.error('載入感測器數據失敗:', error);
     }
@@ -214,11 +224,18 @@ const DevTools = () => {
       setLoading(false);
     };
     loadAll();
+  }, []);
 
-    // 定期刷新感測器數據
-    const interval = setInterval(loadSensors, 2000);
-    return () => clearInterval(interval);
+  // 感測器讀數由伺服器每個輪詢週期推送，不再定時輪詢
+  const handleTemperatureMessage = useCallback((message) => {
+    if (message.topic !== 'temperature' || message.type !== 'delta') return;
+    setSensors(prev => {
+      const updated = new Map(prev.map(sensor => [sensor.id, sensor]));
+      message.data.readings.forEach(reading => updated.set(reading.sensor_id, toSensorCard(reading)));
+      return Array.from(updated.values());
+    });
   }, []);
+  useLiveStream(['temperature'], handleTemperatureMessage);
 
   // WebSocket 連接
   useEffect(() => {
@@ -234,8 +251,10 @@ const DevTools = () => {
         };
         
         ws.onmessage = (event) => {
-          const log = JSON.parse(event.data);
-          setLogs(prev => [...prev.slice(-999), log]); // 保留最近 1000 條
+          // 伺服器每個批次窗口推送一個 frame：{ type: 'logs' | 'replay', logs: [...] }
+          const frame = JSON.parse(event.data);
+          if (!frame.logs?.length) return;
+          setLogs(prev => [...prev, ...frame.logs].slice(-1000)); // 保留最近 1000 條
         };
         
         ws.onerror = (error) => {
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Power, Lightbulb, Zap, Wind, ChevronDown, Activity } from 'lucide-react';
+import { useLiveStream } from '../hooks/useLiveStream';
 
 // 動態獲取 API base URL
 const API_BASE = window.location.origin;
@@ -55,11 +56,25 @@ const ManualControl = () => {
       setLoading(false);
     };
     loadAll();
+  }, []);
 
-    // 每 2 秒更新繼電器狀態
-    const interval = setInterval(loadRelayChannels, 2000);
-    return () => clearInterval(interval);
+  // 繼電器狀態由伺服器即時推送，不再定時輪詢
+  const defaultAddress = useRef(null);
+  const handleLiveMessage = useCallback((message) => {
+    if (message.topic !== 'relays') return;
+    if (message.type === 'snapshot') {
+      defaultAddress.current = message.data.default_device_address;
+      setRelayChannels(message.data.relays);
+      return;
+    }
+    setRelayChannels(prev => prev.map(ch => {
+      // device_address 為 null 的通道屬於預設板
+      const address = ch.device_address ?? defaultAddress.current;
+      const change = message.data.find(c => c.channel === ch.channel && c.device_address === address);
+      return change ? { ...ch, current_state: change.state } : ch;
+    }));
   }, []);
+  useLiveStream(['relays'], handleLiveMessage);
 
   // 控制繼電器
   const handleToggle = async (channel) => {